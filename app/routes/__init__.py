@@ -1,4 +1,13 @@
-from .routes import routes
-from .respond_situation_routes import respond_situation_bp
-
+# Blueprints are imported on first access so that a process can import a single
+# route module (e.g. chat_main importing chatbot_routes) without loading the
+# scoring models behind every other blueprint.
 __all__ = ['routes']
+
+
+def __getattr__(name):
+    if name == 'routes':
+        from .routes import routes
+        # Importing the submodule bound `routes` to it; rebind to the blueprint list
+        globals()['routes'] = routes
+        return routes
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
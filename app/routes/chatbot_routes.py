@@ -2,10 +2,30 @@
 
 from flask import Blueprint, request, jsonify, Response, stream_with_context
 from app.services.chatbot_service import stream_chatbot_response
+from app.services.feedback_service import (
+    stream_feedback, summary_feedback_prompt, feedback_options, is_ready, prefetch, stats as feedback_stats
+)
+from app.services.generation_scheduler import generation_scheduler
+from app.services.llm_backends import backend_pool
+from app.services.llm_telemetry import LLM_STATS_LINE, telemetry, gauge
 import json
 
 chatbot_bp = Blueprint('chatbot', __name__)
 
+
+def client_key(data):
+    """Fairness key for the generation queue: explicit client id, else the caller's address"""
+    return (request.headers.get('X-Client-Id') or data.get('client_id')
+            or request.headers.get('X-Forwarded-For', request.remote_addr or '').split(',')[0].strip())
+
+
+def rejection_response(rejection):
+    """429/503 with Retry-After, sent before any stream starts"""
+    return jsonify({'error': rejection.message, 'retry_after': rejection.retry_after}), rejection.status, {
+        'Retry-After': str(rejection.retry_after)
+    }
+
+
 @chatbot_bp.route('/chatbot', methods=['POST'])
 def chatbot():
     data = request.get_json()
@@ -14,11 +34,17 @@ def chatbot():
     if not prompt:
         return jsonify({'error': 'Missing prompt'}), 400
     messages = [{"role": "user", "content": prompt}]
+    rejection = generation_scheduler.admission()
+    if rejection:
+        return rejection_response(rejection)
+    client_id = client_key(data)
+    # "stats": true appends the stream's timings as a last line, for debugging
+    stats_line = bool(data.get('stats')) or LLM_STATS_LINE
 
     @stream_with_context
     def generate():
         try:
-            for chunk in stream_chatbot_response(messages, model):
+            for chunk in stream_chatbot_response(messages, model, client_id, stats_line=stats_line):
                 yield chunk
         except Exception as e:
             yield f"\n[Stream Error: {str(e)}]\n"
@@ -40,27 +66,20 @@ def swt_chatbot():
     if not reference or not summary:
         return jsonify({'error': 'Missing reference or summary'}), 400
     
-    prompt = (
-        f"Reference: {reference}\n"
-        f"Summary: {summary}\n"
-        "Please evaluate how well this summary captures the reference material, then provide:\n"
-        "1. Feedback on the summary's accuracy and writing quality\n"
-        "2. Specific suggestions for improvement\n"
-        "3. An improved version as a single, complete sentence (5-75 words)\n\n"
-        "Your improved version should:\n"
-        "- Cover all main points from the reference clearly\n"
-        "- Be grammatically correct\n"
-        "- Use appropriate, varied vocabulary\n"
-        "- Form exactly one complete sentence\n\n"
-        "Do not mention scores, marks, or rubric points in your response."
-    )
+    prompt = summary_feedback_prompt(reference, summary, data.get('compress'), 'swt')
 
     messages = [{"role": "user", "content": prompt}]
+    options = feedback_options()
+    # Cached or in-flight feedback needs no generation slot
+    rejection = generation_scheduler.admission()
+    if rejection and not is_ready(messages, model, options):
+        return rejection_response(rejection)
+    client_id = client_key(data)
 
     @stream_with_context
     def generate():
         try:
-            for chunk in stream_chatbot_response(messages, model):
+            for chunk in stream_feedback(messages, model, client_id, options, 'swt_chatbot'):
                 yield chunk
         except Exception as e:
             yield f"\n[Stream Error: {str(e)}]\n"
@@ -82,27 +101,20 @@ def sst_chatbot():
     if not reference or not summary:
         return jsonify({'error': 'Missing reference or summary'}), 400
 
-    prompt_sst = (
-        f"Reference: {reference}\n"
-        f"Summary: {summary}\n"
-        "Please evaluate how well this summary captures the reference material, then provide:\n"
-        "1. Feedback on the summary's accuracy and writing quality\n"
-        "2. Specific suggestions for improvement\n"
-        "3. An improved version as a single, complete sentence (5-75 words)\n\n"
-        "Your improved version should:\n"
-        "- Cover all main points from the reference clearly\n"
-        "- Be grammatically correct\n"
-        "- Use appropriate, varied vocabulary\n"
-        "- Form exactly one complete sentence\n\n"
-        "Do not mention scores, marks, or rubric points in your response."
-    )
+    prompt_sst = summary_feedback_prompt(reference, summary, data.get('compress'), 'sst')
 
     messages = [{"role": "user", "content": prompt_sst}]
+    options = feedback_options()
+    # Cached or in-flight feedback needs no generation slot
+    rejection = generation_scheduler.admission()
+    if rejection and not is_ready(messages, model, options):
+        return rejection_response(rejection)
+    client_id = client_key(data)
 
     @stream_with_context
     def generate():
         try:
-            for chunk in stream_chatbot_response(messages, model):
+            for chunk in stream_feedback(messages, model, client_id, options, 'sst_chatbot'):
                 yield chunk
         except Exception as e:
             yield f"\n[Stream Error: {str(e)}]\n"
@@ -113,3 +125,62 @@ def sst_chatbot():
         "Content-Encoding": "none"
     })
 
+
+@chatbot_bp.route('/chatbot/prefetch', methods=['POST'])
+def chatbot_prefetch():
+    """
+    Speculative SWT/SST feedback generation (sent by the scoring app)
+    Expects: reference + summary (+ model, compress, task_type 'swt' or 'sst'),
+    as for /swt_chatbot and /sst_chatbot
+    Returns: 202 with what was done: started, in_flight, cached or busy (skipped)
+    """
+    data = request.get_json()
+    reference = data.get('reference')
+    summary = data.get('summary')
+    model = data.get('model', 'llama2')
+
+    if not reference or not summary:
+        return jsonify({'error': 'Missing reference or summary'}), 400
+
+    prompt = summary_feedback_prompt(reference, summary, data.get('compress'), data.get('task_type'))
+    messages = [{"role": "user", "content": prompt}]
+    status = prefetch(messages, model, feedback_options(), client_key(data))
+    return jsonify({'status': status}), 202
+
+
+@chatbot_bp.route('/chatbot/stats', methods=['GET'])
+def chatbot_stats():
+    """
+    Feedback and generation statistics for this worker
+    Returns: how many feedback requests were replayed from cache, joined an
+    identical generation in flight or generated, plus cache hit counts, the
+    generation scheduler's active/queued counts and breaker state, and per
+    LLM backend health, load, time to first token and tokens per second
+    """
+    return jsonify({**feedback_stats(), 'scheduler': generation_scheduler.stats(),
+                    'backends': backend_pool.stats()}), 200
+
+
+@chatbot_bp.route('/metrics', methods=['GET'])
+def metrics():
+    """
+    Prometheus metrics for this worker
+    Returns: per model/endpoint histograms of connect time, time to first
+    token, chunk gaps, stream time, tokens and tokens/s, plus scheduler and
+    backend gauges
+    """
+    scheduler = generation_scheduler.stats()
+    backends = backend_pool.stats()
+    body = telemetry.render()
+    body += gauge('llm_generations_active', 'Generations holding a scheduler slot', [({}, scheduler['active'])])
+    body += gauge('llm_generations_queued', 'Generations waiting for a slot', [
+        ({'priority': 'interactive'}, scheduler['queued']),
+        ({'priority': 'background'}, scheduler['background_queued']),
+    ])
+    body += gauge('llm_breaker_open', 'Circuit breaker open (1) or closed (0)',
+                  [({}, int(scheduler['breaker'] != 'closed'))])
+    body += gauge('llm_backend_healthy', 'Backend passes health checks',
+                  [({'backend': b['url']}, int(b['healthy'])) for b in backends])
+    body += gauge('llm_backend_outstanding', 'Requests in flight per backend',
+                  [({'backend': b['url']}, b['outstanding']) for b in backends])
+    return Response(body, mimetype='text/plain; version=0.0.4')
@@ -2,12 +2,13 @@ from flask import Blueprint, request, jsonify, current_app
 import tempfile
 import os
 from app.services.describe_image_service import evaluate_describe_image
+from app.services.question_bank_service import resolve_reference
 
 describe_image_bp = Blueprint('describe_image', __name__)
 
 @describe_image_bp.route('/describe_image', methods=['POST'])
 def describe_image():
-    reference = request.form.get('reference')
+    reference = resolve_reference(request.form.get('reference'), request.form.get('question_id'))
     file = request.files.get('file')
     if not reference or not file:
         return jsonify({'error': 'Missing reference or audio file'}), 400
@@ -1,5 +1,6 @@
 from flask import Blueprint, request, jsonify
 from app.services.dictation_service import dictation_ai
+from app.services.question_bank_service import resolve_reference
 
 dictation_bp = Blueprint('dictation', __name__)
 
@@ -9,9 +10,12 @@ def dictation():
         data = request.get_json()
         reference = data.get('reference')
         response = data.get('response')
+        question_id = data.get('question_id')
     else:
         reference = request.form.get('reference')
         response = request.form.get('response')
+        question_id = request.form.get('question_id')
+    reference = resolve_reference(reference, question_id)
     if not reference or not response:
         return jsonify({'error': 'Missing reference or response'}), 400
     ai_result = dictation_ai(response, reference)
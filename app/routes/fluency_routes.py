@@ -3,12 +3,9 @@ import numpy as np
 import librosa
 import tempfile
 import os
-import re
 import torch
 import whisperx
-
-def count_syllables(text):
-    return sum(len(re.findall(r'[aeiouy]+', word.lower())) for word in text.split())
+from app.services.syllables import count_syllables
 
 def count_filler_words(text):
     fillers = ['um', 'uh', 'erm', 'ah', 'like', 'you know', 'well', 'so', 'actually']
@@ -0,0 +1,13 @@
+from flask import Blueprint, jsonify
+from app.services.grammar_service import lang_tool
+
+grammar_bp = Blueprint('grammar', __name__)
+
+@grammar_bp.route('/grammar/stats', methods=['GET'])
+def grammar_stats():
+    """
+    Grammar check statistics for this worker
+    Returns: how often each tier (prescreen, cache, languagetool) answered,
+    pre-screen decisions by reason, cache hit counts and server health
+    """
+    return jsonify(lang_tool.stats()), 200
@@ -0,0 +1,52 @@
+from flask import Blueprint, request, jsonify, url_for
+from app.services.job_service import JOB_TASKS, submit_job, get_job, wait_for_job
+from app.services.question_bank_service import resolve_reference
+import math
+import os
+
+job_bp = Blueprint('jobs', __name__)
+
+# Longest a GET /jobs/<job_id>?wait=... request is held open
+JOB_LONG_POLL_MAX = float(os.environ.get('JOB_LONG_POLL_MAX', '30'))
+
+@job_bp.route('/jobs/<task>', methods=['POST'])
+def submit(task):
+    """
+    Asynchronous scoring job endpoint (retell_lecture, summarize_group, describe_image)
+    Expects: the same form fields as the synchronous route (reference or question_id + audio file),
+    plus an optional webhook_url (http(s), public or allowlisted host) that receives the finished job
+    Returns: 202 with the job id and the URL to poll, 400 for a webhook_url that is not allowed
+    """
+    if task not in JOB_TASKS:
+        return jsonify({'error': f"Unknown task '{task}'. Expected one of: {', '.join(sorted(JOB_TASKS))}"}), 404
+    reference = resolve_reference(request.form.get('reference'), request.form.get('question_id'))
+    file = request.files.get('file')
+    if not reference or not file:
+        return jsonify({'error': 'Missing reference or audio file'}), 400
+
+    try:
+        job = submit_job(task, reference, file, request.form.get('webhook_url'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    job['poll_url'] = url_for('jobs.status', job_id=job['job_id'])
+    return jsonify(job), 202, {'Location': job['poll_url']}
+
+@job_bp.route('/jobs/<job_id>', methods=['GET'])
+def status(job_id):
+    """
+    Job status endpoint
+    Expects: optional ?wait=<seconds> to long-poll until the job finishes
+    Returns: the job with status queued/running/done/failed; once finished, the
+    scoring result and the status code the synchronous route would have returned
+    """
+    try:
+        wait = float(request.args.get('wait', 0))
+    except ValueError:
+        wait = math.nan
+    if not math.isfinite(wait):
+        return jsonify({'error': 'wait must be a number of seconds'}), 400
+    wait = min(max(wait, 0), JOB_LONG_POLL_MAX)
+    job = wait_for_job(job_id, wait) if wait else get_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job), 200
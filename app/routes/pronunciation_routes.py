@@ -3,14 +3,11 @@ import numpy as np
 import librosa
 import tempfile
 import os
-import re
 from app.services.audio_transcriber import transcribe_audio
+from app.services.syllables import count_syllables
 
 pronunciation_bp = Blueprint('pronunciation', __name__)
 
-def count_syllables(text):
-    return sum(len(re.findall(r'[aeiouy]+', word)) for word in text.split())
-
 def scale_fluency(val):
     val = np.clip(val, 1.5, 5.0)
     return 10 + ((val - 1.5) / (5.0 - 1.5))**2 * 80
@@ -0,0 +1,41 @@
+from flask import Blueprint, request, jsonify
+from app.services.question_bank_service import register_question, get_question, delete_question
+
+question_bank_bp = Blueprint('question_bank', __name__)
+
+@question_bank_bp.route('/question_bank', methods=['POST'])
+def register():
+    """
+    Question bank registration endpoint
+    Expects: task_type + reference text (+ optional question_id)
+    Returns: the registered question and the names of its precomputed artifacts
+    """
+    if request.is_json:
+        data = request.get_json()
+    else:
+        data = request.form
+    task_type = data.get('task_type')
+    reference = data.get('reference')
+    question_id = data.get('question_id')
+
+    if not task_type or not reference:
+        return jsonify({'error': 'Missing task_type or reference'}), 400
+
+    try:
+        question = register_question(task_type, reference, question_id)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(question), 201
+
+@question_bank_bp.route('/question_bank/<question_id>', methods=['GET'])
+def get(question_id):
+    question = get_question(question_id)
+    if question is None:
+        return jsonify({'error': 'Question not found'}), 404
+    return jsonify(question), 200
+
+@question_bank_bp.route('/question_bank/<question_id>', methods=['DELETE'])
+def delete(question_id):
+    if not delete_question(question_id):
+        return jsonify({'error': 'Question not found'}), 404
+    return jsonify({'deleted': question_id}), 200
@@ -1,5 +1,6 @@
 from flask import Blueprint, request, jsonify
 from app.services.read_aloud_service import evaluate_read_aloud
+from app.services.question_bank_service import resolve_reference
 import os
 
 read_aloud_bp = Blueprint('read_aloud', __name__)
@@ -15,7 +16,7 @@ def read_aloud():
         return jsonify({'error': 'No audio file provided'}), 400
     
     audio_file = request.files['file']
-    reference = request.form.get('reference')
+    reference = resolve_reference(request.form.get('reference'), request.form.get('question_id'))
     
     if not reference:
         return jsonify({'error': 'Missing reference text'}), 400
@@ -1,11 +1,12 @@
 from flask import Blueprint, request, jsonify, current_app
 from app.services.repeat_sentence_service import evaluate_repeat_sentence
+from app.services.question_bank_service import resolve_reference
 
 repeat_sentence_bp = Blueprint('repeat_sentence', __name__)
 
 @repeat_sentence_bp.route('/repeat_sentence', methods=['POST'])
 def repeat_sentence():
-    reference = request.form.get('reference')
+    reference = resolve_reference(request.form.get('reference'), request.form.get('question_id'))
     file = request.files.get('file')
     if not reference or not file:
         return jsonify({'error': 'Missing reference or audio file'}), 400
@@ -2,12 +2,13 @@ from flask import Blueprint, request, jsonify, current_app
 import tempfile
 import os
 from app.services.respond_situation_service import evaluate_respond_situation
+from app.services.question_bank_service import resolve_reference
 
 respond_situation_bp = Blueprint('respond_situation', __name__)
 
 @respond_situation_bp.route('/respond_situation', methods=['POST'])
 def respond_situation():
-    reference = request.form.get('reference')
+    reference = resolve_reference(request.form.get('reference'), request.form.get('question_id'))
     file = request.files.get('file')
     if not reference or not file:
         return jsonify({'error': 'Missing reference or audio file'}), 400
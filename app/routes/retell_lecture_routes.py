@@ -1,11 +1,12 @@
 from flask import Blueprint, request, jsonify, current_app
 from app.services.retell_lecture_service import evaluate_retell_lecture
+from app.services.question_bank_service import resolve_reference
 
 retell_lecture_bp = Blueprint('retell_lecture', __name__)
 
 @retell_lecture_bp.route('/retell_lecture', methods=['POST'])
 def retell_lecture():
-    reference = request.form.get('reference')
+    reference = resolve_reference(request.form.get('reference'), request.form.get('question_id'))
     file = request.files.get('file')
     if not reference or not file:
         return jsonify({'error': 'Missing reference or audio file'}), 400
@@ -13,6 +13,8 @@ from .retell_lecture_routes import retell_lecture_bp
 from .write_essay_routes import write_essay_bp
 from .read_aloud_routes import read_aloud_bp
 from .describe_image_routes import describe_image_bp
+from .question_bank_routes import question_bank_bp
+from .grammar_routes import grammar_bp
 
 routes = [
     asq_bp,
@@ -30,5 +32,7 @@ routes = [
     write_essay_bp,
     read_aloud_bp,
     describe_image_bp,
+    question_bank_bp,
+    grammar_bp,
     # Add more routers here
 ]
\ No newline at end of file
@@ -1,5 +1,7 @@
 from flask import Blueprint, request, jsonify
 from app.services.sst_service import evaluate_sst_service
+from app.services.question_bank_service import resolve_reference
+from app.services.feedback_prefetch import prefetch_feedback
 
 sst_bp = Blueprint('sst', __name__)
 
@@ -14,14 +16,25 @@ def sst():
         data = request.get_json()
         reference = data.get('reference')
         summary = data.get('summary')
+        question_id = data.get('question_id')
+        model = data.get('model')
+        compress = data.get('compress')
     else:
         reference = request.form.get('reference')
         summary = request.form.get('summary')
+        question_id = request.form.get('question_id')
+        model = request.form.get('model')
+        compress = request.form.get('compress')
+        if compress is not None:
+            compress = compress.lower() in ('1', 'true', 'yes')
+    reference = resolve_reference(reference, question_id)
     
     if not reference or not summary:
         return jsonify({'error': 'Missing reference or summary'}), 400
 
     # Evaluate the summary against the reference
     result = evaluate_sst_service(summary, reference)
+    # Have the feedback ready by the time the student asks for it
+    prefetch_feedback(reference, summary, model, task_type='sst', compress=compress)
     
     return jsonify(result), 200 
\ No newline at end of file
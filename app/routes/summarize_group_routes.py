@@ -1,11 +1,12 @@
 from flask import Blueprint, request, jsonify, current_app
 from app.services.summarize_group_service import evaluate_summarize_group
+from app.services.question_bank_service import resolve_reference
 
 summarize_group_bp = Blueprint('summarize_group', __name__)
 
 @summarize_group_bp.route('/summarize_group', methods=['POST'])
 def summarize_group():
-    reference = request.form.get('reference')
+    reference = resolve_reference(request.form.get('reference'), request.form.get('question_id'))
     file = request.files.get('file')
     if not reference or not file:
         return jsonify({'error': 'Missing reference or audio file'}), 400
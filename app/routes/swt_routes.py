@@ -1,6 +1,8 @@
 from flask import Blueprint, request, jsonify, Response
 from app.services.swt_service import evaluate_summary_service
 from app.services.chatbot_service import stream_chatbot_response
+from app.services.question_bank_service import resolve_reference
+from app.services.feedback_prefetch import prefetch_feedback
 
 swt_bp = Blueprint('swt', __name__)
 
@@ -8,9 +10,10 @@ swt_bp = Blueprint('swt', __name__)
 def swt():
     data = request.get_json()
     summary = data.get('summary')
-    reference = data.get('reference')
+    reference = resolve_reference(data.get('reference'), data.get('question_id'))
     if not summary or not reference:
         return jsonify({'error': 'Missing summary or reference'}), 400
     result = evaluate_summary_service(summary, reference)
+    prefetch_feedback(reference, summary, data.get('model'), task_type='swt', compress=data.get('compress'))
     return jsonify(result), 200
 
@@ -1,5 +1,6 @@
 from flask import Blueprint, request, jsonify
 from app.services.write_essay_service import evaluate_write_essay
+from app.services.question_bank_service import resolve_reference
 
 write_essay_bp = Blueprint('write_essay', __name__)
 
@@ -14,9 +15,12 @@ def write_essay():
         data = request.get_json()
         reference = data.get('reference')
         essay = data.get('essay')
+        question_id = data.get('question_id')
     else:
         reference = request.form.get('reference')
         essay = request.form.get('essay')
+        question_id = request.form.get('question_id')
+    reference = resolve_reference(reference, question_id)
     
     if not reference or not essay:
         return jsonify({'error': 'Missing reference or essay'}), 400
@@ -1,88 +1,220 @@
-
 import requests
-import json
 import logging
+import os
+
+from app.services.generation_scheduler import GenerationRejected, generation_scheduler
+from app.services.llm_backends import backend_pool, session
+from app.services.llm_telemetry import LLM_STATS_LINE, StreamTelemetry
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def stream_chatbot_response(messages, model="llama2"):
-    url = "http://localhost:11434/api/chat"
-    payload = {"model": model, "messages": messages}
-    
+OLLAMA_CONNECT_TIMEOUT = float(os.environ.get('OLLAMA_CONNECT_TIMEOUT', '5'))
+# Longest wait for the next streamed line, not for the whole response
+OLLAMA_READ_TIMEOUT = float(os.environ.get('OLLAMA_READ_TIMEOUT', '60'))
+
+
+def _ndjson_lines(chunks):
+    """
+    Split a stream of byte chunks into lines. Yields (line, at_end) with
+    at_end True only for trailing data after the last newline. Each chunk
+    is appended to one bytearray and consumed lines are dropped once per
+    chunk, so long responses are not copied over and over.
+    """
+    buffer = bytearray()
+    for chunk in chunks:
+        if not chunk:
+            continue
+        start = len(buffer)
+        buffer += chunk
+        consumed = 0
+        newline = buffer.find(b"\n", start)
+        while newline != -1:
+            yield bytes(buffer[consumed:newline]), False
+            consumed = newline + 1
+            newline = buffer.find(b"\n", consumed)
+        if consumed:
+            del buffer[:consumed]
+    if buffer:
+        yield bytes(buffer), True
+
+
+def _stream_chat(backend, messages, model, options=None):
+    """
+    POST a streaming chat request to `backend` over the pooled session.
+    Yields the response (for status handling) and then (line, at_end) for
+    each non-empty line of the body.
+    """
+    url, payload = backend.chat_request(messages, model, options)
+    with session.post(url, json=payload, stream=True,
+                      timeout=(OLLAMA_CONNECT_TIMEOUT, OLLAMA_READ_TIMEOUT)) as res:
+        yield res
+        if res.status_code != 200:
+            return
+        for line, at_end in _ndjson_lines(res.iter_content(chunk_size=1024)):
+            if line.strip():
+                yield line, at_end
+
+
+def _open_stream(messages, model, tried, options=None):
+    """
+    Start a chat stream on the best backend for `model`, moving on to the
+    next backend when one refuses the connection. Returns (backend, stream,
+    response); backends that failed are appended to `tried` and the last
+    error is raised once none is left.
+    """
+    while True:
+        backend = backend_pool.choose(model, exclude=tried)
+        if backend is None:
+            raise requests.exceptions.ConnectionError("no LLM backend accepted the connection")
+        logger.info(f"Attempting to connect to {backend.kind} backend at {backend.url}")
+        stream = _stream_chat(backend, messages, model, options)
+        try:
+            return backend, stream, next(stream)
+        except Exception as e:
+            stream.close()
+            backend_pool.finish(backend, model, False if isinstance(e, requests.RequestException) else None)
+            tried.append(backend)
+            if not isinstance(e, requests.exceptions.ConnectionError) or len(tried) == len(backend_pool.backends):
+                raise
+            logger.error(f"Could not connect to {backend.url}: {e}")
+
+
+def chat_events(messages, model="llama2", client_id=None, options=None, ticket=None,
+                endpoint=None, stats_line=LLM_STATS_LINE):
+    """
+    Stream a chat completion as (kind, text) events: ("content", text) for
+    generated text, ("status", text) for queue position updates while the
+    request waits for a generation slot, and ("error", text) for the error
+    and help messages shown to the user when Ollama fails, the request is
+    rejected by the scheduler or a line cannot be parsed. `options` caps
+    the generation (max_tokens, stop), see llm_backends; a final
+    ("truncated", "") event marks a generation cut off by max_tokens. `ticket` is a
+    scheduler ticket to wait with instead of a new interactive one.
+
+    Every stream is measured (llm_telemetry) under `endpoint`; with
+    `stats_line` a final ("stats", text) event carries its summary.
+    """
+    ticket = ticket or generation_scheduler.ticket(client_id)
+    waiting = generation_scheduler.acquire(ticket)
+    try:
+        for position in waiting:
+            yield "status", f"[Queued: {position} request{'s' if position != 1 else ''} ahead of you]\n"
+    except GenerationRejected as e:
+        logger.warning(f"Generation rejected ({e.status}): {e.message}")
+        StreamTelemetry(model, endpoint).finish('rejected')
+        yield "error", f"\n[Busy: {e.message} (retry in {e.retry_after}s)]\n"
+        return
+    finally:
+        # Gives up the place in the queue if the client left while waiting
+        waiting.close()
+
+    backend = stream = None
+    tried = []
+    # Backend health for the circuit breaker: None until a backend answers or fails
+    ok = None
+    outcome = 'abandoned'
+    # Timings start once the generation slot is held
+    stream_stats = StreamTelemetry(model, endpoint)
+
     try:
-        logger.info(f"Attempting to connect to Ollama at {url}")
         logger.info(f"Using model: {model}")
-        
-        with requests.post(url, json=payload, stream=True, timeout=60) as res:
-            logger.info(f"Ollama response status: {res.status_code}")
-            
-            if res.status_code != 200:
-                error_msg = f"Ollama server returned status {res.status_code}"
-                try:
-                    error_detail = res.json()
-                    error_msg += f": {error_detail}"
-                except:
-                    error_msg += f": {res.text}"
-                logger.error(error_msg)
-                yield f"\n[Ollama Error: {error_msg}]\n"
-                yield "\nPlease ensure:\n"
-                yield "1. Ollama server is running (ollama serve)\n"
-                yield f"2. Model '{model}' is installed (ollama pull {model})\n"
-                yield "3. Ollama is accessible at http://localhost:11434\n"
-                yield f"4. If you have limited memory, try: ollama pull llama2 (smaller model)\n"
-                return
-            
-            buffer = b""
-            for chunk in res.iter_content(chunk_size=1024):
-                if not chunk:
-                    continue
-                buffer += chunk
-                while b"\n" in buffer:
-                    line, buffer = buffer.split(b"\n", 1)
-                    if not line.strip():
-                        continue
-                    try:
-                        decoded_line = line.decode('utf-8')
-                        data = json.loads(decoded_line)
-                        content = data.get("message", {}).get("content", "")
-                        if content:
-                            yield content
-                    except Exception as parse_err:
-                        logger.error(f"Parse error: {parse_err}")
-                        yield f"\n[Parse Error: {str(parse_err)}]\n"
-            
-            # process remaining buffered data
-            if buffer:
-                try:
-                    decoded_line = buffer.decode('utf-8')
-                    data = json.loads(decoded_line)
-                    content = data.get("message", {}).get("content", "")
-                    if content:
-                        yield content
-                except Exception as parse_err:
+
+        backend, stream, res = _open_stream(messages, model, tried, options)
+        stream_stats.connected(backend)
+        url = backend.url
+        logger.info(f"{backend.kind} response status: {res.status_code}")
+        ok = res.status_code < 500
+
+        if res.status_code != 200:
+            outcome = 'error'
+            error_msg = f"Ollama server returned status {res.status_code}"
+            try:
+                error_detail = res.json()
+                error_msg += f": {error_detail}"
+            except:
+                error_msg += f": {res.text}"
+            logger.error(error_msg)
+            yield "error", f"\n[Ollama Error: {error_msg}]\n"
+            yield "error", "\nPlease ensure:\n"
+            yield "error", "1. Ollama server is running (ollama serve)\n"
+            yield "error", f"2. Model '{model}' is installed (ollama pull {model})\n"
+            yield "error", f"3. Ollama is accessible at {url}\n"
+            yield "error", f"4. If you have limited memory, try: ollama pull llama2 (smaller model)\n"
+            return
+
+        parse_failed = False
+        for line, at_end in stream:
+            try:
+                content, usage = backend.parse_line(line)
+                if usage:
+                    stream_stats.reported(usage)
+                if content:
+                    stream_stats.chunk()
+                    yield "content", content
+            except Exception as parse_err:
+                parse_failed = True
+                if at_end:
                     logger.error(f"Parse error at end: {parse_err}")
-                    yield f"\n[Parse Error at end: {str(parse_err)}]\n"
-                    
+                    yield "error", f"\n[Parse Error at end: {str(parse_err)}]\n"
+                else:
+                    logger.error(f"Parse error: {parse_err}")
+                    yield "error", f"\n[Parse Error: {str(parse_err)}]\n"
+        outcome = 'error' if parse_failed else 'ok'
+        if stream_stats.usage.get('done_reason') == 'length':
+            yield "truncated", ""
+
     except requests.exceptions.ConnectionError as e:
-        error_msg = f"Could not connect to Ollama server at {url}"
+        ok = False
+        outcome = 'error'
+        if tried:
+            error_msg = f"Could not connect to Ollama server at {', '.join(b.url for b in tried)}"
+        else:
+            error_msg = f"No Ollama server is available for model '{model}'"
         logger.error(error_msg)
-        yield f"\n[Connection Error: {error_msg}]\n"
-        yield "\nTo fix this:\n"
-        yield "1. Start Ollama: ollama serve\n"
-        yield "2. Install model: ollama pull llama2 (smaller model)\n"
-        yield "3. Check if Ollama is running: ollama list\n"
-        
+        yield "error", f"\n[Connection Error: {error_msg}]\n"
+        yield "error", "\nTo fix this:\n"
+        yield "error", "1. Start Ollama: ollama serve\n"
+        yield "error", "2. Install model: ollama pull llama2 (smaller model)\n"
+        yield "error", "3. Check if Ollama is running: ollama list\n"
+
     except requests.exceptions.Timeout as e:
-        error_msg = f"Request to Ollama timed out after 60 seconds"
+        ok = False
+        outcome = 'error'
+        error_msg = f"Request to Ollama timed out after {OLLAMA_READ_TIMEOUT:g} seconds"
         logger.error(error_msg)
-        yield f"\n[Timeout Error: {error_msg}]\n"
-        yield "\nTry:\n"
-        yield "1. Check if Ollama is responding: curl http://localhost:11434/api/tags\n"
-        yield "2. Restart Ollama server\n"
-        
+        yield "error", f"\n[Timeout Error: {error_msg}]\n"
+        yield "error", "\nTry:\n"
+        yield "error", f"1. Check if Ollama is responding: curl {(backend or tried[-1]).url}/api/tags\n"
+        yield "error", "2. Restart Ollama server\n"
+
     except Exception as request_err:
+        outcome = 'error'
         error_msg = f"Unexpected error: {str(request_err)}"
         logger.error(error_msg)
-        yield f"\n[Request Error: {error_msg}]\n"
+        yield "error", f"\n[Request Error: {error_msg}]\n"
+
+    finally:
+        # Releases the pooled connection even if the client stops reading early
+        if stream is not None:
+            stream.close()
+        if backend is not None:
+            generation_seconds = (stream_stats.last_chunk - stream_stats.first_token
+                                  if stream_stats.first_token is not None else None)
+            backend_pool.finish(backend, model, ok, stream_stats.time_to_first_token,
+                                stream_stats.tokens, generation_seconds)
+        # After the pool has seen the model, so its first stream is labelled by name
+        stream_stats.finish(outcome)
+        generation_scheduler.release(ok, stream_stats.finished - stream_stats.started if ok else None, ticket)
+
+    if stats_line:
+        yield "stats", stream_stats.summary_line()
+
+
+def stream_chatbot_response(messages, model="llama2", client_id=None, options=None,
+                            endpoint='chatbot', stats_line=LLM_STATS_LINE):
+    """Stream the text of a chat completion, with queue and error messages (and stats) inline"""
+    for _, text in chat_events(messages, model, client_id, options, endpoint=endpoint, stats_line=stats_line):
+        if text:
+            yield text
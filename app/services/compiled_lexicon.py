@@ -0,0 +1,117 @@
+"""
+Compact, read-only word -> values tables.
+
+A compiled lexicon is a directory of NumPy `.npy` files:
+
+    words.npy        sorted fixed-width unicode array of the words
+    <column>.npy     one array per value column, aligned with words.npy
+    meta.json        column names, defaults and a format version
+
+Files are opened with `mmap_mode='r'`, so loading takes milliseconds and
+every worker on the host shares the same pages from the OS page cache.
+Lookups binary-search the sorted word array (`np.searchsorted`), one token
+or a whole token array at a time.
+"""
+import hashlib
+import json
+import os
+from functools import cached_property
+
+import numpy as np
+
+FORMAT_VERSION = 1
+
+
+class CompiledLexicon:
+    def __init__(self, words, columns, defaults):
+        self.words = words
+        self.columns = columns
+        self.defaults = defaults
+
+    @classmethod
+    def from_entries(cls, entries, defaults):
+        """
+        Build an in-memory lexicon from {word: {column: value}}.
+        Columns missing for a word take the column's default.
+        """
+        words = sorted(entries)
+        columns = {}
+        for name, default in defaults.items():
+            dtype = np.asarray(default).dtype
+            columns[name] = np.array([entries[w].get(name, default) for w in words], dtype=dtype)
+        word_array = np.array(words, dtype=str) if words else np.array([], dtype='<U1')
+        return cls(word_array, columns, dict(defaults))
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, 'words.npy'), self.words)
+        for name, values in self.columns.items():
+            np.save(os.path.join(directory, f'{name}.npy'), values)
+        meta = {
+            'format_version': FORMAT_VERSION,
+            'size': int(len(self.words)),
+            'columns': {name: np.asarray(default).item() for name, default in self.defaults.items()},
+        }
+        with open(os.path.join(directory, 'meta.json'), 'w') as f:
+            json.dump(meta, f, indent=2)
+
+    @classmethod
+    def load(cls, directory):
+        """Memory-map a compiled lexicon; raises OSError/ValueError if it is missing or incompatible"""
+        with open(os.path.join(directory, 'meta.json')) as f:
+            meta = json.load(f)
+        if meta.get('format_version') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported lexicon format {meta.get('format_version')} in {directory}")
+        words = np.load(os.path.join(directory, 'words.npy'), mmap_mode='r')
+        columns = {
+            name: np.load(os.path.join(directory, f'{name}.npy'), mmap_mode='r')
+            for name in meta['columns']
+        }
+        return cls(words, columns, meta['columns'])
+
+    def __len__(self):
+        return len(self.words)
+
+    @cached_property
+    def fingerprint(self):
+        """Short hash of the words and values, to tell apart results derived from different builds"""
+        digest = hashlib.sha1(np.ascontiguousarray(self.words).tobytes())
+        for name in sorted(self.columns):
+            digest.update(name.encode('utf-8'))
+            digest.update(np.ascontiguousarray(self.columns[name]).tobytes())
+        return digest.hexdigest()[:12]
+
+    def __contains__(self, word):
+        return self.index(word) >= 0
+
+    def index(self, word):
+        """Row of `word`, or -1"""
+        i = int(np.searchsorted(self.words, word))
+        if i < len(self.words) and self.words[i] == word:
+            return i
+        return -1
+
+    def get(self, word, column):
+        i = self.index(word)
+        if i < 0:
+            return self.defaults[column]
+        return self.columns[column][i].item()
+
+    def indices(self, tokens):
+        """Rows of every token as an int array, -1 where the token is not in the lexicon"""
+        if len(tokens) == 0 or len(self.words) == 0:
+            return np.full(len(tokens), -1, dtype=np.int64)
+        tokens = np.asarray(tokens, dtype=str)
+        rows = np.searchsorted(self.words, tokens)
+        rows = np.minimum(rows, len(self.words) - 1)
+        found = self.words[rows] == tokens
+        return np.where(found, rows, -1)
+
+    def lookup(self, tokens, column):
+        """Values of `column` for every token, with the column default for unknown tokens"""
+        rows = self.indices(tokens)
+        values = self.columns[column]
+        default = np.asarray(self.defaults[column], dtype=values.dtype)
+        if len(values) == 0:
+            return np.full(len(rows), default, dtype=values.dtype)
+        return np.where(rows >= 0, values[np.maximum(rows, 0)], default)
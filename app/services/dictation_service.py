@@ -1,41 +1,89 @@
 import difflib
 import re
-from collections import Counter
+from collections import deque
+from functools import lru_cache
 
 def normalize_apostrophes(text):
     return text.replace("’", "'").replace("`", "'")
 
+# Two words are a fuzzy match when their difflib ratio is at least this
+FUZZY_MATCH_RATIO = 0.75
+
+@lru_cache(maxsize=65536)
 def normalize_word(word, strip_period=True):
     word = word.lower().replace("’", "'").replace("`", "'").strip()
     if strip_period:
         word = word.rstrip(".")
     return re.sub(r"[^\w']+", "", word)
 
+@lru_cache(maxsize=65536)
+def _similarity(ref_norm, user_norm):
+    return difflib.SequenceMatcher(None, ref_norm, user_norm).ratio()
+
+def _fuzzy_lengths(length):
+    """
+    Lengths of words that can reach FUZZY_MATCH_RATIO against a word of `length`:
+    ratio = 2 * matches / (la + lb) and matches <= min(la, lb), so
+    8 * min(la, lb) >= 3 * (la + lb) is required.
+    """
+    return [other for other in range(length * 3 // 5, length * 5 // 3 + 1)
+            if 8 * min(length, other) >= 3 * (length + other)]
+
 def dictation_highlight(reference_text, user_speech):
+    """
+    Mark each user word as correct (first unused reference word with the same
+    normalized form), misspelled (unused reference word with the highest
+    similarity >= FUZZY_MATCH_RATIO, earliest on ties) or extra, then list the
+    unused reference words as missing.
+
+    Unused reference positions are kept in a queue per normalized form, and
+    the forms in a dict per length. Every match consumes the earliest unused
+    position of its form, so exact matches are a dict lookup and fuzzy
+    matching only compares forms of a compatible length, each once.
+    """
     reference_words = reference_text.split()
     user_speech_words = user_speech.split()
     word_highlight = []
     used_ref_indices = set()
+
+    unused = {}
+    for ref_idx, ref_word in enumerate(reference_words):
+        unused.setdefault(normalize_word(ref_word), deque()).append(ref_idx)
+    norms_by_length = {}
+    for ref_norm in unused:
+        norms_by_length.setdefault(len(ref_norm), set()).add(ref_norm)
+
     for user_word in user_speech_words:
         normalized_user = normalize_word(user_word)
         best_match = None
-        best_similarity = 0
-        best_idx = None
-        for ref_idx, ref_word in enumerate(reference_words):
-            if ref_idx not in used_ref_indices and normalized_user == normalize_word(ref_word):
-                best_match = "correct"
-                best_idx = ref_idx
-                break
-        if best_match is None:
-            for ref_idx, ref_word in enumerate(reference_words):
-                if ref_idx not in used_ref_indices:
-                    similarity = difflib.SequenceMatcher(None, normalize_word(ref_word), normalized_user).ratio()
-                    if similarity > best_similarity and similarity >= 0.75:
+        best_norm = None
+        if normalized_user in unused:
+            best_match = "correct"
+            best_norm = normalized_user
+        else:
+            best_similarity = 0
+            best_idx = None
+            for length in _fuzzy_lengths(len(normalized_user)):
+                for ref_norm in norms_by_length.get(length, ()):
+                    ref_idx = unused[ref_norm][0]
+                    # quick_ratio() is an upper bound on ratio()
+                    bound = difflib.SequenceMatcher(None, ref_norm, normalized_user).quick_ratio()
+                    if bound < FUZZY_MATCH_RATIO or bound < best_similarity:
+                        continue
+                    similarity = _similarity(ref_norm, normalized_user)
+                    if similarity < FUZZY_MATCH_RATIO:
+                        continue
+                    if similarity > best_similarity or (similarity == best_similarity and ref_idx < best_idx):
                         best_match = "misspelled"
                         best_similarity = similarity
                         best_idx = ref_idx
+                        best_norm = ref_norm
         if best_match is not None:
-            used_ref_indices.add(best_idx)
+            positions = unused[best_norm]
+            used_ref_indices.add(positions.popleft())
+            if not positions:
+                del unused[best_norm]
+                norms_by_length[len(best_norm)].discard(best_norm)
             word_highlight.append((user_word, best_match))
         else:
             word_highlight.append((user_word, "extra"))
@@ -44,6 +92,13 @@ def dictation_highlight(reference_text, user_speech):
             word_highlight.append((ref_word, "missing"))
     return word_highlight
 
+def precompute_reference_artifacts(reference):
+    """
+    Dictation grading needs nothing precomputed; registering a dictation
+    question only stores its reference for question_id lookups.
+    """
+    return {}
+
 def dictation_ai(user_text, reference_text):
     reference_text = normalize_apostrophes(reference_text)
     user_text = normalize_apostrophes(user_text)
@@ -64,19 +119,14 @@ def dictation_ai(user_text, reference_text):
         ref_word_count[norm_word] = ref_word_count.get(norm_word, 0) + 1
         ref_word_positions.append((norm_word, word, i))
     matched_count = {}
-    for word in user_words:
-        norm_word = normalize_word(word)
-        matched = False
-        for ref_norm in ref_word_count:
-            if norm_word == ref_norm:
-                current_matches = matched_count.get(ref_norm, 0)
-                if current_matches < ref_word_count[ref_norm]:
-                    matching_words.append(norm_word)
-                    word_highlights.append([word, "correct"])
-                    matched_count[ref_norm] = current_matches + 1
-                    matched = True
-                    break
-        if not matched:
+    user_norms = [normalize_word(word) for word in user_words]
+    for word, norm_word in zip(user_words, user_norms):
+        current_matches = matched_count.get(norm_word, 0)
+        if current_matches < ref_word_count.get(norm_word, 0):
+            matching_words.append(norm_word)
+            word_highlights.append([word, "correct"])
+            matched_count[norm_word] = current_matches + 1
+        else:
             word_highlights.append([word, "extra"])
     result_highlights = []
     current_user_pos = 0
@@ -85,7 +135,7 @@ def dictation_ai(user_text, reference_text):
         current_user_pos += 1
     for ref_norm, ref_orig, ref_pos in ref_word_positions:
         if ref_norm in matched_count and matched_count[ref_norm] > 0:
-            while current_user_pos < len(word_highlights) and normalize_word(word_highlights[current_user_pos][0]) != ref_norm:
+            while current_user_pos < len(word_highlights) and user_norms[current_user_pos] != ref_norm:
                 result_highlights.append(word_highlights[current_user_pos])
                 current_user_pos += 1
             if current_user_pos < len(word_highlights):
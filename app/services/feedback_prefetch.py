@@ -0,0 +1,49 @@
+"""
+Speculative SWT/SST feedback pre-generation, triggered by the scoring app.
+
+Students nearly always open the chatbot feedback right after an SWT/SST
+score. With FEEDBACK_PREFETCH_URL set to the chatbot app (for example
+http://127.0.0.1:6001), every successful /swt and /sst score posts the same
+reference and summary to its /chatbot/prefetch endpoint, which generates
+the feedback as low-priority background work and caches it under the key
+the later /swt_chatbot or /sst_chatbot request looks up. Unset, nothing is
+sent.
+
+The post is fire-and-forget on a daemon thread, so scoring responses never
+wait for it; failures are logged and otherwise ignored.
+"""
+import logging
+import os
+import threading
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+FEEDBACK_PREFETCH_URL = os.environ.get('FEEDBACK_PREFETCH_URL', '').rstrip('/')
+FEEDBACK_PREFETCH_TIMEOUT = float(os.environ.get('FEEDBACK_PREFETCH_TIMEOUT', '2'))
+
+
+def _post(payload):
+    try:
+        res = requests.post(f"{FEEDBACK_PREFETCH_URL}/chatbot/prefetch", json=payload,
+                            timeout=FEEDBACK_PREFETCH_TIMEOUT)
+        logger.debug(f"Feedback prefetch: {res.status_code} {res.text.strip()}")
+    except requests.RequestException as e:
+        logger.warning(f"Feedback prefetch failed: {e}")
+
+
+def prefetch_feedback(reference, summary, model=None, task_type=None, compress=None):
+    """
+    Ask the chatbot app to start generating feedback for this summary. Pass
+    the `model` and `compress` the student's chatbot request will use, or
+    the prefetched feedback is cached under a key nobody looks up.
+    """
+    if not FEEDBACK_PREFETCH_URL:
+        return
+    payload = {'reference': reference, 'summary': summary, 'task_type': task_type}
+    if model:
+        payload['model'] = model
+    if compress is not None:
+        payload['compress'] = compress
+    threading.Thread(target=_post, args=(payload,), name='feedback-prefetch', daemon=True).start()
@@ -0,0 +1,262 @@
+"""
+LLM feedback on SWT/SST summaries, cached and shared between identical requests.
+
+The feedback prompt is deterministic in (reference, summary), so completions
+are cached on a hash of the prompt messages and the model. A cache hit is
+replayed through the same text stream in small chunks at a steady cadence,
+without calling Ollama. Identical requests that arrive while a completion is
+still being generated attach to that generation instead of starting their
+own: the generation runs in the background, every request streams the shared
+text as it arrives, and the completion is cached when it finishes (failed
+generations are not cached). Generations go through the generation
+scheduler like any other chatbot request; queue position messages are
+streamed to the waiting requests but are not part of the cached completion.
+
+Set FEEDBACK_CACHE_DB to share cached completions between processes.
+
+With FEEDBACK_PROMPT_COMPRESSION=1 (or "compress": true in the request) the
+reference is cut down to its key ideas within a token budget before it goes
+into the prompt (see prompt_compression). Feedback generations are capped at
+FEEDBACK_MAX_TOKENS tokens and stop if the model starts echoing the prompt.
+
+prefetch() starts a feedback generation speculatively, as low-priority
+background work for the generation scheduler, so that the completion is
+already cached (or in flight) when the student asks for feedback. The
+scoring app triggers it through /chatbot/prefetch (see feedback_prefetch).
+If the student's request arrives while the speculative generation is still
+queued, it is promoted to an interactive one.
+"""
+import logging
+import os
+import threading
+import time
+from collections import Counter
+
+from app.services.chatbot_service import chat_events
+from app.services.generation_scheduler import generation_scheduler
+from app.services.prompt_compression import FEEDBACK_PROMPT_COMPRESSION, compress_reference
+from app.services.result_cache import ResultCache, cache_key
+
+logger = logging.getLogger(__name__)
+
+FEEDBACK_CACHE_SIZE = int(os.environ.get('FEEDBACK_CACHE_SIZE', '1024'))
+FEEDBACK_CACHE_DB = os.environ.get('FEEDBACK_CACHE_DB')
+FEEDBACK_CACHE_TTL = float(os.environ['FEEDBACK_CACHE_TTL']) if os.environ.get('FEEDBACK_CACHE_TTL') else None
+# Replay of cached completions: characters per chunk and seconds between chunks
+FEEDBACK_REPLAY_CHUNK_CHARS = int(os.environ.get('FEEDBACK_REPLAY_CHUNK_CHARS', '16'))
+FEEDBACK_REPLAY_INTERVAL = float(os.environ.get('FEEDBACK_REPLAY_INTERVAL', '0.02'))
+# Feedback, suggestions and a <=75-word sentence fit well within this (0 = uncapped)
+FEEDBACK_MAX_TOKENS = int(os.environ.get('FEEDBACK_MAX_TOKENS', '400'))
+# The model echoing the prompt's labels is rambling. Numbered markers such as
+# "\n4." are not stop sequences: part 2 is often a numbered list of its own.
+FEEDBACK_STOP = ["\nReference:", "\nSummary:"]
+
+feedback_cache = ResultCache(
+    'llm_feedback', max_entries=FEEDBACK_CACHE_SIZE, db_path=FEEDBACK_CACHE_DB, ttl=FEEDBACK_CACHE_TTL
+)
+# How each feedback request was served (cache, coalesced, generated) and
+# what became of each prefetch (prefetch_started, prefetch_cached, ...)
+feedback_stats = Counter()
+
+
+def summary_feedback_prompt(reference, summary, compress=None, task_type=None):
+    """Feedback prompt for a one-sentence summary (SWT and SST, given as `task_type`)"""
+    label = "Reference"
+    if FEEDBACK_PROMPT_COMPRESSION if compress is None else compress:
+        compressed = compress_reference(reference, task_type)
+        if compressed != reference:
+            reference, label = compressed, "Reference (key points)"
+    return (
+        f"{label}: {reference}\n"
+        f"Summary: {summary}\n"
+        "Please evaluate how well this summary captures the reference material, then provide:\n"
+        "1. Feedback on the summary's accuracy and writing quality\n"
+        "2. Specific suggestions for improvement\n"
+        "3. An improved version as a single, complete sentence (5-75 words)\n\n"
+        "Your improved version should:\n"
+        "- Cover all main points from the reference clearly\n"
+        "- Be grammatically correct\n"
+        "- Use appropriate, varied vocabulary\n"
+        "- Form exactly one complete sentence\n\n"
+        "Do not mention scores, marks, or rubric points in your response."
+    )
+
+
+class _Generation:
+    """
+    One completion being generated, readable by any number of requests while
+    it runs. Content and error chunks are buffered and replayed to every
+    reader; status lines (queue positions, stats) are only sent to the
+    readers attached when they arrive.
+    """
+
+    def __init__(self, ticket):
+        self.ticket = ticket
+        self.chunks = []
+        self.status = None
+        self.status_version = 0
+        self.done = False
+        self.failed = False
+        self.condition = threading.Condition()
+
+    def append(self, text):
+        with self.condition:
+            self.chunks.append(text)
+            self.condition.notify_all()
+
+    def announce(self, text):
+        with self.condition:
+            self.status = text
+            self.status_version += 1
+            self.condition.notify_all()
+
+    def finish(self):
+        with self.condition:
+            self.done = True
+            self.condition.notify_all()
+
+    def stream(self):
+        position = 0
+        with self.condition:
+            status_version = self.status_version
+        while True:
+            with self.condition:
+                while position == len(self.chunks) and status_version == self.status_version and not self.done:
+                    self.condition.wait()
+                new_chunks = self.chunks[position:]
+                position = len(self.chunks)
+                # Only the latest status line is current
+                status = self.status if status_version != self.status_version else None
+                status_version = self.status_version
+                done = self.done
+            yield from new_chunks
+            if status:
+                yield status
+            if done and position == len(self.chunks):
+                return
+
+
+_in_flight = {}
+_in_flight_lock = threading.Lock()
+
+
+def feedback_options():
+    """Generation caps for summary feedback"""
+    return {'max_tokens': FEEDBACK_MAX_TOKENS, 'stop': FEEDBACK_STOP}
+
+
+def _generate(key, messages, model, client_id, options, endpoint, generation):
+    content = []
+    try:
+        for kind, text in chat_events(messages, model, client_id, options, generation.ticket, endpoint):
+            if kind in ('error', 'truncated'):
+                # A completion cut off by FEEDBACK_MAX_TOKENS is streamed but not cached
+                generation.failed = True
+            elif kind in ('status', 'stats'):
+                generation.announce(text)
+                continue
+            elif kind == 'content':
+                content.append(text)
+            if text:
+                generation.append(text)
+    except Exception as e:
+        logger.error(f"Feedback generation failed: {e}")
+        generation.failed = True
+        generation.append(f"\n[Stream Error: {str(e)}]\n")
+    finally:
+        completion = ''.join(content)
+        if not generation.failed and completion:
+            feedback_cache.set(key, completion)
+        with _in_flight_lock:
+            if _in_flight.get(key) is generation:
+                del _in_flight[key]
+        generation.finish()
+
+
+def replay(completion, chunk_chars=FEEDBACK_REPLAY_CHUNK_CHARS, interval=FEEDBACK_REPLAY_INTERVAL):
+    """Stream a stored completion in fixed-size chunks at a steady cadence"""
+    for start in range(0, len(completion), chunk_chars):
+        if start and interval:
+            time.sleep(interval)
+        yield completion[start:start + chunk_chars]
+
+
+def _key(messages, model, options):
+    return cache_key(messages, model, options) if options else cache_key(messages, model)
+
+
+def is_ready(messages, model="llama2", options=None):
+    """True if stream_feedback would replay a cached completion or join one in flight"""
+    key = _key(messages, model, options)
+    return key in _in_flight or feedback_cache.get(key) is not None
+
+
+def stream_feedback(messages, model="llama2", client_id=None, options=None, endpoint='feedback'):
+    """
+    Drop-in for stream_chatbot_response for deterministic feedback prompts:
+    replays a cached completion, joins an identical generation in flight,
+    or starts a new one (queued under `client_id`, capped by `options`).
+    """
+    key = _key(messages, model, options)
+    completion = feedback_cache.get(key)
+    if completion is not None:
+        feedback_stats['cache'] += 1
+        yield from replay(completion)
+        return
+
+    with _in_flight_lock:
+        generation = _in_flight.get(key)
+        if generation is None:
+            generation = _in_flight[key] = _Generation(generation_scheduler.ticket(client_id))
+            start = True
+        else:
+            start = False
+    if not start and not generation_scheduler.promote(generation.ticket):
+        # A speculative generation still waiting for a slot now has someone
+        # waiting on it; if it was already given up, generate afresh instead
+        with _in_flight_lock:
+            if _in_flight.get(key) is generation:
+                generation = _in_flight[key] = _Generation(generation_scheduler.ticket(client_id))
+                start = True
+            else:
+                generation = _in_flight.get(key) or generation
+    if start:
+        feedback_stats['generated'] += 1
+        _start(key, messages, model, client_id, options, endpoint, generation)
+    else:
+        feedback_stats['coalesced'] += 1
+    yield from generation.stream()
+
+
+def _start(key, messages, model, client_id, options, endpoint, generation):
+    # Runs to completion (and fills the cache) even if the client disconnects
+    threading.Thread(target=_generate, args=(key, messages, model, client_id, options, endpoint, generation),
+                     name='feedback-generation', daemon=True).start()
+
+
+def prefetch(messages, model="llama2", options=None, client_id=None):
+    """
+    Start generating feedback in the background before anyone asks for it.
+    Returns 'cached' or 'in_flight' when there is nothing to do, 'busy' when
+    the scheduler has no room for background work, else 'started'.
+    """
+    key = _key(messages, model, options)
+    if feedback_cache.get(key) is not None:
+        status = 'cached'
+    elif generation_scheduler.admission(background=True) is not None:
+        status = 'busy'
+    else:
+        with _in_flight_lock:
+            if key in _in_flight:
+                status = 'in_flight'
+            else:
+                generation = _in_flight[key] = _Generation(generation_scheduler.ticket(client_id, background=True))
+                status = 'started'
+        if status == 'started':
+            _start(key, messages, model, client_id, options, 'prefetch', generation)
+    feedback_stats[f'prefetch_{status}'] += 1
+    return status
+
+
+def stats():
+    return {'requests': dict(feedback_stats), 'in_flight': len(_in_flight), 'cache': feedback_cache.stats()}
@@ -0,0 +1,374 @@
+"""
+Admission control in front of the LLM backend.
+
+Every Ollama generation takes a slot from the scheduler. At most
+GENERATION_MAX_CONCURRENCY run at once; the rest wait in a bounded queue
+(GENERATION_QUEUE_SIZE) that is served round-robin across clients, so one
+client submitting many requests cannot starve the others. While a request
+waits, its stream is told its place in the queue.
+
+Requests are rejected early instead of timing out:
+
+  * 429 with Retry-After when the queue is full (estimated from recent
+    generation times),
+  * 503 with Retry-After while the circuit breaker is open: after
+    GENERATION_BREAKER_THRESHOLD consecutive backend failures (connection
+    errors, timeouts, 5xx), requests fail fast for GENERATION_BREAKER_COOLDOWN
+    seconds, then a single trial request decides whether it closes again.
+    Requests already queued when the breaker opens are rejected the same
+    way instead of being sent to the failing backend.
+
+Background generations (speculative feedback pre-generation) get the
+leftovers: they are only started when no interactive request is waiting,
+never take the last GENERATION_INTERACTIVE_RESERVE slots, and while queued
+are cancelled as soon as an interactive request has to wait. A queued (or
+cancelled but still waiting) background generation that an interactive
+request starts waiting on is promoted to an interactive one.
+"""
+import logging
+import math
+import os
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+
+logger = logging.getLogger(__name__)
+
+GENERATION_MAX_CONCURRENCY = int(os.environ.get('GENERATION_MAX_CONCURRENCY', '4'))
+GENERATION_QUEUE_SIZE = int(os.environ.get('GENERATION_QUEUE_SIZE', '64'))
+GENERATION_QUEUE_TIMEOUT = float(os.environ.get('GENERATION_QUEUE_TIMEOUT', '120'))
+GENERATION_BREAKER_THRESHOLD = int(os.environ.get('GENERATION_BREAKER_THRESHOLD', '3'))
+GENERATION_BREAKER_COOLDOWN = float(os.environ.get('GENERATION_BREAKER_COOLDOWN', '30'))
+GENERATION_BACKGROUND_QUEUE_SIZE = int(os.environ.get('GENERATION_BACKGROUND_QUEUE_SIZE', '32'))
+# Slots background generations leave free for interactive requests
+GENERATION_INTERACTIVE_RESERVE = int(os.environ.get('GENERATION_INTERACTIVE_RESERVE', '1'))
+# Seconds between queue position updates sent to a waiting stream
+GENERATION_POSITION_INTERVAL = float(os.environ.get('GENERATION_POSITION_INTERVAL', '5'))
+
+
+class GenerationRejected(Exception):
+    """A generation was not admitted; `status` is the HTTP status to answer with"""
+
+    def __init__(self, status, message, retry_after):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.retry_after = retry_after
+
+
+class _Ticket:
+    __slots__ = ('client_id', 'background', 'granted', 'trial', 'cancelled', 'abandoned', 'rejection')
+
+    def __init__(self, client_id, background=False):
+        self.client_id = client_id
+        self.background = background
+        self.granted = False
+        self.trial = False
+        self.cancelled = False
+        # acquire() has given up on this ticket; it can no longer be granted
+        self.abandoned = False
+        # Set when the breaker opened while this ticket was queued
+        self.rejection = None
+
+
+class GenerationScheduler:
+    def __init__(self, max_concurrency=GENERATION_MAX_CONCURRENCY, max_queue=GENERATION_QUEUE_SIZE,
+                 queue_timeout=GENERATION_QUEUE_TIMEOUT, breaker_threshold=GENERATION_BREAKER_THRESHOLD,
+                 breaker_cooldown=GENERATION_BREAKER_COOLDOWN, max_background=GENERATION_BACKGROUND_QUEUE_SIZE):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self.max_background = max_background
+        self._condition = threading.Condition()
+        self._queues = OrderedDict()  # client id -> deque of waiting tickets, in round-robin order
+        self._queued = 0
+        self._background = deque()  # waiting background tickets, served after every client queue
+        self.active = 0
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        # Moving average of generation time, for Retry-After estimates
+        self.average_seconds = 20.0
+        self.counts = Counter()
+
+    # --- circuit breaker -------------------------------------------------
+
+    def _breaker_rejection(self):
+        """Rejection while the breaker is open, or None; a half-open breaker admits one trial"""
+        if self.opened_at is None:
+            return None
+        remaining = self.opened_at + self.breaker_cooldown - time.monotonic()
+        if remaining <= 0 and not self._trial_running:
+            return None
+        retry_after = max(1, math.ceil(remaining)) if remaining > 0 else 1
+        return GenerationRejected(503, "The model server is temporarily unavailable", retry_after)
+
+    def _record(self, ok, seconds, trial=False):
+        """Feed one finished generation to the breaker; `trial` marks the half-open trial"""
+        if trial:
+            # Only the trial itself ends the half-open state; other requests
+            # that were already running finish without letting a second one in
+            self._trial_running = False
+        if ok:
+            self.consecutive_failures = 0
+            self.opened_at = None
+            if seconds is not None:
+                self.average_seconds = 0.8 * self.average_seconds + 0.2 * seconds
+        elif ok is not None:
+            self.consecutive_failures += 1
+            if trial or self.consecutive_failures >= self.breaker_threshold:
+                if self.opened_at is None or trial:
+                    self.counts['breaker_opened'] += 1
+                    logger.warning(f"LLM backend failed {self.consecutive_failures} times, "
+                                   f"failing fast for {self.breaker_cooldown:g}s")
+                self.opened_at = time.monotonic()
+                self._reject_waiting()
+
+    def _reject_waiting(self):
+        """Fail every queued ticket now that the breaker is open"""
+        rejection = self._breaker_rejection()
+        waiting = [ticket for queue in self._queues.values() for ticket in queue if not ticket.trial]
+        waiting += self._background
+        for ticket in waiting:
+            ticket.rejection = rejection
+            self._withdraw(ticket)
+
+    # --- queueing --------------------------------------------------------
+
+    def _queue_rejection(self):
+        if self._queued < self.max_queue:
+            return None
+        retry_after = max(1, math.ceil(self.average_seconds * (self._queued + 1) / self.max_concurrency))
+        return GenerationRejected(429, "Too many requests are waiting for the model; please retry shortly", retry_after)
+
+    def _background_rejection(self):
+        if self.opened_at is not None:
+            return GenerationRejected(503, "The model server is temporarily unavailable", 1)
+        if self._queued or len(self._background) >= self.max_background:
+            return GenerationRejected(429, "The model is busy with interactive requests",
+                                      max(1, math.ceil(self.average_seconds)))
+        return None
+
+    def admission(self, background=False):
+        """The rejection a new generation would get right now, or None"""
+        with self._condition:
+            if background:
+                return self._background_rejection()
+            return self._breaker_rejection() or self._queue_rejection()
+
+    def ticket(self, client_id, background=False):
+        """A place in line for one generation, to pass to acquire()"""
+        return _Ticket(client_id, background)
+
+    def _dispatch(self):
+        if self.opened_at is not None:
+            # Only the half-open trial may reach the backend while the breaker is open
+            trial = next((ticket for queue in self._queues.values() for ticket in queue if ticket.trial), None)
+            if trial is not None and self.active < self.max_concurrency:
+                queue = self._queues[trial.client_id]
+                queue.remove(trial)
+                self._queued -= 1
+                if not queue:
+                    del self._queues[trial.client_id]
+                trial.granted = True
+                self.active += 1
+            self._condition.notify_all()
+            return
+        while self.active < self.max_concurrency and self._queues:
+            client_id, queue = next(iter(self._queues.items()))
+            ticket = queue.popleft()
+            self._queued -= 1
+            if queue:
+                self._queues.move_to_end(client_id)
+            else:
+                del self._queues[client_id]
+            ticket.granted = True
+            self.active += 1
+        background_slots = max(1, self.max_concurrency - GENERATION_INTERACTIVE_RESERVE)
+        while self._background and not self._queues and self.active < background_slots:
+            self._background.popleft().granted = True
+            self.active += 1
+        self._condition.notify_all()
+
+    def _cancel_background(self):
+        for ticket in self._background:
+            ticket.cancelled = True
+        self.counts['background_cancelled'] += len(self._background)
+        self._background.clear()
+
+    def _enqueue(self, ticket):
+        if ticket.background:
+            self._background.append(ticket)
+        else:
+            self._queues.setdefault(ticket.client_id, deque()).append(ticket)
+            self._queued += 1
+
+    def promote(self, ticket):
+        """
+        Make a background ticket interactive (someone is now waiting on its
+        result). A cancelled ticket whose acquire() is still waiting is put
+        back in line. Returns False if the ticket was already abandoned, in
+        which case its generation fails and has to be started again.
+        """
+        with self._condition:
+            if ticket.abandoned:
+                return False
+            if not ticket.background:
+                return True
+            ticket.background = False
+            if ticket in self._background:
+                self._background.remove(ticket)
+                self._enqueue(ticket)
+                self._dispatch()
+            elif ticket.cancelled:
+                # Dropped from the background queue, but acquire() has not noticed yet
+                ticket.cancelled = False
+                self._enqueue(ticket)
+                self._dispatch()
+            self.counts['promoted'] += 1
+            return True
+
+    def _position(self, ticket):
+        """Number of waiting tickets that will be granted before `ticket`"""
+        if ticket in self._background:
+            return self._queued + self._background.index(ticket)
+        queue = self._queues.get(ticket.client_id)
+        if queue is None or ticket not in queue:
+            return 0
+        index = queue.index(ticket)
+        ahead = 0
+        before_client = True
+        for client_id, other in self._queues.items():
+            if client_id == ticket.client_id:
+                before_client = False
+                ahead += index
+                continue
+            ahead += min(len(other), index + 1 if before_client else index)
+        return ahead
+
+    def _withdraw(self, ticket):
+        if ticket.trial:
+            self._trial_running = False
+        if ticket in self._background:
+            self._background.remove(ticket)
+            return
+        queue = self._queues.get(ticket.client_id)
+        if queue is not None and ticket in queue:
+            queue.remove(ticket)
+            self._queued -= 1
+            if not queue:
+                del self._queues[ticket.client_id]
+
+    def acquire(self, ticket):
+        """
+        Wait for a generation slot for `ticket` (see ticket()). Yields the queue position (tickets ahead)
+        whenever it changes while waiting (checked every
+        GENERATION_POSITION_INTERVAL seconds), and returns
+        once the slot is held; call release() when the generation ends.
+        Closing the generator while it waits gives up the place in the queue.
+        Raises GenerationRejected when the breaker is open (or opens while
+        the ticket waits), the queue is full, the wait exceeds the queue
+        timeout or a background ticket is cancelled.
+        """
+        with self._condition:
+            if ticket.background:
+                rejection = self._background_rejection()
+            else:
+                rejection = self._breaker_rejection() or self._queue_rejection()
+            if rejection is not None:
+                ticket.abandoned = True
+                self.counts[f"{'background_' if ticket.background else ''}rejected_{rejection.status}"] += 1
+                raise rejection
+            if self.opened_at is not None:
+                # Half-open: this request is the trial
+                ticket.trial = self._trial_running = True
+            self._enqueue(ticket)
+            self._dispatch()
+            if not ticket.granted and not ticket.background:
+                # Interactive requests are waiting: drop speculative work
+                self._cancel_background()
+        deadline = time.monotonic() + self.queue_timeout
+        last_position = None
+        try:
+            while True:
+                with self._condition:
+                    if ticket.cancelled:
+                        ticket.abandoned = True
+                        raise GenerationRejected(429, "Background generation cancelled: the model is busy",
+                                                 max(1, math.ceil(self.average_seconds)))
+                    if ticket.rejection is not None:
+                        ticket.abandoned = True
+                        self.counts[f"{'background_' if ticket.background else ''}rejected_503"] += 1
+                        raise ticket.rejection
+                    if not ticket.granted:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            ticket.abandoned = True
+                            self._withdraw(ticket)
+                            self.counts['rejected_timeout'] += 1
+                            raise GenerationRejected(
+                                429, "Timed out waiting for the model; please retry shortly",
+                                max(1, math.ceil(self.average_seconds))
+                            )
+                        self._condition.wait(min(remaining, GENERATION_POSITION_INTERVAL))
+                    if ticket.cancelled or ticket.rejection is not None:
+                        continue
+                    if ticket.granted:
+                        self.counts['background_admitted' if ticket.background else 'admitted'] += 1
+                        return
+                    position = self._position(ticket)
+                if position != last_position:
+                    last_position = position
+                    yield position
+        except GeneratorExit:
+            # The client went away while queued (or just after being granted)
+            with self._condition:
+                ticket.abandoned = True
+                if ticket.granted:
+                    self.active -= 1
+                    self._record(None, None, ticket.trial)
+                    self._dispatch()
+                else:
+                    self._withdraw(ticket)
+            raise
+
+    def release(self, ok=None, seconds=None, ticket=None):
+        """
+        Give back a slot. `ok` feeds the circuit breaker: True when the
+        backend answered, False on connection errors, timeouts and 5xx,
+        None when the generation was abandoned. `seconds` is the generation
+        time of a successful call, used for Retry-After estimates. `ticket`
+        is the one the slot was acquired with, so the end of the half-open
+        trial is recognised.
+        """
+        with self._condition:
+            self.active -= 1
+            self._record(ok, seconds, ticket is not None and ticket.trial)
+            self._dispatch()
+
+    def stats(self):
+        with self._condition:
+            if self.opened_at is None:
+                breaker = 'closed'
+            elif time.monotonic() - self.opened_at >= self.breaker_cooldown:
+                breaker = 'half-open'
+            else:
+                breaker = 'open'
+            return {
+                'active': self.active,
+                'queued': self._queued,
+                'queued_clients': len(self._queues),
+                'background_queued': len(self._background),
+                'max_concurrency': self.max_concurrency,
+                'max_queue': self.max_queue,
+                'breaker': breaker,
+                'consecutive_failures': self.consecutive_failures,
+                'average_generation_seconds': round(self.average_seconds, 2),
+                'counts': dict(self.counts),
+            }
+
+
+# Shared by every generation in this worker
+generation_scheduler = GenerationScheduler()
@@ -0,0 +1,302 @@
+"""
+Fast in-process pre-screen that runs in front of the LanguageTool check.
+
+A text is declared clean only when every rule below passes; anything else
+falls through to the full LanguageTool check. The policy is deliberately
+conservative:
+
+  * short texts only (GRAMMAR_PRESCREEN_MAX_WORDS)
+  * plain ASCII, ends with sentence punctuation, no quotes or brackets
+  * every word is in the dictionary (nltk `words` + WordNet inflections)
+  * no commonly confused words (its/it's, their/there, then/than, ...)
+  * none of the precompiled grammar/typography heuristics match
+  * every finite verb is accounted for by the POS-based agreement check:
+    its subject is a simple noun phrase or pronoun directly in front of it
+    (or shared with the previous verb through a conjunction) and agrees in
+    number; base-form verbs must follow a modal, `to` or a form of `do`
+
+Anything the agreement check cannot attribute (relative clauses,
+prepositional phrases between subject and verb, coordinated subjects,
+existential `there`, contractions) falls through to LanguageTool.
+
+Decisions are counted in `prescreen_stats` so the skip rate and the reasons
+for falling through can be monitored (see /grammar/stats).
+"""
+import logging
+import os
+import re
+import threading
+from collections import Counter
+
+import nltk
+
+logger = logging.getLogger(__name__)
+
+GRAMMAR_PRESCREEN_MAX_WORDS = int(os.environ.get('GRAMMAR_PRESCREEN_MAX_WORDS', '40'))
+
+WORD_PATTERN = re.compile(r"[A-Za-z]+(?:'[A-Za-z]+)*")
+TOKEN_PATTERN = re.compile(r"[A-Za-z]+(?:'[A-Za-z]+)*|[0-9]+|[,.;:!?]")
+NON_PLAIN_TEXT = re.compile(r'[^A-Za-z0-9 ,.;:!?\'-]')
+SENTENCE_END = re.compile(r'[.!?]$')
+
+# Precompiled heuristics for errors LanguageTool reports as grammar/typographical.
+# Any match sends the text on to LanguageTool.
+HEURISTICS = {
+    'repeated_word': re.compile(r'\b(\w+)\s+\1\b', re.IGNORECASE),
+    'a_before_vowel': re.compile(r'\ba\s+[aeiou]', re.IGNORECASE),
+    'an_before_consonant': re.compile(r'\ban\s+[^aeiou\s]', re.IGNORECASE),
+    'double_determiner': re.compile(r'\b(?:a|an|the)\s+(?:a|an|the)\b', re.IGNORECASE),
+    'lowercase_i': re.compile(r"\bi\b(?:'\w+)?"),
+    'lowercase_sentence_start': re.compile(r'(?:^|[.!?]\s+)[a-z]'),
+    'modal_of': re.compile(r'\b(?:could|would|should|must|might)\s+of\b', re.IGNORECASE),
+    'third_person_agreement': re.compile(r"\b(?:he|she|it)\s+(?:have|do|are|were|don't)\b", re.IGNORECASE),
+    'plural_agreement': re.compile(r"\b(?:you|we|they)\s+(?:has|does|is|was|doesn't)\b", re.IGNORECASE),
+    'first_person_agreement': re.compile(r"\bI\s+(?:has|does|is|are|doesn't)\b"),
+    'singular_subject_plural_verb': re.compile(
+        r'\b(?:the|a|an|this|that|each|every)\s+(?:\w+\s+)?\w+(?<!s)\s+(?:are|were|have|do|don\'t)\b', re.IGNORECASE),
+    'plural_subject_singular_verb': re.compile(
+        r"\b(?:these|those|many|several|both)\s+\w+s\s+(?:is|was|has|does|doesn't)\b", re.IGNORECASE),
+    'double_comparative': re.compile(r'\b(?:more|most)\s+\w+(?:er|est)\b', re.IGNORECASE),
+    'whitespace': re.compile(r'\s{2,}|\s[,.;:!?]|^\s|\s$'),
+    'missing_space_after_punctuation': re.compile(r'[,;:](?=[A-Za-z])|[.!?](?=[A-Za-z])'),
+    'repeated_punctuation': re.compile(r'[,;:]\s*[,.;:!?]|[.!?]{2,}'),
+}
+
+# Words LanguageTool has dedicated confusion rules for
+CONFUSABLE_WORDS = frozenset({
+    'its', "it's", 'your', "you're", 'their', 'there', "they're", 'then', 'than',
+    'whose', "who's", 'lose', 'loose', 'affect', 'effect', 'accept', 'except',
+    'weather', 'whether', 'were', 'where', "we're", 'advice', 'advise', 'alot',
+    'everyday', 'principal', 'principle', 'compliment', 'complement', 'past', 'passed',
+})
+
+CONTRACTION_SUFFIXES = ("'s", "'re", "'ve", "'ll", "'d", "'m", "n't")
+IRREGULAR_CONTRACTIONS = frozenset({"can't", "won't", "shan't", "ain't", "let's"})
+
+# Closed-class words that are not always present in the nltk word list
+FUNCTION_WORDS = frozenset({
+    'a', 'an', 'the', 'and', 'or', 'but', 'nor', 'so', 'yet', 'if', 'as', 'of', 'to', 'in', 'on',
+    'at', 'by', 'for', 'with', 'from', 'into', 'onto', 'about', 'than', 'that', 'this', 'these',
+    'those', 'i', 'me', 'my', 'we', 'us', 'our', 'you', 'your', 'he', 'him', 'his', 'she', 'her',
+    'it', 'its', 'they', 'them', 'their', 'is', 'are', 'was', 'were', 'be', 'been', 'being',
+    'has', 'have', 'had', 'does', 'do', 'did', 'will', 'would', 'can', 'could', 'should',
+    'may', 'might', 'must', 'shall', 'not', 'which', 'who', 'whom', 'whose', 'what', 'while',
+})
+
+# Penn Treebank tags that may make up a simple subject noun phrase
+NOUN_PHRASE_TAGS = frozenset({'DT', 'PDT', 'JJ', 'JJR', 'JJS', 'CD', 'PRP$', 'POS', 'NN', 'NNS', 'NNP', 'NNPS'})
+ADVERB_TAGS = frozenset({'RB', 'RBR', 'RBS'})
+SINGULAR_HEADS = frozenset({'NN', 'NNP'})
+PLURAL_HEADS = frozenset({'NNS', 'NNPS'})
+SINGULAR_PRONOUNS = frozenset({'he', 'she', 'it', 'this', 'that'})
+PLURAL_PRONOUNS = frozenset({'we', 'they', 'these', 'those'})
+# Words that may open a clause in front of its subject
+CLAUSE_OPENERS = frozenset({
+    'that', 'because', 'although', 'though', 'while', 'when', 'whereas', 'if', 'since',
+    'but', 'yet', 'so', 'once', 'unless', 'until',
+})
+CLAUSE_PUNCTUATION = frozenset({',', ';', ':'})
+COORDINATORS = frozenset({'and', 'or', 'but'})
+DO_FORMS = frozenset({'do', 'does', 'did'})
+
+prescreen_stats = Counter()
+_stats_lock = threading.Lock()
+
+_dictionary = None
+_morphy = None
+_tagger = None
+_dictionary_lock = threading.Lock()
+_dictionary_failed = False
+
+
+def download_resources():
+    """Fetch the nltk corpora and tagger the pre-screen needs, if missing (run at startup)"""
+    # Newer nltk releases load the tagger from the *_eng resource
+    for path, resource in (('corpora/words', 'words'), ('corpora/wordnet', 'wordnet'),
+                           ('taggers/averaged_perceptron_tagger', 'averaged_perceptron_tagger'),
+                           ('taggers/averaged_perceptron_tagger_eng', 'averaged_perceptron_tagger_eng')):
+        try:
+            nltk.data.find(path)
+        except LookupError:
+            nltk.download(resource, quiet=True)
+
+
+def _load_dictionary():
+    """
+    Load the nltk word list, WordNet and tagger once per process; None if
+    unavailable. Nothing is downloaded here (see download_resources()).
+    """
+    global _dictionary, _morphy, _tagger, _dictionary_failed
+    if _dictionary is not None or _dictionary_failed:
+        return _dictionary
+    with _dictionary_lock:
+        if _dictionary is not None or _dictionary_failed:
+            return _dictionary
+        try:
+            from nltk.corpus import words, wordnet
+            from nltk.tag.perceptron import PerceptronTagger
+            _tagger = PerceptronTagger()
+            dictionary = {w.lower() for w in words.words()}
+            dictionary |= FUNCTION_WORDS
+            wordnet.ensure_loaded()
+            _morphy = wordnet.morphy
+            _dictionary = frozenset(dictionary)
+            logger.info(f"Grammar pre-screen dictionary loaded ({len(_dictionary)} words)")
+        except (LookupError, OSError, ValueError) as e:
+            logger.warning(f"Grammar pre-screen disabled, dictionary unavailable: {e}")
+            _dictionary_failed = True
+    return _dictionary
+
+
+def is_known_word(word, dictionary):
+    word = word.lower()
+    if word in dictionary:
+        return True
+    if "'" in word:
+        if word in IRREGULAR_CONTRACTIONS:
+            return True
+        for suffix in CONTRACTION_SUFFIXES:
+            if word.endswith(suffix):
+                return is_known_word(word[:-len(suffix)], dictionary)
+        return False
+    return _morphy(word) is not None
+
+
+def _subject_before(tagged, index):
+    """
+    Find the subject of the finite verb at `index`: a simple noun phrase or
+    pronoun that starts a clause and ends right before the verb (adverbs
+    allowed in between). Returns (word, tag) of its head, or None when the
+    subject cannot be attributed with confidence.
+    """
+    j = index - 1
+    while j >= 0 and tagged[j][1] in ADVERB_TAGS:
+        j -= 1
+    if j < 0:
+        return None
+    head_word, head_tag = tagged[j]
+    lower = head_word.lower()
+    if head_tag == 'PRP' or (head_tag == 'DT' and lower in SINGULAR_PRONOUNS | PLURAL_PRONOUNS):
+        start = j
+    elif head_tag in SINGULAR_HEADS | PLURAL_HEADS:
+        start = j
+        while start > 0 and tagged[start - 1][1] in NOUN_PHRASE_TAGS and tagged[start - 1][0].lower() != 'that':
+            start -= 1
+    else:
+        return None
+    if start > 0:
+        before_word, before_tag = tagged[start - 1]
+        if before_tag not in CLAUSE_PUNCTUATION and before_word.lower() not in CLAUSE_OPENERS:
+            return None
+    return lower, head_tag
+
+
+def _agrees(verb, verb_tag, subject):
+    """True if the finite verb agrees in number with the subject head"""
+    word, tag = subject
+    singular = tag in SINGULAR_HEADS or word in SINGULAR_PRONOUNS
+    plural = tag in PLURAL_HEADS or word in PLURAL_PRONOUNS
+    verb = verb.lower()
+    if verb_tag == 'VBZ':
+        return singular
+    if verb == 'am':
+        return word == 'i'
+    if verb_tag == 'VBP':
+        return plural or word in ('i', 'you')
+    if verb == 'was':
+        return singular or word == 'i'
+    if verb == 'were':
+        return plural or word == 'you'
+    # Other past-tense forms do not inflect for number
+    return verb_tag == 'VBD'
+
+
+def check_agreement(tokens):
+    """
+    Return True when every finite verb in `tokens` is attributed to a subject
+    it agrees with and every base-form verb is licensed; False otherwise.
+    """
+    tagged = _tagger.tag(tokens)
+    subject = None
+    verified = 0
+    for index, (word, tag) in enumerate(tagged):
+        if tag == '.':
+            # Each sentence needs at least one verified finite verb
+            if not verified:
+                return False
+            subject, verified = None, 0
+            continue
+        if tag == 'VB':
+            j = index - 1
+            while j >= 0 and tagged[j][1] in ADVERB_TAGS:
+                j -= 1
+            if j < 0 or not (tagged[j][1] in ('MD', 'TO') or tagged[j][0].lower() in DO_FORMS):
+                return False
+            continue
+        if tag not in ('VBZ', 'VBP', 'VBD'):
+            continue
+        found = _subject_before(tagged, index)
+        if found is None:
+            # A verb coordinated with the previous one shares its subject
+            j = index - 1
+            while j >= 0 and tagged[j][1] in ADVERB_TAGS:
+                j -= 1
+            if subject is None or j < 0 or tagged[j][0].lower() not in COORDINATORS:
+                return False
+            found = subject
+        if not _agrees(word, tag, found):
+            return False
+        subject = found
+        verified += 1
+    return True
+
+
+def screen(text):
+    """
+    Return (clean, reason). `clean` is True only when the text can skip the
+    LanguageTool check; otherwise `reason` names the rule that sent it on.
+    """
+    dictionary = _load_dictionary()
+    if dictionary is None:
+        return False, 'no_dictionary'
+    words = WORD_PATTERN.findall(text)
+    if not words:
+        return False, 'empty'
+    if len(words) > GRAMMAR_PRESCREEN_MAX_WORDS:
+        return False, 'too_long'
+    if NON_PLAIN_TEXT.search(text) or not SENTENCE_END.search(text):
+        return False, 'punctuation'
+    for name, pattern in HEURISTICS.items():
+        if pattern.search(text):
+            return False, name
+    for word in words:
+        lower = word.lower()
+        if lower in CONFUSABLE_WORDS:
+            return False, 'confusable_word'
+        if not is_known_word(lower, dictionary):
+            return False, 'unknown_word'
+        if "'" in word:
+            return False, 'contraction'
+    if not check_agreement(TOKEN_PATTERN.findall(text)):
+        return False, 'agreement'
+    return True, 'clean'
+
+
+def prescreen(text):
+    """True if the text is clean under the pre-screen policy; records the decision"""
+    clean, reason = screen(text)
+    with _stats_lock:
+        prescreen_stats[reason] += 1
+    return clean
+
+
+def decisions():
+    """Snapshot of the pre-screen decision counts by reason"""
+    with _stats_lock:
+        return dict(prescreen_stats)
+
+
+def warm_up():
+    """Download and load everything the pre-screen needs, outside any request"""
+    download_resources()
+    return _load_dictionary() is not None
@@ -0,0 +1,140 @@
+"""
+Managed LanguageTool HTTP server shared by every worker on the host.
+
+Run under pm2 (see ecosystem.config.js):
+
+    python -m app.services.grammar_server --port 8081
+
+The supervisor starts the LanguageTool JVM, polls its health endpoint and
+restarts it when the process exits or stops answering. Workers talk to it
+through app.services.grammar_service.
+"""
+import argparse
+import glob
+import logging
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import time
+
+import requests
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+HEALTH_CHECK_INTERVAL = float(os.environ.get('LANGUAGETOOL_HEALTH_INTERVAL', '10'))
+HEALTH_CHECK_FAILURES = int(os.environ.get('LANGUAGETOOL_HEALTH_FAILURES', '3'))
+STARTUP_TIMEOUT = float(os.environ.get('LANGUAGETOOL_STARTUP_TIMEOUT', '60'))
+JAVA_HEAP = os.environ.get('LANGUAGETOOL_HEAP', '1g')
+
+JAR_NAMES = ['languagetool-server.jar', 'languagetool-standalone*.jar']
+
+
+def _find_jar():
+    """Locate the LanguageTool server jar (LTP_JAR_DIR_PATH, or language_tool_python's download folder)"""
+    if os.environ.get('LTP_JAR_DIR_PATH'):
+        search_dirs = [os.environ['LTP_JAR_DIR_PATH']]
+    else:
+        download_dir = os.environ.get('LTP_PATH', os.path.expanduser('~/.cache/language_tool_python'))
+        search_dirs = sorted(glob.glob(os.path.join(download_dir, 'LanguageTool-*')), reverse=True)
+    for directory in search_dirs:
+        for name in JAR_NAMES:
+            matches = glob.glob(os.path.join(directory, name))
+            if matches:
+                return matches[0]
+    return None
+
+
+def _ensure_downloaded():
+    """Let language_tool_python download LanguageTool, then shut its private server down"""
+    import language_tool_python
+    logger.info("LanguageTool not found locally, downloading via language_tool_python...")
+    tool = language_tool_python.LanguageTool('en-US')
+    tool.close()
+
+
+def server_command(port):
+    java = shutil.which('java')
+    if not java:
+        raise RuntimeError("Java is required to run the LanguageTool server")
+    jar = _find_jar()
+    if jar is None:
+        _ensure_downloaded()
+        jar = _find_jar()
+    if jar is None:
+        raise RuntimeError("Could not locate the LanguageTool server jar")
+    return [java, f'-Xmx{JAVA_HEAP}', '-cp', jar, 'org.languagetool.server.HTTPServer',
+            '--port', str(port), '--allow-origin', '*']
+
+
+def is_healthy(port):
+    try:
+        res = requests.get(f'http://127.0.0.1:{port}/v2/languages', timeout=5)
+        return res.status_code == 200
+    except requests.RequestException:
+        return False
+
+
+def _stop(process):
+    if process.poll() is None:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def _start(cmd, port):
+    logger.info(f"Starting LanguageTool server: {' '.join(cmd)}")
+    process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL)
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            logger.error(f"LanguageTool server exited during startup with code {process.returncode}")
+            return process
+        if is_healthy(port):
+            logger.info(f"✅ LanguageTool server ready on port {port}")
+            return process
+        time.sleep(0.5)
+    logger.error("LanguageTool server did not become healthy in time")
+    return process
+
+
+def supervise(port):
+    cmd = server_command(port)
+    process = _start(cmd, port)
+
+    def shutdown(signum, frame):
+        _stop(process)
+        sys.exit(0)
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    failures = 0
+    while True:
+        time.sleep(HEALTH_CHECK_INTERVAL)
+        if process.poll() is not None:
+            logger.warning(f"LanguageTool server exited with code {process.returncode}, restarting")
+            process = _start(cmd, port)
+            failures = 0
+            continue
+        if is_healthy(port):
+            failures = 0
+            continue
+        failures += 1
+        logger.warning(f"LanguageTool health check failed ({failures}/{HEALTH_CHECK_FAILURES})")
+        if failures >= HEALTH_CHECK_FAILURES:
+            logger.warning("LanguageTool server is unresponsive, restarting")
+            _stop(process)
+            process = _start(cmd, port)
+            failures = 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run the shared LanguageTool server')
+    parser.add_argument('--port', type=int, default=int(os.environ.get('LANGUAGETOOL_PORT', '8081')))
+    args = parser.parse_args()
+    supervise(args.port)
@@ -0,0 +1,321 @@
+import itertools
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from app.services import grammar_prescreen
+from app.services.result_cache import ResultCache, cache_key
+
+logger = logging.getLogger(__name__)
+
+# Comma-separated list of LanguageTool HTTP servers shared by every worker on the host
+# (see app/services/grammar_server.py and ecosystem.config.js)
+LANGUAGETOOL_URLS = [
+    url.strip().rstrip('/')
+    for url in os.environ.get('LANGUAGETOOL_URLS', 'http://127.0.0.1:8081').split(',')
+    if url.strip()
+]
+LANGUAGETOOL_LANGUAGE = os.environ.get('LANGUAGETOOL_LANGUAGE', 'en-US')
+LANGUAGETOOL_CONNECT_TIMEOUT = float(os.environ.get('LANGUAGETOOL_CONNECT_TIMEOUT', '2'))
+LANGUAGETOOL_READ_TIMEOUT = float(os.environ.get('LANGUAGETOOL_READ_TIMEOUT', '30'))
+LANGUAGETOOL_RETRY_INTERVAL = float(os.environ.get('LANGUAGETOOL_RETRY_INTERVAL', '10'))
+LANGUAGETOOL_POOL_SIZE = int(os.environ.get('LANGUAGETOOL_POOL_SIZE', '8'))
+# Start a private in-process LanguageTool when no shared server is reachable
+LANGUAGETOOL_LOCAL_FALLBACK = os.environ.get('LANGUAGETOOL_LOCAL_FALLBACK', '1') == '1'
+# Match lists are cached per (text, language, rules); set GRAMMAR_CACHE_DB to share them across workers
+GRAMMAR_CACHE_SIZE = int(os.environ.get('GRAMMAR_CACHE_SIZE', '2048'))
+GRAMMAR_CACHE_DB = os.environ.get('GRAMMAR_CACHE_DB')
+GRAMMAR_CACHE_TTL = float(os.environ['GRAMMAR_CACHE_TTL']) if os.environ.get('GRAMMAR_CACHE_TTL') else None
+# Texts of at least this many characters are split on paragraph breaks and the
+# paragraphs checked concurrently; a 200-300 word essay is ~1.3-2.5k characters
+GRAMMAR_PARALLEL_MIN_CHARS = int(os.environ.get('GRAMMAR_PARALLEL_MIN_CHARS', '1000'))
+GRAMMAR_PARALLELISM = int(os.environ.get('GRAMMAR_PARALLELISM', '4'))
+# Let callers that pass prescreen=True skip LanguageTool for texts the local pre-screen proves clean.
+# Enable only once benchmarks/grammar_prescreen_benchmark.py reports no false-clean results.
+GRAMMAR_PRESCREEN = os.environ.get('GRAMMAR_PRESCREEN', '0') == '1'
+
+PARAGRAPH_BREAK = re.compile(r'\n\s*\n')
+
+
+class GrammarMatch:
+    """A LanguageTool match, reduced to the fields the scoring services use"""
+
+    __slots__ = ('ruleId', 'ruleIssueType', 'message', 'offset', 'errorLength', 'replacements')
+
+    def __init__(self, ruleId, ruleIssueType, message, offset, errorLength, replacements):
+        self.ruleId = ruleId
+        self.ruleIssueType = ruleIssueType
+        self.message = message
+        self.offset = offset
+        self.errorLength = errorLength
+        self.replacements = replacements
+
+    @classmethod
+    def from_api(cls, match, index_of):
+        """Build from a /v2/check JSON match; `index_of` maps UTF-16 offsets to str indices"""
+        start = index_of(match['offset'])
+        end = index_of(match['offset'] + match['length'])
+        rule = match.get('rule', {})
+        return cls(
+            rule.get('id'),
+            rule.get('issueType'),
+            match.get('message', ''),
+            start,
+            end - start,
+            [r['value'] for r in match.get('replacements', [])],
+        )
+
+    @classmethod
+    def from_language_tool(cls, match):
+        """Build from a language_tool_python Match"""
+        return cls(match.ruleId, match.ruleIssueType, match.message,
+                   match.offset, match.errorLength, list(match.replacements))
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+    def __repr__(self):
+        return (f"GrammarMatch(ruleId={self.ruleId!r}, ruleIssueType={self.ruleIssueType!r}, "
+                f"offset={self.offset}, errorLength={self.errorLength}, message={self.message!r})")
+
+
+def _utf16_index_mapper(text):
+    """LanguageTool reports offsets in UTF-16 code units; map them back to Python str indices"""
+    if all(ord(ch) < 0x10000 for ch in text):
+        return lambda offset: offset
+    positions = []
+    for index, ch in enumerate(text):
+        positions.append(index)
+        if ord(ch) >= 0x10000:
+            positions.append(index)
+    positions.append(len(text))
+    return lambda offset: positions[min(offset, len(positions) - 1)]
+
+
+def _trimmed_span(text, start, end):
+    """Shrink [start, end) so it does not begin or end with whitespace"""
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return start, end
+
+
+def split_for_checking(text, min_chars=GRAMMAR_PARALLEL_MIN_CHARS):
+    """
+    Split text into (start, end) spans on paragraph breaks. Texts shorter
+    than `min_chars` stay one span. Paragraphs are never split further, as
+    most grammar rules look across sentences within a paragraph.
+
+    The counts can still drift slightly from a whole-text check: the few
+    rules that look across paragraphs (mostly style rules, such as
+    successive paragraphs starting with the same word) no longer fire.
+    That is accepted in exchange for essay latency following the slowest
+    paragraph; set GRAMMAR_PARALLEL_MIN_CHARS very high to check whole texts.
+    """
+    if len(text) < min_chars:
+        return [(0, len(text))]
+    spans = []
+    paragraph_start = 0
+    for brk in itertools.chain(PARAGRAPH_BREAK.finditer(text), [None]):
+        paragraph_end = brk.start() if brk else len(text)
+        start, end = _trimmed_span(text, paragraph_start, paragraph_end)
+        paragraph_start = brk.end() if brk else len(text)
+        if start != end:
+            spans.append((start, end))
+    return spans
+
+
+class LanguageToolServerError(Exception):
+    """The LanguageTool server answered with a 5xx status"""
+
+
+class _Backend:
+    def __init__(self, url):
+        self.url = url
+        self.healthy = True
+        self.retry_at = 0.0
+
+
+class LanguageToolClient:
+    """
+    Client for a pool of shared LanguageTool HTTP servers.
+
+    Requests go round-robin over healthy servers through one keep-alive session.
+    A server that fails is skipped until a health check succeeds again.
+    """
+
+    def __init__(self, urls=None, language=LANGUAGETOOL_LANGUAGE, cache=None):
+        self.language = language
+        self.cache = cache
+        self.backends = [_Backend(url) for url in (urls or LANGUAGETOOL_URLS)]
+        self._cycle = itertools.cycle(range(len(self.backends))) if self.backends else None
+        self._lock = threading.Lock()
+        self._local_tool = None
+        # The in-process tool's rule sets are shared state: one check at a time
+        self._local_lock = threading.Lock()
+        # Which tier answered each check: prescreen, cache or languagetool
+        self.tier_counts = Counter()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max(len(self.backends), 1),
+                              pool_maxsize=LANGUAGETOOL_POOL_SIZE)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def _health_check(self, backend):
+        try:
+            res = self.session.get(f"{backend.url}/v2/languages", timeout=LANGUAGETOOL_CONNECT_TIMEOUT)
+            return res.status_code == 200
+        except requests.RequestException:
+            return False
+
+    def _available_backends(self):
+        now = time.monotonic()
+        with self._lock:
+            order = [next(self._cycle) for _ in self.backends]
+        available = []
+        for index in order:
+            backend = self.backends[index]
+            if not backend.healthy and now >= backend.retry_at:
+                if self._health_check(backend):
+                    logger.info(f"LanguageTool server {backend.url} is healthy again")
+                    backend.healthy = True
+                else:
+                    backend.retry_at = now + LANGUAGETOOL_RETRY_INTERVAL
+            if backend.healthy:
+                available.append(backend)
+        return available
+
+    def _mark_unhealthy(self, backend, reason):
+        logger.warning(f"LanguageTool server {backend.url} failed: {reason}")
+        backend.healthy = False
+        backend.retry_at = time.monotonic() + LANGUAGETOOL_RETRY_INTERVAL
+
+    def _params(self, text, enabled_rules=None, disabled_rules=None):
+        params = {'language': self.language, 'text': text}
+        if enabled_rules:
+            params['enabledRules'] = ','.join(enabled_rules)
+        if disabled_rules:
+            params['disabledRules'] = ','.join(disabled_rules)
+        return params
+
+    def _check_remote(self, backend, text, enabled_rules=None, disabled_rules=None):
+        res = self.session.post(
+            f"{backend.url}/v2/check",
+            data=self._params(text, enabled_rules, disabled_rules),
+            timeout=(LANGUAGETOOL_CONNECT_TIMEOUT, LANGUAGETOOL_READ_TIMEOUT),
+        )
+        if res.status_code >= 500:
+            raise LanguageToolServerError(f"status {res.status_code}: {res.text[:200]}")
+        res.raise_for_status()
+        index_of = _utf16_index_mapper(text)
+        return [GrammarMatch.from_api(m, index_of) for m in res.json().get('matches', [])]
+
+    def _check_local(self, text, enabled_rules=None, disabled_rules=None):
+        with self._lock:
+            if self._local_tool is None:
+                import language_tool_python
+                logger.warning("No shared LanguageTool server reachable; starting an in-process LanguageTool")
+                self._local_tool = language_tool_python.LanguageTool(self.language)
+        tool = self._local_tool
+        with self._local_lock:
+            tool.enabled_rules = set(enabled_rules or ())
+            tool.disabled_rules = set(disabled_rules or ())
+            matches = tool.check(text)
+        return [GrammarMatch.from_language_tool(m) for m in matches]
+
+    def check(self, text, enabled_rules=None, disabled_rules=None, prescreen=False):
+        """
+        Check `text` and return a list of GrammarMatch.
+
+        Trailing whitespace is dropped before checking so that offsets into the
+        original text stay valid and re-submissions of the same text hit the cache.
+
+        With `prescreen=True` (and GRAMMAR_PRESCREEN enabled) short texts that pass
+        the local pre-screen return no matches without a LanguageTool round-trip.
+        Only use it where style matches are ignored, as the pre-screen does not
+        look for them. GRAMMAR_PRESCREEN should only be turned on once
+        benchmarks/grammar_prescreen_benchmark.py reports no false-clean results.
+        """
+        text = text.rstrip()
+        if prescreen and GRAMMAR_PRESCREEN and not enabled_rules and not disabled_rules:
+            if grammar_prescreen.prescreen(text):
+                self.tier_counts['prescreen'] += 1
+                return []
+        if self.cache is None:
+            self.tier_counts['languagetool'] += 1
+            return self._check_uncached(text, enabled_rules, disabled_rules)
+        key = cache_key(text, self.language, sorted(enabled_rules or ()), sorted(disabled_rules or ()))
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.tier_counts['cache'] += 1
+            return [GrammarMatch.from_dict(m) for m in cached]
+        self.tier_counts['languagetool'] += 1
+        matches = self._check_uncached(text, enabled_rules, disabled_rules)
+        self.cache.set(key, [m.to_dict() for m in matches])
+        return matches
+
+    def check_parallel(self, text, enabled_rules=None, disabled_rules=None):
+        """
+        Check a long text as independent paragraphs in parallel across the
+        server pool (short texts go in one request). Offsets are remapped
+        into `text`, so latency follows the slowest paragraph rather than the
+        whole document.
+        """
+        spans = split_for_checking(text)
+        if len(spans) <= 1:
+            return self.check(text, enabled_rules, disabled_rules)
+        results = _executor.map(
+            lambda span: self.check(text[span[0]:span[1]], enabled_rules, disabled_rules), spans
+        )
+        matches = []
+        for (start, _), chunk_matches in zip(spans, results):
+            for match in chunk_matches:
+                match.offset += start
+                matches.append(match)
+        return matches
+
+    def _check_uncached(self, text, enabled_rules=None, disabled_rules=None):
+        last_error = None
+        for backend in self._available_backends():
+            try:
+                return self._check_remote(backend, text, enabled_rules, disabled_rules)
+            except (requests.ConnectionError, requests.Timeout, LanguageToolServerError) as e:
+                last_error = e
+                self._mark_unhealthy(backend, e)
+        if LANGUAGETOOL_LOCAL_FALLBACK:
+            return self._check_local(text, enabled_rules, disabled_rules)
+        raise RuntimeError(f"No LanguageTool server available: {last_error}")
+
+    def stats(self):
+        stats = {
+            'tiers': dict(self.tier_counts),
+            'prescreen': {'enabled': GRAMMAR_PRESCREEN, 'decisions': grammar_prescreen.decisions()},
+            'backends': [{'url': b.url, 'healthy': b.healthy} for b in self.backends],
+        }
+        if self.cache is not None:
+            stats['cache'] = self.cache.stats()
+        return stats
+
+
+_executor = ThreadPoolExecutor(max_workers=GRAMMAR_PARALLELISM, thread_name_prefix='grammar-check')
+
+# Shared by every service in this worker
+lang_tool = LanguageToolClient(cache=ResultCache(
+    'grammar_matches', max_entries=GRAMMAR_CACHE_SIZE, db_path=GRAMMAR_CACHE_DB, ttl=GRAMMAR_CACHE_TTL
+))
+
+if GRAMMAR_PRESCREEN:
+    # Download and load the pre-screen's corpora and tagger now, not in the first request
+    grammar_prescreen.warm_up()
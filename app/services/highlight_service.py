@@ -0,0 +1,51 @@
+from bisect import bisect_left, bisect_right
+
+from app.services.text_analysis import TextAnalysis
+
+
+def _overlapping_tokens(starts, ends, offset, length):
+    """Index range of the tokens that overlap the character span [offset, offset + length)"""
+    if length <= 0:
+        return range(0)
+    return range(bisect_right(ends, offset), bisect_left(starts, offset + length))
+
+
+def build_word_highlights(text, grammar_errors, spelling_errors):
+    """
+    Map LanguageTool matches onto the whitespace-separated words of `text`
+    (a string or TextAnalysis).
+
+    Words are tokenized once with their character offsets and each match is
+    mapped onto the words it overlaps by binary search, so only the words
+    inside a match are highlighted. Spelling highlights take precedence over
+    grammar highlights on the same word.
+    """
+    doc = TextAnalysis.of(text)
+    text = doc.text
+    spans = doc.word_spans
+    starts = [start for start, _ in spans]
+    ends = [end for _, end in spans]
+    word_highlights = [
+        {"word": text[start:end], "status": "correct", "replacement": None}
+        for start, end in spans
+    ]
+
+    for error in grammar_errors:
+        replacement = error.replacements[0] if error.replacements else None
+        for i in _overlapping_tokens(starts, ends, error.offset, error.errorLength):
+            word_highlights[i] = {
+                "word": word_highlights[i]['word'],
+                "status": "grammar",
+                "replacement": replacement,
+            }
+
+    for error in spelling_errors:
+        suggestions = error.replacements[:3] if error.replacements else []
+        for i in _overlapping_tokens(starts, ends, error.offset, error.errorLength):
+            word_highlights[i] = {
+                "word": word_highlights[i]['word'],
+                "status": "spelling",
+                "suggestions": suggestions,
+            }
+
+    return word_highlights
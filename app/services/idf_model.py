@@ -0,0 +1,143 @@
+"""
+Corpus-level IDF table for key-term extraction and TF-IDF similarity.
+
+The vocabulary and IDF weights are fitted offline on the question bank
+references and past responses and stored as a compiled lexicon (see
+compiled_lexicon.py) in IDF_MODEL_DIR. Scoring then only tokenizes and
+looks weights up; nothing is fitted per request.
+
+Tokenization and IDF follow TfidfVectorizer's defaults (lowercase,
+`(?u)\\b\\w\\w+\\b`, smooth_idf, l2-normalized vectors), so an IDF model is
+what TfidfVectorizer would learn on the same corpus. Terms never seen in
+the corpus get the IDF of a term with document frequency 0.
+
+    python -m app.services.idf_model [--question-bank] [--documents FILE ...] \\
+        [--output data/idf_model]
+
+Each non-empty line of a `--documents` file is one document (e.g. one
+past response per line).
+"""
+import argparse
+import logging
+import math
+import os
+import re
+import sqlite3
+from collections import Counter
+from contextlib import closing
+
+import numpy as np
+
+from app.services.compiled_lexicon import CompiledLexicon
+
+logger = logging.getLogger(__name__)
+
+IDF_MODEL_DIR = os.environ.get('IDF_MODEL_DIR', os.path.join('data', 'idf_model'))
+
+TOKEN_PATTERN = re.compile(r'(?u)\b\w\w+\b')
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def smooth_idf(documents, document_frequency):
+    return math.log((1 + documents) / (1 + document_frequency)) + 1
+
+
+class IdfModel:
+    def __init__(self, lexicon):
+        self.lexicon = lexicon
+        # Identifies the fitted table, so artifacts derived from it can be told apart
+        self.fingerprint = lexicon.fingerprint
+
+    def __len__(self):
+        return len(self.lexicon)
+
+    def weights(self, text):
+        """Sparse l2-normalized TF-IDF vector of `text` as {term: weight}"""
+        counts = Counter(tokenize(text))
+        if not counts:
+            return {}
+        terms = list(counts)
+        weights = np.fromiter(counts.values(), dtype=np.float64, count=len(terms))
+        weights *= self.lexicon.lookup(terms, 'idf')
+        weights /= np.sqrt(np.dot(weights, weights))
+        return dict(zip(terms, weights.tolist()))
+
+    def key_terms(self, text, stop_words, top_n=10):
+        """Highest-weighted alphabetic, non-stopword terms of `text`"""
+        ranked = sorted(self.weights(text).items(), key=lambda item: (-item[1], item[0]))
+        return [term for term, _ in ranked if term.isalpha() and term not in stop_words][:top_n]
+
+    def similarity(self, text_a, text_b):
+        """Cosine similarity of the two texts' TF-IDF vectors"""
+        weights_a = self.weights(text_a)
+        weights_b = self.weights(text_b)
+        if len(weights_a) > len(weights_b):
+            weights_a, weights_b = weights_b, weights_a
+        return sum(weight * weights_b[term] for term, weight in weights_a.items() if term in weights_b)
+
+    @classmethod
+    def fit(cls, documents):
+        document_frequency = Counter()
+        count = 0
+        for document in documents:
+            document_frequency.update(set(tokenize(document)))
+            count += 1
+        entries = {term: {'idf': smooth_idf(count, df)} for term, df in document_frequency.items()}
+        return cls(CompiledLexicon.from_entries(entries, {'idf': smooth_idf(count, 0)}))
+
+    def save(self, directory):
+        self.lexicon.save(directory)
+
+    @classmethod
+    def load(cls, directory):
+        return cls(CompiledLexicon.load(directory))
+
+
+def _load():
+    try:
+        model = IdfModel.load(IDF_MODEL_DIR)
+        logger.info(f"Loaded IDF model with {len(model)} terms from {IDF_MODEL_DIR}")
+        return model
+    except (OSError, ValueError) as e:
+        logger.info(f"No IDF model ({e}); fitting TF-IDF per request")
+        return None
+
+
+idf_model = _load()
+
+
+def _question_bank_documents():
+    from app.services.question_bank_service import QUESTION_BANK_DB
+    with closing(sqlite3.connect(QUESTION_BANK_DB)) as conn:
+        for (reference,) in conn.execute("SELECT reference FROM questions"):
+            yield reference
+
+
+def _documents(question_bank, paths):
+    if question_bank:
+        yield from _question_bank_documents()
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield line
+
+
+def build(question_bank=False, documents=(), output=IDF_MODEL_DIR):
+    model = IdfModel.fit(_documents(question_bank, documents))
+    model.save(output)
+    print(f"Wrote IDF model with {len(model)} terms to {output}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Fit the corpus-level IDF model')
+    parser.add_argument('--question-bank', action='store_true', help='Include every registered reference')
+    parser.add_argument('--documents', action='append', default=[], help='Text file with one document per line (repeatable)')
+    parser.add_argument('--output', default=IDF_MODEL_DIR)
+    args = parser.parse_args()
+    if not args.question_bank and not args.documents:
+        parser.error('Nothing to fit on: pass --question-bank and/or --documents')
+    build(args.question_bank, args.documents, args.output)
@@ -0,0 +1,376 @@
+"""
+Asynchronous scoring jobs for the long speaking tasks.
+
+/retell_lecture, /summarize_group and /describe_image run ASR plus scoring
+inside the request and hit proxy timeouts under load. As jobs, the web tier
+only stores the upload and a row in a SQLite job table (JOB_DB) and returns
+a job id; worker processes, started separately, claim queued jobs, run the
+same evaluate_* function the synchronous route calls and store its result.
+
+    python -m app.services.job_service --worker
+
+Results are kept for JOB_RESULT_TTL seconds after the job finishes. Clients
+poll GET /jobs/<job_id> (optionally long-polling with ?wait=<seconds>), or
+pass a webhook_url that the worker POSTs the finished job to. Webhook URLs
+must be http(s) and point at a public address, or at one of the hosts in
+JOB_WEBHOOK_ALLOWED_HOSTS when that is set.
+
+A running job's lease is renewed by a heartbeat every JOB_LEASE_SECONDS / 3
+seconds. A job whose worker died is requeued once its lease runs out, up to
+JOB_MAX_ATTEMPTS runs; a worker that lost its lease neither stores its
+result nor removes the upload.
+"""
+import argparse
+import importlib
+import ipaddress
+import json
+import logging
+import os
+import shutil
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import closing
+from urllib.parse import urlsplit
+
+import requests
+from werkzeug.datastructures import FileStorage
+from werkzeug.utils import secure_filename
+
+logger = logging.getLogger(__name__)
+
+JOB_DB = os.environ.get('JOB_DB', 'jobs.db')
+JOB_UPLOAD_DIR = os.environ.get('JOB_UPLOAD_DIR', 'job_uploads')
+JOB_RESULT_TTL = float(os.environ.get('JOB_RESULT_TTL', str(24 * 3600)))
+JOB_LEASE_SECONDS = float(os.environ.get('JOB_LEASE_SECONDS', '600'))
+JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', '2'))
+JOB_POLL_INTERVAL = float(os.environ.get('JOB_POLL_INTERVAL', '0.5'))
+JOB_WEBHOOK_TIMEOUT = float(os.environ.get('JOB_WEBHOOK_TIMEOUT', '5'))
+JOB_WEBHOOK_ATTEMPTS = int(os.environ.get('JOB_WEBHOOK_ATTEMPTS', '3'))
+# Comma-separated hosts webhooks may go to; unset, any host resolving to public addresses only
+JOB_WEBHOOK_ALLOWED_HOSTS = frozenset(
+    h.strip().lower() for h in os.environ.get('JOB_WEBHOOK_ALLOWED_HOSTS', '').split(',') if h.strip()
+)
+UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER', 'uploads')
+
+# Task -> (service module, evaluate function taking (reference, file, upload_folder))
+JOB_TASKS = {
+    'retell_lecture': ('app.services.retell_lecture_service', 'evaluate_retell_lecture'),
+    'summarize_group': ('app.services.summarize_group_service', 'evaluate_summarize_group'),
+    'describe_image': ('app.services.describe_image_service', 'evaluate_describe_image'),
+}
+
+FINISHED = ('done', 'failed')
+
+_schema_ready = set()
+
+
+def _connect():
+    conn = sqlite3.connect(JOB_DB, timeout=30)
+    if JOB_DB in _schema_ready:
+        return conn
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS jobs ("
+        "job_id TEXT PRIMARY KEY, "
+        "task TEXT NOT NULL, "
+        "status TEXT NOT NULL, "
+        "reference TEXT NOT NULL, "
+        "audio_path TEXT NOT NULL, "
+        "content_type TEXT, "
+        "webhook_url TEXT, "
+        "result TEXT, "
+        "status_code INTEGER, "
+        "error TEXT, "
+        "attempts INTEGER NOT NULL DEFAULT 0, "
+        "worker TEXT, "
+        "created_at REAL NOT NULL, "
+        "started_at REAL, "
+        "finished_at REAL, "
+        "expires_at REAL)"
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at)")
+    _schema_ready.add(JOB_DB)
+    return conn
+
+
+def validate_webhook_url(url):
+    """
+    Raise ValueError unless `url` is an http(s) URL whose host is allowed:
+    listed in JOB_WEBHOOK_ALLOWED_HOSTS or, without an allowlist, resolving
+    to public addresses only (no loopback, private or link-local targets).
+    """
+    parts = urlsplit(url)
+    if parts.scheme not in ('http', 'https') or not parts.hostname:
+        raise ValueError("webhook_url must be an http or https URL")
+    host = parts.hostname.lower()
+    if JOB_WEBHOOK_ALLOWED_HOSTS:
+        if host not in JOB_WEBHOOK_ALLOWED_HOSTS:
+            raise ValueError(f"webhook_url host '{host}' is not allowed")
+        return
+    try:
+        addresses = {info[4][0] for info in socket.getaddrinfo(host, parts.port or None, proto=socket.IPPROTO_TCP)}
+    except (socket.gaierror, UnicodeError, ValueError):
+        raise ValueError(f"webhook_url host '{host}' does not resolve")
+    for address in addresses:
+        if not ipaddress.ip_address(address.split('%')[0]).is_global:
+            raise ValueError(f"webhook_url host '{host}' resolves to a non-public address")
+
+
+def submit_job(task, reference, file, webhook_url=None):
+    """
+    Store the upload and queue a scoring job. Returns the job record.
+    Raises ValueError for an unknown task or a webhook_url that is not allowed.
+    """
+    if task not in JOB_TASKS:
+        raise ValueError(f"Unknown task '{task}'. Expected one of: {', '.join(sorted(JOB_TASKS))}")
+    if webhook_url:
+        validate_webhook_url(webhook_url)
+    job_id = uuid.uuid4().hex
+    job_dir = os.path.join(JOB_UPLOAD_DIR, job_id)
+    os.makedirs(job_dir, exist_ok=True)
+    audio_path = os.path.join(job_dir, secure_filename(file.filename or '') or 'audio')
+    file.save(audio_path)
+
+    with closing(_connect()) as conn, conn:
+        conn.execute(
+            "INSERT INTO jobs (job_id, task, status, reference, audio_path, content_type, webhook_url, created_at) "
+            "VALUES (?, ?, 'queued', ?, ?, ?, ?, ?)",
+            (job_id, task, reference, audio_path, file.content_type, webhook_url, time.time())
+        )
+    logger.info(f"Queued {task} job {job_id}")
+    return get_job(job_id)
+
+
+def _job_record(row):
+    job = {
+        'job_id': row[0],
+        'task': row[1],
+        'status': row[2],
+        'created_at': row[3],
+        'started_at': row[4],
+        'finished_at': row[5],
+        'attempts': row[6],
+    }
+    if row[2] in FINISHED:
+        job['status_code'] = row[7]
+        job['result'] = json.loads(row[8]) if row[8] is not None else None
+        if row[9]:
+            job['error'] = row[9]
+        job['expires_at'] = row[10]
+    return job
+
+
+def get_job(job_id):
+    """Return the job record (with the result once finished), or None if unknown or expired"""
+    with closing(_connect()) as conn:
+        row = conn.execute(
+            "SELECT job_id, task, status, created_at, started_at, finished_at, attempts, "
+            "status_code, result, error, expires_at FROM jobs WHERE job_id = ?",
+            (job_id,)
+        ).fetchone()
+    if row is None or (row[10] is not None and row[10] < time.time()):
+        return None
+    return _job_record(row)
+
+
+def wait_for_job(job_id, timeout):
+    """get_job, waiting up to `timeout` seconds for the job to finish (long poll)"""
+    deadline = time.monotonic() + timeout
+    while True:
+        job = get_job(job_id)
+        if job is None or job['status'] in FINISHED or time.monotonic() >= deadline:
+            return job
+        time.sleep(min(JOB_POLL_INTERVAL, max(0.0, deadline - time.monotonic())))
+
+
+def claim_job(worker):
+    """
+    Mark the oldest queued job (or one whose lease ran out) as running for
+    `worker` and return (job_id, task, reference, audio_path, content_type,
+    webhook_url), or None when there is nothing to do. Jobs failed here
+    because their last lease ran out get their failure webhook sent.
+    """
+    now = time.time()
+    with closing(_connect()) as conn:
+        conn.isolation_level = None
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Jobs whose worker died: retry, or give up after JOB_MAX_ATTEMPTS runs
+            conn.execute(
+                "UPDATE jobs SET status = 'queued' WHERE status = 'running' AND started_at < ? AND attempts < ?",
+                (now - JOB_LEASE_SECONDS, JOB_MAX_ATTEMPTS)
+            )
+            expired = conn.execute(
+                "SELECT job_id, webhook_url FROM jobs WHERE status = 'running' AND started_at < ?",
+                (now - JOB_LEASE_SECONDS,)
+            ).fetchall()
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', error = 'Worker lease expired', finished_at = ?, expires_at = ? "
+                "WHERE status = 'running' AND started_at < ?",
+                (now, now + JOB_RESULT_TTL, now - JOB_LEASE_SECONDS)
+            )
+            row = conn.execute(
+                "SELECT job_id, task, reference, audio_path, content_type, webhook_url FROM jobs "
+                "WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE jobs SET status = 'running', worker = ?, started_at = ?, attempts = attempts + 1 "
+                    "WHERE job_id = ?",
+                    (worker, now, row[0])
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+    for job_id, webhook_url in expired:
+        logger.warning(f"Job {job_id} failed: worker lease expired")
+        if webhook_url:
+            notify(webhook_url, job_id)
+    return row
+
+
+def renew_lease(job_id, worker):
+    """Refresh the lease on a running job. Returns False if `worker` no longer owns it."""
+    with closing(_connect()) as conn, conn:
+        cursor = conn.execute(
+            "UPDATE jobs SET started_at = ? WHERE job_id = ? AND worker = ? AND status = 'running'",
+            (time.time(), job_id, worker)
+        )
+    return cursor.rowcount > 0
+
+
+def _heartbeat(job_id, worker, stop):
+    while not stop.wait(JOB_LEASE_SECONDS / 3):
+        try:
+            if not renew_lease(job_id, worker):
+                logger.warning(f"Job {job_id} lease lost by {worker}")
+                return
+        except sqlite3.Error as e:
+            logger.warning(f"Job {job_id} lease renewal failed: {e}")
+
+
+def _finish(job_id, worker, status, result=None, status_code=None, error=None):
+    """Store the outcome if `worker` still owns the job. Returns whether it did."""
+    now = time.time()
+    with closing(_connect()) as conn, conn:
+        cursor = conn.execute(
+            "UPDATE jobs SET status = ?, result = ?, status_code = ?, error = ?, finished_at = ?, expires_at = ? "
+            "WHERE job_id = ? AND worker = ? AND status = 'running'",
+            (status, json.dumps(result) if result is not None else None, status_code, error,
+             now, now + JOB_RESULT_TTL, job_id, worker)
+        )
+    return cursor.rowcount > 0
+
+
+def run_job(job_id, worker, task, reference, audio_path, content_type):
+    """
+    Run one claimed job with the task's evaluate function and store the outcome.
+    Returns False if the job's lease was lost to another run in the meantime;
+    that run owns the result and the upload.
+    """
+    module_name, function_name = JOB_TASKS[task]
+    evaluate = getattr(importlib.import_module(module_name), function_name)
+    started = time.perf_counter()
+    stop = threading.Event()
+    heartbeat = threading.Thread(target=_heartbeat, args=(job_id, worker, stop), name='job-heartbeat', daemon=True)
+    heartbeat.start()
+    owned = False
+    try:
+        with open(audio_path, 'rb') as stream:
+            file = FileStorage(stream=stream, filename=os.path.basename(audio_path), content_type=content_type)
+            result, status_code = evaluate(reference, file, UPLOAD_FOLDER)
+        stop.set()
+        owned = _finish(job_id, worker, 'done', result, status_code)
+        logger.info(f"{task} job {job_id} finished ({status_code}) in {time.perf_counter() - started:.1f}s")
+    except Exception as e:
+        logger.exception(f"{task} job {job_id} failed")
+        stop.set()
+        owned = _finish(job_id, worker, 'failed', status_code=500, error=str(e))
+    finally:
+        stop.set()
+        heartbeat.join()
+        if owned:
+            shutil.rmtree(os.path.dirname(audio_path), ignore_errors=True)
+        else:
+            logger.warning(f"{task} job {job_id} lost its lease; result discarded")
+    return owned
+
+
+def send_webhook(url, job):
+    """POST the finished job to `url`, retrying with backoff"""
+    for attempt in range(1, JOB_WEBHOOK_ATTEMPTS + 1):
+        try:
+            # Checked again here: the host may resolve differently than at submit time
+            validate_webhook_url(url)
+        except ValueError as e:
+            logger.warning(f"Webhook for job {job['job_id']} not sent: {e}")
+            return False
+        try:
+            res = requests.post(url, json=job, timeout=JOB_WEBHOOK_TIMEOUT, allow_redirects=False)
+            if res.status_code < 500:
+                return True
+            logger.warning(f"Webhook {url} for job {job['job_id']} returned {res.status_code}")
+        except requests.RequestException as e:
+            logger.warning(f"Webhook {url} for job {job['job_id']} failed: {e}")
+        if attempt < JOB_WEBHOOK_ATTEMPTS:
+            time.sleep(2 ** attempt)
+    return False
+
+
+def notify(url, job_id):
+    """Send the finished job's webhook on a background thread; retries must not hold up the next job"""
+    threading.Thread(target=send_webhook, args=(url, get_job(job_id)), name='job-webhook', daemon=True).start()
+
+
+def purge_expired():
+    """Delete finished jobs past their TTL. Returns how many were removed."""
+    with closing(_connect()) as conn, conn:
+        rows = conn.execute("SELECT job_id, audio_path FROM jobs WHERE expires_at < ?", (time.time(),)).fetchall()
+        conn.executemany("DELETE FROM jobs WHERE job_id = ?", [(row[0],) for row in rows])
+    for _, audio_path in rows:
+        shutil.rmtree(os.path.dirname(audio_path), ignore_errors=True)
+    return len(rows)
+
+
+def work(worker=None, once=False, purge_interval=60):
+    """Claim and run jobs until stopped (or until the queue is empty with once=True)"""
+    worker = worker or f"{os.uname().nodename}:{os.getpid()}"
+    # Load the scoring models before the first job, not during it
+    for module_name, _ in JOB_TASKS.values():
+        importlib.import_module(module_name)
+    logger.info(f"Job worker {worker} ready")
+    last_purge = 0.0
+    while True:
+        if time.monotonic() - last_purge >= purge_interval:
+            removed = purge_expired()
+            if removed:
+                logger.info(f"Purged {removed} expired jobs")
+            last_purge = time.monotonic()
+        claimed = claim_job(worker)
+        if claimed is None:
+            if once:
+                return
+            time.sleep(JOB_POLL_INTERVAL)
+            continue
+        job_id, task, reference, audio_path, content_type, webhook_url = claimed
+        owned = run_job(job_id, worker, task, reference, audio_path, content_type)
+        if owned and webhook_url:
+            notify(webhook_url, job_id)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description='Run scoring jobs queued by the /jobs endpoints')
+    parser.add_argument('--worker', action='store_true', help='claim and run jobs until stopped')
+    parser.add_argument('--once', action='store_true', help='run the queued jobs, then exit')
+    parser.add_argument('--purge', action='store_true', help='delete expired jobs and exit')
+    args = parser.parse_args()
+    if args.purge:
+        print(f"Purged {purge_expired()} expired jobs")
+    elif args.worker or args.once:
+        work(once=args.once)
+    else:
+        parser.print_help()
@@ -0,0 +1,40 @@
+"""
+Keyword-based key idea extraction.
+
+SST scoring stores these key ideas with the question bank, and the feedback
+prompt compression keeps them when it cuts a reference down. Only nltk's
+sentence tokenizer is needed, no embedding model.
+"""
+from nltk.tokenize import sent_tokenize
+
+IMPORTANT_KEYWORDS = ['because', 'however', 'therefore', 'consequently', 'although', 'despite', 'while', 'when', 'if', 'then', 'but', 'and', 'or', 'so', 'yet', 'nevertheless', 'furthermore', 'moreover', 'additionally', 'in addition', 'for example', 'such as', 'specifically', 'particularly', 'especially', 'notably', 'significantly', 'importantly', 'crucially', 'essentially']
+
+
+def split_sentences(text):
+    try:
+        return sent_tokenize(text)
+    except LookupError:
+        # Fallback if punkt is not available
+        return [s.strip() + '.' for s in text.split('.') if s.strip()]
+
+
+def keyword_key_ideas(text):
+    """Extract main ideas from text using sentence importance"""
+    sentences = split_sentences(text)
+
+    # Simple keyword-based importance scoring
+    sentence_scores = []
+    for sentence in sentences:
+        score = 0
+        words = sentence.lower().split()
+        for keyword in IMPORTANT_KEYWORDS:
+            if keyword in words:
+                score += 1
+        # Bonus for longer sentences (more detailed)
+        if len(words) > 10:
+            score += 0.5
+        sentence_scores.append((sentence, score))
+
+    # Return top sentences by score
+    sentence_scores.sort(key=lambda x: x[1], reverse=True)
+    return [sent for sent, score in sentence_scores[:3] if score > 0]
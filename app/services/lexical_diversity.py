@@ -0,0 +1,115 @@
+"""
+Lexical diversity measures over integer token IDs.
+
+Drop-in replacement for the `lexicalrichness` measures the scorers use:
+same tokenizer and same TTR/MTLD definitions (McCarthy and Jarvis 2010),
+so results are identical. Each text is tokenized and encoded to integer IDs
+once, and MTLD runs over the IDs with a stamp array instead of rebuilding a
+Python set of strings for every segment.
+"""
+import string
+from math import log, sqrt
+from statistics import mean
+
+import numpy as np
+
+MTLD_THRESHOLD = 0.72
+
+# lexicalrichness' preprocess + tokenize: drop digits and dashes, turn the rest
+# of string.punctuation into spaces
+_TOKENIZE_TABLE = str.maketrans(
+    {**{p: ' ' for p in string.punctuation}, **{ch: None for ch in '0123456789–—-'}}
+)
+
+
+def tokenize(text):
+    """Lowercased tokens, exactly as lexicalrichness tokenizes text"""
+    return text.lower().translate(_TOKENIZE_TABLE).split()
+
+
+def encode(tokens):
+    """Map tokens to integer IDs in order of first appearance"""
+    ids = {}
+    return np.fromiter((ids.setdefault(t, len(ids)) for t in tokens), dtype=np.int64, count=len(tokens))
+
+
+def _mtld_one_direction(token_ids, terms, threshold):
+    """
+    One MTLD pass over a list of token IDs. Segment membership is tracked
+    with a stamp array (token ID -> segment number) instead of a fresh set
+    per segment, so starting a new segment costs nothing.
+    """
+    stamp = [-1] * terms
+    segment = 0
+    types = 0
+    word_counter = 0
+    factor_count = 0
+    ttr = None
+    for token_id in token_ids:
+        word_counter += 1
+        if stamp[token_id] != segment:
+            stamp[token_id] = segment
+            types += 1
+        ttr = types / word_counter
+        if ttr <= threshold:
+            segment += 1
+            types = 0
+            word_counter = 0
+            factor_count += 1
+
+    # Partial factor for the last segment
+    if word_counter > 0:
+        factor_count += (1 - ttr) / (1 - threshold)
+
+    # TTR never dropped below the threshold by the end of the text
+    if factor_count == 0:
+        ttr = terms / len(token_ids)
+        factor_count += 1 if ttr == 1 else (1 - ttr) / (1 - threshold)
+    return len(token_ids) / factor_count
+
+
+class LexicalDiversity:
+    """Lexical diversity of one token sequence, encoded once as integer IDs"""
+
+    def __init__(self, tokens):
+        self.wordlist = tokens
+        self.token_ids = encode(tokens)
+        self.words = len(tokens)
+        self.terms = int(self.token_ids.max()) + 1 if self.words else 0
+        self._mtld = {}
+
+    @classmethod
+    def from_text(cls, text):
+        return cls(tokenize(text))
+
+    @property
+    def ttr(self):
+        return self.terms / self.words
+
+    @property
+    def rttr(self):
+        return self.terms / sqrt(self.words)
+
+    @property
+    def cttr(self):
+        return self.terms / sqrt(2 * self.words)
+
+    @property
+    def herdan(self):
+        return log(self.terms) / log(self.words)
+
+    def mtld_directions(self, threshold=MTLD_THRESHOLD):
+        """(forward, reverse) MTLD"""
+        if threshold not in self._mtld:
+            if self.words == 0:
+                raise ZeroDivisionError("MTLD of an empty text")
+            token_ids = self.token_ids.tolist()
+            self._mtld[threshold] = (
+                _mtld_one_direction(token_ids, self.terms, threshold),
+                _mtld_one_direction(token_ids[::-1], self.terms, threshold),
+            )
+        return self._mtld[threshold]
+
+    def mtld(self, threshold=MTLD_THRESHOLD):
+        """Mean of the forward and reverse MTLD"""
+        return mean(self.mtld_directions(threshold))
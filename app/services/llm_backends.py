@@ -0,0 +1,284 @@
+"""
+Pool of LLM backends for the chatbot.
+
+LLM_BACKENDS lists the endpoints, comma-separated. Each is an Ollama base
+URL, or an OpenAI-compatible base URL prefixed with "openai=" (vLLM,
+llama.cpp server, LM Studio ...):
+
+    LLM_BACKENDS="http://127.0.0.1:11434,http://10.0.0.5:11434,openai=http://10.0.0.6:8000/v1"
+
+Without it the pool is OLLAMA_URL alone, as before.
+
+Each generation goes to the healthy backend with the fewest outstanding
+requests, preferring backends that already have the model resident (seen
+in Ollama's /api/ps or the OpenAI /models list, or served recently) unless
+they are more than LLM_AFFINITY_SLACK requests busier than the least
+loaded one, so each model stays loaded where it is and is not swapped in
+and out of every node.
+
+A backend is ejected after LLM_EJECT_AFTER consecutive failed requests or a
+failed health probe, and comes back when a probe succeeds. Probes run every
+LLM_HEALTH_INTERVAL seconds when the pool has more than one backend. If
+every backend is ejected the least loaded one is still tried, so the
+generation scheduler's circuit breaker sees the failures.
+
+Per backend the pool tracks requests, errors, time to first token and
+tokens per second (streamed chunks per second of generation); per-stream
+detail is in llm_telemetry.
+
+Size GENERATION_MAX_CONCURRENCY for the whole pool, not for one backend.
+"""
+import json
+import logging
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+OLLAMA_URL = os.environ.get('OLLAMA_URL', 'http://localhost:11434').rstrip('/')
+LLM_BACKENDS = os.environ.get('LLM_BACKENDS', '')
+OLLAMA_POOL_SIZE = int(os.environ.get('OLLAMA_POOL_SIZE', '16'))
+LLM_HEALTH_INTERVAL = float(os.environ.get('LLM_HEALTH_INTERVAL', '10'))
+LLM_HEALTH_TIMEOUT = float(os.environ.get('LLM_HEALTH_TIMEOUT', '2'))
+LLM_EJECT_AFTER = int(os.environ.get('LLM_EJECT_AFTER', '3'))
+LLM_AFFINITY_SLACK = int(os.environ.get('LLM_AFFINITY_SLACK', '2'))
+
+# Counts (tokens) and durations (nanoseconds) in Ollama's final stream message
+OLLAMA_USAGE_FIELDS = ('eval_count', 'eval_duration', 'prompt_eval_count', 'prompt_eval_duration',
+                       'load_duration', 'total_duration')
+
+# One keep-alive connection pool per backend, shared by every chatbot stream
+session = requests.Session()
+_adapter = HTTPAdapter(pool_connections=8, pool_maxsize=OLLAMA_POOL_SIZE, pool_block=False)
+session.mount('http://', _adapter)
+session.mount('https://', _adapter)
+
+
+class Backend:
+    """An Ollama server"""
+
+    kind = 'ollama'
+
+    def __init__(self, url):
+        self.url = url.rstrip('/')
+        self.outstanding = 0
+        self.healthy = True
+        self.consecutive_failures = 0
+        self.resident = set()
+        self.requests = 0
+        self.errors = 0
+        self.first_token_seconds = None
+        self.tokens_per_second = None
+
+    def model_key(self, model):
+        # Ollama reports "llama2" as "llama2:latest"
+        return model if ':' in model else f"{model}:latest"
+
+    def chat_request(self, messages, model, options=None):
+        """
+        URL and JSON body of a streaming chat request. `options` may cap the
+        generation: max_tokens and stop (a list of stop sequences).
+        """
+        payload = {"model": model, "messages": messages}
+        if options:
+            payload["options"] = {}
+            if options.get('max_tokens'):
+                payload["options"]["num_predict"] = options['max_tokens']
+            if options.get('stop'):
+                payload["options"]["stop"] = options['stop']
+        return f"{self.url}/api/chat", payload
+
+    def parse_line(self, line):
+        """
+        (generated text, usage) for one line of the streamed body; text is ''
+        when there is none and usage is a dict of the counts and durations
+        reported at the end of the stream (plus done_reason, "length" when
+        max_tokens cut the generation off), else None. Raises on malformed lines.
+        """
+        data = json.loads(line.decode('utf-8'))
+        usage = None
+        if data.get("done"):
+            usage = {key: data[key] for key in OLLAMA_USAGE_FIELDS if key in data}
+            if data.get("done_reason"):
+                usage['done_reason'] = data["done_reason"]
+        return data.get("message", {}).get("content", ""), usage
+
+    def probe_url(self):
+        return f"{self.url}/api/ps"
+
+    def probe_models(self, body):
+        return {m.get('name') or m.get('model') for m in body.get('models', [])}
+
+
+class OpenAIBackend(Backend):
+    """An OpenAI-compatible server (base URL ends in /v1)"""
+
+    kind = 'openai'
+
+    def model_key(self, model):
+        return model
+
+    def chat_request(self, messages, model, options=None):
+        payload = {"model": model, "messages": messages, "stream": True,
+                   "stream_options": {"include_usage": True}}
+        if options:
+            if options.get('max_tokens'):
+                payload["max_tokens"] = options['max_tokens']
+            if options.get('stop'):
+                # The OpenAI API accepts at most 4 stop sequences
+                payload["stop"] = options['stop'][:4]
+        return f"{self.url}/chat/completions", payload
+
+    def parse_line(self, line):
+        # Server-sent events: "data: {...}", ending with "data: [DONE]"
+        line = line.strip()
+        if not line.startswith(b"data:"):
+            return "", None
+        line = line[5:].strip()
+        if line == b"[DONE]":
+            return "", None
+        data = json.loads(line.decode('utf-8'))
+        usage = None
+        if data.get("usage"):
+            usage = {'eval_count': data["usage"].get("completion_tokens"),
+                     'prompt_eval_count': data["usage"].get("prompt_tokens")}
+        choices = data.get("choices") or [{}]
+        if choices[0].get("finish_reason"):
+            usage = {**(usage or {}), 'done_reason': choices[0]["finish_reason"]}
+        return choices[0].get("delta", {}).get("content") or "", usage
+
+    def probe_url(self):
+        return f"{self.url}/models"
+
+    def probe_models(self, body):
+        return {m.get('id') for m in body.get('data', [])}
+
+
+def parse_backends(spec):
+    backends = []
+    for entry in spec.split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        if entry.startswith('openai='):
+            backends.append(OpenAIBackend(entry[len('openai='):]))
+        else:
+            backends.append(Backend(entry[len('ollama='):] if entry.startswith('ollama=') else entry))
+    return backends
+
+
+class BackendPool:
+    def __init__(self, backends):
+        self.backends = backends
+        self._lock = threading.Lock()
+        self._prober = None
+
+    def choose(self, model, exclude=()):
+        """Backend for the next `model` generation, or None if every backend is in `exclude`"""
+        self._start_probes()
+        with self._lock:
+            candidates = [b for b in self.backends if b not in exclude]
+            if not candidates:
+                return None
+            candidates = [b for b in candidates if b.healthy] or candidates
+            least = min(candidates, key=lambda b: b.outstanding)
+            resident = [b for b in candidates if b.model_key(model) in b.resident]
+            if resident:
+                warm = min(resident, key=lambda b: b.outstanding)
+                if warm.outstanding - least.outstanding <= LLM_AFFINITY_SLACK:
+                    least = warm
+            least.outstanding += 1
+            least.requests += 1
+            return least
+
+    def finish(self, backend, model, ok, first_token_seconds=None, tokens=0, generation_seconds=None):
+        """
+        Record the end of a request chosen with choose(). `ok` is False for
+        connection errors, timeouts and 5xx, True when the backend answered,
+        None when the client left before that was known.
+        """
+        with self._lock:
+            backend.outstanding -= 1
+            if ok is False:
+                backend.errors += 1
+                backend.consecutive_failures += 1
+                if backend.healthy and backend.consecutive_failures >= LLM_EJECT_AFTER:
+                    backend.healthy = False
+                    logger.warning(f"LLM backend {backend.url} ejected after "
+                                   f"{backend.consecutive_failures} failures")
+            elif ok:
+                backend.consecutive_failures = 0
+                # Only a stream that generated something proves the model exists
+                if tokens:
+                    backend.resident.add(backend.model_key(model))
+            if first_token_seconds is not None:
+                backend.first_token_seconds = _ewma(backend.first_token_seconds, first_token_seconds)
+            if tokens and generation_seconds:
+                backend.tokens_per_second = _ewma(backend.tokens_per_second, tokens / generation_seconds)
+
+    def serves(self, model):
+        """True if some backend reports `model` (or has streamed it)"""
+        with self._lock:
+            return any(b.model_key(model) in b.resident for b in self.backends)
+
+    def probe(self):
+        """Check every backend once and refresh the models each one has loaded"""
+        for backend in self.backends:
+            try:
+                res = session.get(backend.probe_url(), timeout=LLM_HEALTH_TIMEOUT)
+                res.raise_for_status()
+                models = backend.probe_models(res.json())
+            except (requests.RequestException, ValueError) as e:
+                with self._lock:
+                    if backend.healthy:
+                        logger.warning(f"LLM backend {backend.url} failed its health probe: {e}")
+                    backend.healthy = False
+                continue
+            with self._lock:
+                if not backend.healthy:
+                    logger.info(f"LLM backend {backend.url} is back")
+                backend.healthy = True
+                backend.consecutive_failures = 0
+                backend.resident = {m for m in models if m}
+
+    def _probe_loop(self):
+        while True:
+            self.probe()
+            time.sleep(LLM_HEALTH_INTERVAL)
+
+    def _start_probes(self):
+        # A single backend is always used, so it is not probed
+        if self._prober is None and len(self.backends) > 1:
+            with self._lock:
+                if self._prober is None:
+                    self._prober = threading.Thread(target=self._probe_loop, name='llm-health', daemon=True)
+                    self._prober.start()
+
+    def stats(self):
+        with self._lock:
+            return [{
+                'url': b.url,
+                'kind': b.kind,
+                'healthy': b.healthy,
+                'outstanding': b.outstanding,
+                'requests': b.requests,
+                'errors': b.errors,
+                'resident_models': sorted(b.resident),
+                'first_token_seconds': _round(b.first_token_seconds),
+                'tokens_per_second': _round(b.tokens_per_second),
+            } for b in self.backends]
+
+
+def _ewma(previous, value, weight=0.2):
+    return value if previous is None else (1 - weight) * previous + weight * value
+
+
+def _round(value):
+    return None if value is None else round(value, 3)
+
+
+backend_pool = BackendPool(parse_backends(LLM_BACKENDS) or [Backend(OLLAMA_URL)])
@@ -0,0 +1,239 @@
+"""
+Per-stream telemetry for LLM generations.
+
+Every chat stream gets a StreamTelemetry that records connect time (until
+the response headers arrive), time to first token, the gaps between
+streamed chunks, total time, token count and tokens/s, plus the counts and
+durations the backend reports at the end of the stream (Ollama's final
+NDJSON message: eval_count, eval_duration, prompt_eval_count,
+prompt_eval_duration; OpenAI-compatible usage when the server sends it).
+
+Finished streams are aggregated into histograms labelled by model and
+endpoint, rendered in the Prometheus text format by render() (served on
+/metrics by the chatbot app), and logged as one summary line per stream.
+Models no backend reports and LLM_TELEMETRY_MODELS does not list are
+labelled "other", so client-supplied names cannot grow the series.
+summary_line() gives the same numbers as a trailing line for the stream
+itself (LLM_STATS_LINE=1 or "stats": true on /chatbot).
+"""
+import logging
+import os
+import threading
+import time
+from collections import Counter
+
+from app.services.llm_backends import backend_pool
+
+logger = logging.getLogger(__name__)
+
+LLM_STATS_LINE = os.environ.get('LLM_STATS_LINE', '0') == '1'
+# Models always labelled by name, in addition to those the backends report
+LLM_TELEMETRY_MODELS = frozenset(m.strip() for m in os.environ.get('LLM_TELEMETRY_MODELS', '').split(',') if m.strip())
+OTHER_MODEL = 'other'
+
+SECONDS_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120)
+GAP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2, 5)
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048)
+RATE_BUCKETS = (1, 2, 5, 10, 20, 40, 80, 160)
+
+# name -> (help, buckets)
+HISTOGRAMS = {
+    'llm_connect_seconds': ("Time until the backend's response headers arrived", SECONDS_BUCKETS),
+    'llm_time_to_first_token_seconds': ("Time from sending the request to the first generated chunk", SECONDS_BUCKETS),
+    'llm_chunk_gap_seconds': ("Time between consecutive generated chunks", GAP_BUCKETS),
+    'llm_stream_seconds': ("Total stream time, request to end of stream", SECONDS_BUCKETS),
+    'llm_stream_tokens': ("Generated chunks (tokens) per stream", TOKEN_BUCKETS),
+    'llm_tokens_per_second': ("Generated chunks per second after the first one", RATE_BUCKETS),
+    'llm_eval_tokens_per_second': ("Backend-reported eval_count / eval_duration", RATE_BUCKETS),
+    'llm_prompt_eval_seconds': ("Backend-reported prompt_eval_duration (prefill)", SECONDS_BUCKETS),
+}
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.total += 1
+        self.sum += value
+
+
+class Telemetry:
+    """Histograms and stream counters for one worker"""
+
+    def __init__(self, known_model=None):
+        self._lock = threading.Lock()
+        self._histograms = {}  # (name, model, endpoint) -> Histogram
+        self.streams = Counter()  # (model, endpoint, outcome) -> count
+        # Callable telling whether a backend serves a model, e.g. BackendPool.serves
+        self.known_model = known_model
+
+    def model_label(self, model):
+        """`model`, or "other" for a model no backend reports and LLM_TELEMETRY_MODELS does not list"""
+        if model in LLM_TELEMETRY_MODELS or (model and self.known_model and self.known_model(model)):
+            return model
+        return OTHER_MODEL
+
+    def observe(self, name, model, endpoint, value):
+        key = (name, model, endpoint)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms.setdefault(key, Histogram(HISTOGRAMS[name][1]))
+        histogram.observe(value)
+
+    def record(self, stream):
+        """Count a finished stream and add its timings (rejected streams have none)"""
+        model = self.model_label(stream.model)
+        with self._lock:
+            self.streams[(model, stream.endpoint, stream.outcome)] += 1
+            if stream.outcome == 'rejected':
+                return
+            for name, value in stream.observations():
+                self.observe(name, model, stream.endpoint, value)
+            for gap in stream.gaps:
+                self.observe('llm_chunk_gap_seconds', model, stream.endpoint, gap)
+
+    def render(self):
+        """Histograms and counters in the Prometheus text exposition format"""
+        lines = [
+            '# HELP llm_streams_total Chat streams by outcome (ok, error, rejected, abandoned)',
+            '# TYPE llm_streams_total counter',
+        ]
+        with self._lock:
+            for (model, endpoint, outcome), count in sorted(self.streams.items()):
+                lines.append(f'llm_streams_total{labels(model=model, endpoint=endpoint, outcome=outcome)} {count}')
+            for name, (help_text, _) in HISTOGRAMS.items():
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} histogram')
+                for (hist_name, model, endpoint), histogram in sorted(self._histograms.items()):
+                    if hist_name != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        cumulative += count
+                        lines.append(f'{name}_bucket{labels(model=model, endpoint=endpoint, le=f"{bound:g}")} {cumulative}')
+                    lines.append(f'{name}_bucket{labels(model=model, endpoint=endpoint, le="+Inf")} {histogram.total}')
+                    lines.append(f'{name}_sum{labels(model=model, endpoint=endpoint)} {histogram.sum:.6f}')
+                    lines.append(f'{name}_count{labels(model=model, endpoint=endpoint)} {histogram.total}')
+        return '\n'.join(lines) + '\n'
+
+
+def labels(**values):
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for v in values.values())
+    return '{' + ','.join(f'{k}="{v}"' for k, v in zip(values, escaped)) + '}'
+
+
+def gauge(name, help_text, samples):
+    """Prometheus lines for a gauge; `samples` is a list of (labels dict, value)"""
+    lines = [f'# HELP {name} {help_text}', f'# TYPE {name} gauge']
+    lines.extend(f'{name}{labels(**sample_labels) if sample_labels else ""} {value}'
+                 for sample_labels, value in samples)
+    return '\n'.join(lines) + '\n'
+
+
+class StreamTelemetry:
+    """Timings of one chat stream; call the marks as the stream progresses, then finish()"""
+
+    def __init__(self, model, endpoint):
+        self.model = model
+        self.endpoint = endpoint or 'unknown'
+        self.backend = None
+        self.started = time.perf_counter()
+        self.connect_seconds = None
+        self.first_token = None
+        self.last_chunk = None
+        self.gaps = []
+        self.tokens = 0
+        self.usage = {}
+        self.outcome = 'abandoned'
+        self.finished = None
+
+    def connected(self, backend):
+        self.backend = backend
+        self.connect_seconds = time.perf_counter() - self.started
+
+    def chunk(self):
+        now = time.perf_counter()
+        if self.first_token is None:
+            self.first_token = now
+        else:
+            self.gaps.append(now - self.last_chunk)
+        self.last_chunk = now
+        self.tokens += 1
+
+    def reported(self, usage):
+        """Counts and durations reported by the backend (Ollama: nanoseconds)"""
+        self.usage.update(usage)
+
+    @property
+    def time_to_first_token(self):
+        return None if self.first_token is None else self.first_token - self.started
+
+    @property
+    def tokens_per_second(self):
+        if self.tokens < 2 or self.last_chunk == self.first_token:
+            return None
+        return (self.tokens - 1) / (self.last_chunk - self.first_token)
+
+    @property
+    def eval_tokens_per_second(self):
+        if self.usage.get('eval_count') and self.usage.get('eval_duration'):
+            return self.usage['eval_count'] / (self.usage['eval_duration'] / 1e9)
+        return None
+
+    def observations(self):
+        values = {
+            'llm_connect_seconds': self.connect_seconds,
+            'llm_time_to_first_token_seconds': self.time_to_first_token,
+            'llm_stream_seconds': self.finished - self.started,
+            'llm_stream_tokens': self.tokens if self.outcome == 'ok' else None,
+            'llm_tokens_per_second': self.tokens_per_second,
+            'llm_eval_tokens_per_second': self.eval_tokens_per_second,
+            'llm_prompt_eval_seconds': (self.usage['prompt_eval_duration'] / 1e9
+                                        if self.usage.get('prompt_eval_duration') else None),
+        }
+        return [(name, value) for name, value in values.items() if value is not None]
+
+    def finish(self, outcome, registry=None):
+        """Record the stream in `registry` (default: this worker's) and log its summary"""
+        self.outcome = outcome
+        self.finished = time.perf_counter()
+        (registry or telemetry).record(self)
+        if outcome != 'rejected':
+            logger.info(f"LLM stream {self.endpoint} {self.model} via {self.backend.url if self.backend else '-'}: "
+                        f"{self.summary_line().strip()}")
+
+    def summary_line(self):
+        def seconds(value):
+            return '-' if value is None else f"{value:.3f}s"
+
+        def rate(value):
+            return '-' if value is None else f"{value:.1f}"
+
+        parts = [
+            f"outcome={self.outcome}",
+            f"connect={seconds(self.connect_seconds)}",
+            f"ttft={seconds(self.time_to_first_token)}",
+            f"total={seconds((self.finished or time.perf_counter()) - self.started)}",
+            f"tokens={self.tokens}",
+            f"tok/s={rate(self.tokens_per_second)}",
+            f"max_gap={seconds(max(self.gaps) if self.gaps else None)}",
+        ]
+        if self.usage.get('eval_count') is not None:
+            parts.append(f"eval_count={self.usage['eval_count']}")
+        if self.eval_tokens_per_second is not None:
+            parts.append(f"eval_tok/s={rate(self.eval_tokens_per_second)}")
+        if self.usage.get('prompt_eval_count') is not None:
+            parts.append(f"prompt_eval_count={self.usage['prompt_eval_count']}")
+        return f"\n[stats {' '.join(parts)}]\n"
+
+
+# Shared by every stream in this worker
+telemetry = Telemetry(known_model=backend_pool.serves)
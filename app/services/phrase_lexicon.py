@@ -0,0 +1,97 @@
+from collections import Counter, deque
+
+
+def _is_word_char(ch):
+    return ch.isalnum() or ch == '_'
+
+
+class PhraseLexicon:
+    """
+    Aho-Corasick automaton over several named phrase lists.
+
+    Built once at import; `scan(text)` lowercases the text once and returns,
+    for every lexicon, a Counter of the phrases found and how often, in a
+    single pass over the characters.
+
+    By default phrases match anywhere, like `phrase in text.lower()`. With
+    `word_boundary=True` a match must sit between regex `\\b` boundaries,
+    like `re.findall(r'\\b' + re.escape(phrase) + r'\\b', text.lower())`.
+    """
+
+    def __init__(self, lexicons, word_boundary=False):
+        self.names = list(lexicons)
+        self.word_boundary = word_boundary
+        self.phrases = []
+        # phrase id -> names of the lexicons it belongs to
+        self._phrase_lexicons = []
+        phrase_ids = {}
+        for name, phrases in lexicons.items():
+            for phrase in phrases:
+                phrase = phrase.lower()
+                if phrase not in phrase_ids:
+                    phrase_ids[phrase] = len(self.phrases)
+                    self.phrases.append(phrase)
+                    self._phrase_lexicons.append([])
+                owners = self._phrase_lexicons[phrase_ids[phrase]]
+                if name not in owners:
+                    owners.append(name)
+        self._build()
+
+    def _build(self):
+        goto = [{}]
+        outputs = [[]]
+        for phrase_id, phrase in enumerate(self.phrases):
+            state = 0
+            for ch in phrase:
+                if ch not in goto[state]:
+                    goto.append({})
+                    outputs.append([])
+                    goto[state][ch] = len(goto) - 1
+                state = goto[state][ch]
+            outputs[state].append(phrase_id)
+
+        # Breadth-first: fill in failure links and turn goto into a full
+        # transition table (edges back to the root are left implicit)
+        fail = [0] * len(goto)
+        delta = [dict(edges) for edges in goto]
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            outputs[state] = outputs[state] + outputs[fail[state]]
+            for ch, target in delta[fail[state]].items():
+                delta[state].setdefault(ch, target)
+            for ch, child in goto[state].items():
+                fail[child] = delta[fail[state]].get(ch, 0) if state else 0
+                queue.append(child)
+        self._delta = delta
+        self._outputs = [tuple(out) for out in outputs]
+
+    def _at_boundaries(self, text, start, end):
+        phrase_first, phrase_last = _is_word_char(text[start]), _is_word_char(text[end - 1])
+        before = start > 0 and _is_word_char(text[start - 1])
+        after = end < len(text) and _is_word_char(text[end])
+        return before != phrase_first and after != phrase_last
+
+    def scan(self, text):
+        """Return {lexicon name: Counter(phrase -> occurrences)} for `text`"""
+        found = Counter()
+        text = text.lower()
+        delta = self._delta
+        outputs = self._outputs
+        state = 0
+        for index, ch in enumerate(text):
+            state = delta[state].get(ch, 0)
+            if outputs[state]:
+                for phrase_id in outputs[state]:
+                    if self.word_boundary:
+                        start = index + 1 - len(self.phrases[phrase_id])
+                        if not self._at_boundaries(text, start, index + 1):
+                            continue
+                    found[phrase_id] += 1
+
+        hits = {name: Counter() for name in self.names}
+        for phrase_id, count in found.items():
+            phrase = self.phrases[phrase_id]
+            for name in self._phrase_lexicons[phrase_id]:
+                hits[name][phrase] = count
+        return hits
@@ -0,0 +1,87 @@
+"""
+Compression of the reference passage in SWT/SST feedback prompts.
+
+SST references are whole lecture transcripts, and on CPU models prefilling
+them dominates the time to first token. compress_reference() keeps the
+reference's key ideas plus its most salient sentences, in their original
+order, within FEEDBACK_PROMPT_TOKEN_BUDGET (estimated) tokens. References
+already under the budget are left as they are.
+
+Key ideas come from the question bank when the reference is registered
+(the SWT/SST services store them at registration time), otherwise from the
+keyword extractor in key_ideas, which needs no embedding model, so the
+chatbot app can compress prompts without loading SBERT.
+"""
+import math
+import os
+import re
+from collections import Counter
+
+from app.services.key_ideas import keyword_key_ideas, split_sentences
+from app.services.question_bank_service import reference_artifact
+
+FEEDBACK_PROMPT_COMPRESSION = os.environ.get('FEEDBACK_PROMPT_COMPRESSION', '0') == '1'
+FEEDBACK_PROMPT_TOKEN_BUDGET = int(os.environ.get('FEEDBACK_PROMPT_TOKEN_BUDGET', '300'))
+
+# Rough BPE token count: words and punctuation marks
+TOKEN = re.compile(r"\w+|[^\w\s]")
+WORD = re.compile(r"[a-z0-9']+")
+
+STOP_WORDS = frozenset({
+    'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'from', 'as',
+    'is', 'are', 'was', 'were', 'be', 'been', 'being', 'have', 'has', 'had', 'do', 'does', 'did', 'will',
+    'would', 'could', 'should', 'may', 'might', 'can', 'must', 'this', 'that', 'these', 'those', 'it', 'its',
+    'they', 'them', 'their', 'we', 'us', 'our', 'you', 'your', 'he', 'she', 'his', 'her', 'i', 'me', 'my',
+    'so', 'if', 'then', 'than', 'there', 'what', 'which', 'who', 'how', 'when', 'where', 'not', 'no', 'also',
+    'very', 'just', 'about', 'into', 'more', 'most', 'some', 'such', 'all', 'one', 'like', 'um', 'uh',
+})
+
+
+def estimate_tokens(text):
+    return len(TOKEN.findall(text))
+
+
+def salience(sentences):
+    """
+    Score each sentence by how much of the passage's recurring vocabulary it
+    carries: summed frequency of its content words, damped by sentence
+    length, with a bonus for the opening sentence (usually the topic).
+    """
+    words = [[w for w in WORD.findall(s.lower()) if w not in STOP_WORDS] for s in sentences]
+    frequencies = Counter(w for sentence_words in words for w in set(sentence_words))
+    scores = []
+    for i, sentence_words in enumerate(words):
+        score = sum(frequencies[w] - 1 for w in set(sentence_words)) / math.sqrt(len(sentence_words) or 1)
+        scores.append(score * 1.5 if i == 0 else score)
+    return scores
+
+
+def compress_reference(reference, task_type=None, budget=FEEDBACK_PROMPT_TOKEN_BUDGET):
+    """
+    The reference cut down to its key ideas and salient sentences, within
+    `budget` tokens. Key ideas registered for `task_type` ('swt' or 'sst')
+    are used when there are any.
+    """
+    if estimate_tokens(reference) <= budget:
+        return reference
+    sentences = split_sentences(reference)
+    if task_type:
+        key_ideas = reference_artifact(task_type, reference, 'key_ideas', lambda: keyword_key_ideas(reference))
+    else:
+        key_ideas = keyword_key_ideas(reference)
+    key_ideas = set(key_ideas)
+    scores = salience(sentences)
+    # Key ideas first, then the rest by salience
+    order = sorted(range(len(sentences)), key=lambda i: (sentences[i] not in key_ideas, -scores[i]))
+    kept = []
+    used = 0
+    for i in order:
+        cost = estimate_tokens(sentences[i])
+        if used + cost > budget:
+            continue
+        kept.append(i)
+        used += cost
+    if not kept:
+        # Not even one sentence fits: cut the most important one to the budget
+        return ' '.join(sentences[order[0]].split()[:budget])
+    return ' '.join(sentences[i] for i in sorted(kept))
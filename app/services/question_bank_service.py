@@ -0,0 +1,199 @@
+import hashlib
+import importlib
+import json
+import logging
+import os
+import sqlite3
+import time
+import uuid
+from contextlib import closing
+
+from app.services.result_cache import ResultCache, cache_key
+
+logger = logging.getLogger(__name__)
+
+QUESTION_BANK_DB = os.environ.get("QUESTION_BANK_DB", "question_bank.db")
+# Seconds a reference that is not registered stays cached as a miss in each worker
+QUESTION_BANK_MISS_TTL = float(os.environ.get("QUESTION_BANK_MISS_TTL", "60"))
+# References whose artifacts (or misses) each worker keeps in memory
+QUESTION_BANK_CACHE_SIZE = int(os.environ.get("QUESTION_BANK_CACHE_SIZE", "1024"))
+
+# Bump whenever a service changes what it stores in its reference artifacts.
+# Rows built with an older version are ignored (scoring falls back to computing
+# on the fly) until the question is registered again.
+ARTIFACTS_VERSION = 1
+
+# Task type -> service module that knows how to precompute its reference artifacts
+TASK_SERVICES = {
+    'swt': 'app.services.swt_service',
+    'sst': 'app.services.sst_service',
+    'write_essay': 'app.services.write_essay_service',
+    'read_aloud': 'app.services.read_aloud_service',
+    'repeat_sentence': 'app.services.repeat_sentence_service',
+    'retell_lecture': 'app.services.retell_lecture_service',
+    'describe_image': 'app.services.describe_image_service',
+    'summarize_group': 'app.services.summarize_group_service',
+    'respond_situation': 'app.services.respond_situation_service',
+    'dictation': 'app.services.dictation_service',
+}
+
+# Artifacts of the (task type, reference) pairs already looked up in this
+# worker, and the pairs found not to be registered, both bounded LRUs
+_artifacts_cache = ResultCache('question_bank_artifacts', max_entries=QUESTION_BANK_CACHE_SIZE)
+_misses_cache = ResultCache('question_bank_misses', max_entries=QUESTION_BANK_CACHE_SIZE, ttl=QUESTION_BANK_MISS_TTL)
+_schema_ready = set()
+
+
+def _forget(task_type, ref_hash):
+    key = cache_key(task_type, ref_hash)
+    _artifacts_cache.discard(key)
+    _misses_cache.discard(key)
+
+
+def reference_hash(reference):
+    """Stable key for a reference text"""
+    return hashlib.sha256(reference.strip().encode('utf-8')).hexdigest()
+
+
+def _connect():
+    conn = sqlite3.connect(QUESTION_BANK_DB, timeout=30)
+    if QUESTION_BANK_DB in _schema_ready:
+        return conn
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS questions ("
+        "question_id TEXT PRIMARY KEY, "
+        "task_type TEXT NOT NULL, "
+        "reference TEXT NOT NULL, "
+        "reference_hash TEXT NOT NULL, "
+        "artifacts TEXT NOT NULL, "
+        "artifacts_version INTEGER NOT NULL, "
+        "created_at REAL NOT NULL)"
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_questions_hash ON questions (reference_hash)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_questions_task_hash ON questions (task_type, reference_hash)")
+    _schema_ready.add(QUESTION_BANK_DB)
+    return conn
+
+
+def _to_jsonable(value):
+    """Convert tensors/arrays (embeddings) and sets into plain JSON values"""
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    if isinstance(value, dict):
+        return {str(k): _to_jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return [_to_jsonable(v) for v in value]
+    return value
+
+
+def register_question(task_type, reference, question_id=None):
+    """
+    Precompute and persist every reference-side artifact for a question.
+    Returns the stored question record (without the artifact payloads).
+    """
+    if task_type not in TASK_SERVICES:
+        raise ValueError(f"Unknown task_type '{task_type}'. Expected one of: {', '.join(sorted(TASK_SERVICES))}")
+    if not reference or not reference.strip():
+        raise ValueError("Reference text is empty")
+
+    service = importlib.import_module(TASK_SERVICES[task_type])
+    artifacts = _to_jsonable(service.precompute_reference_artifacts(reference))
+    question_id = question_id or uuid.uuid4().hex
+    ref_hash = reference_hash(reference)
+
+    with closing(_connect()) as conn, conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO questions "
+            "(question_id, task_type, reference, reference_hash, artifacts, artifacts_version, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (question_id, task_type, reference, ref_hash, json.dumps(artifacts), ARTIFACTS_VERSION, time.time())
+        )
+    _forget(task_type, ref_hash)
+    logger.info(f"Registered {task_type} question {question_id} with artifacts: {sorted(artifacts)}")
+    return {
+        'question_id': question_id,
+        'task_type': task_type,
+        'reference': reference,
+        'artifacts': sorted(artifacts),
+    }
+
+
+def get_question(question_id):
+    """Return the stored question record, or None if it is not registered"""
+    with closing(_connect()) as conn:
+        row = conn.execute(
+            "SELECT question_id, task_type, reference, artifacts, artifacts_version, created_at "
+            "FROM questions WHERE question_id = ?",
+            (question_id,)
+        ).fetchone()
+    if row is None:
+        return None
+    return {
+        'question_id': row[0],
+        'task_type': row[1],
+        'reference': row[2],
+        'artifacts': sorted(json.loads(row[3])),
+        'stale': row[4] != ARTIFACTS_VERSION,
+        'created_at': row[5],
+    }
+
+
+def delete_question(question_id):
+    """Remove a question from the bank. Returns True if it existed."""
+    with closing(_connect()) as conn, conn:
+        row = conn.execute(
+            "SELECT task_type, reference_hash FROM questions WHERE question_id = ?", (question_id,)
+        ).fetchone()
+        if row is None:
+            return False
+        conn.execute("DELETE FROM questions WHERE question_id = ?", (question_id,))
+    _forget(row[0], row[1])
+    return True
+
+
+def resolve_reference(reference, question_id):
+    """Return the request's reference text, falling back to the registered question's reference"""
+    if reference or not question_id:
+        return reference
+    question = get_question(question_id)
+    return question['reference'] if question else None
+
+
+def _load_artifacts(task_type, reference):
+    ref_hash = reference_hash(reference)
+    key = cache_key(task_type, ref_hash)
+    artifacts = _artifacts_cache.get(key)
+    if artifacts is not None:
+        return artifacts
+    # Misses are remembered for a while so unregistered references skip SQLite
+    if _misses_cache.get(key) is not None:
+        return None
+    try:
+        with closing(_connect()) as conn:
+            row = conn.execute(
+                "SELECT artifacts, artifacts_version FROM questions "
+                "WHERE task_type = ? AND reference_hash = ? ORDER BY created_at DESC LIMIT 1",
+                (task_type, ref_hash)
+            ).fetchone()
+    except sqlite3.Error as e:
+        logger.warning(f"Question bank lookup failed: {e}")
+        return None
+    if row is None or row[1] != ARTIFACTS_VERSION:
+        _misses_cache.set(key, True)
+        return None
+    artifacts = json.loads(row[0])
+    _artifacts_cache.set(key, artifacts)
+    return artifacts
+
+
+def reference_artifact(task_type, reference, name, compute):
+    """
+    Return a precomputed reference artifact if the reference is registered
+    for `task_type`, otherwise compute it on the fly with `compute()`.
+    Artifacts are never shared across task types: services store different
+    embeddings and key ideas under the same names.
+    """
+    artifacts = _load_artifacts(task_type, reference)
+    if artifacts is not None and name in artifacts:
+        return artifacts[name]
+    return compute()
@@ -2,10 +2,10 @@ import whisperx
 import librosa
 import numpy as np
 import nltk
-from jiwer import wer
-import difflib
-import re
 from sentence_transformers import SentenceTransformer, util
+from app.services.question_bank_service import reference_artifact
+from app.services.word_alignment import WordAlignment
+from app.services.syllables import SYLLABLES_ARTIFACT, count_syllables
 
 # Download required NLTK data
 try:
@@ -16,9 +16,12 @@ except LookupError:
 # Load models
 sbert_model = SentenceTransformer('all-mpnet-base-v2', device="cpu")
 
-def count_syllables(text):
-    """Count syllables in text"""
-    return sum(len(re.findall(r'[aeiouy]+', word)) for word in text.split())
+# Word highlight status for each alignment opcode
+READ_ALOUD_STATUS = {'equal': "good", 'replace': "average", 'delete': "missing", 'insert': "extra"}
+
+def precompute_reference_artifacts(reference):
+    """Compute the reference-only artifacts used by Read Aloud scoring"""
+    return {SYLLABLES_ARTIFACT: count_syllables(reference.strip().lower())}
 
 def scale_fluency(val):
     """Scale fluency value to 10-90 range"""
@@ -54,31 +57,17 @@ def evaluate_read_aloud(audio_file, reference_text):
         asr_text = " ".join([seg['text'] for seg in result['segments']]).strip().lower()
         
         # Clean reference text
+        syllables_ref = reference_artifact('read_aloud', reference_text, SYLLABLES_ARTIFACT,
+                                           lambda: count_syllables(reference_text.strip().lower()))
         reference_text = reference_text.strip().lower()
         
         # === 1. CONTENT SCORING (10-90) ===
         # Direct word-by-word comparison with reference text
-        ref_words = reference_text.split()
-        asr_words = asr_text.split()
-        
-        matcher = difflib.SequenceMatcher(None, ref_words, asr_words)
-        word_feedback = []
-        correct_words = 0
-        total_words = len(ref_words)
-        
-        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
-            if tag == 'equal':
-                correct_words += (i2 - i1)
-                word_feedback.extend([(ref_words[i], "good") for i in range(i1, i2)])
-            elif tag == 'replace':
-                word_feedback.extend([(ref_words[i], "average") for i in range(i1, i2)])
-            elif tag == 'delete':
-                word_feedback.extend([(ref_words[i], "missing") for i in range(i1, i2)])
-            elif tag == 'insert':
-                word_feedback.extend([(asr_words[j], "extra") for j in range(j1, j2)])
+        alignment = WordAlignment(reference_text, asr_text)
+        word_feedback = [(word, READ_ALOUD_STATUS[tag]) for tag, word, _ in alignment.word_ops()]
         
         # Content score based on word accuracy only (direct matching)
-        word_accuracy = (correct_words / total_words) if total_words > 0 else 0
+        word_accuracy = alignment.word_accuracy
         
         # If word accuracy is less than 60%, set content score to 10
         if word_accuracy < 0.60:
@@ -92,13 +81,12 @@ def evaluate_read_aloud(audio_file, reference_text):
         duration_sec = librosa.get_duration(y=audio, sr=sr)
         
         # Syllable analysis
-        syllables_ref = count_syllables(reference_text)
         syllables_asr = count_syllables(asr_text)
         syllable_error = abs(syllables_ref - syllables_asr)
         syllable_accuracy = max(0, 1 - (syllable_error / syllables_ref)) * 100 if syllables_ref > 0 else 0
         
         # Word Error Rate (WER)
-        wer_value = wer(reference_text, asr_text)
+        wer_value = alignment.wer
         pron_accuracy_pct = max(0, (1 - wer_value)) * 100
         
         # Intonation analysis
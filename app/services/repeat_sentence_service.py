@@ -1,12 +1,12 @@
 import nltk
 from difflib import SequenceMatcher
-import re
 import librosa
 import numpy as np
 import os
-import difflib
-from jiwer import wer
 from app.services.audio_transcriber import transcribe_audio
+from app.services.question_bank_service import reference_artifact
+from app.services.word_alignment import WordAlignment
+from app.services.syllables import SYLLABLES_ARTIFACT, count_syllables
 
 # Download required NLTK data
 try:
@@ -14,6 +14,9 @@ try:
 except LookupError:
     nltk.download('punkt')
 
+# Word highlight status for each alignment opcode
+REPEAT_SENTENCE_STATUS = {'equal': "correct", 'replace': "incorrect", 'delete': "missing", 'insert': "extra"}
+
 def tokenize(sentence):
     """Tokenize a sentence into lowercase words."""
     return nltk.word_tokenize(sentence.lower())
@@ -25,62 +28,26 @@ def calculate_sequence_match_ratio(reference_tokens, response_tokens):
     match_count = sum(block.size for block in match_blocks)
     return match_count / len(reference_tokens) if reference_tokens else 0
 
-def content_score(reference, response):
+def content_score(reference, response, alignment=None):
     """Content scoring using the same logic as read aloud"""
     # Direct word-by-word comparison with reference text
-    ref_words = reference.lower().split()
-    res_words = response.lower().split()
-    
-    matcher = difflib.SequenceMatcher(None, ref_words, res_words)
-    correct_words = 0
-    total_words = len(ref_words)
-    word_highlights = []
-    
-    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
-        if tag == 'equal':
-            correct_words += (i2 - i1)
-            # Add correct words to highlights
-            for i in range(i1, i2):
-                word_highlights.append({
-                    "word": ref_words[i],
-                    "status": "correct",
-                    "replacement": None
-                })
-        elif tag == 'replace':
-            # Add replaced words (reference words marked as incorrect)
-            for i in range(i1, i2):
-                word_highlights.append({
-                    "word": ref_words[i],
-                    "status": "incorrect",
-                    "replacement": res_words[j1] if j1 < len(res_words) else None
-                })
-        elif tag == 'delete':
-            # Add missing words
-            for i in range(i1, i2):
-                word_highlights.append({
-                    "word": ref_words[i],
-                    "status": "missing",
-                    "replacement": None
-                })
-        elif tag == 'insert':
-            # Add extra words (response words not in reference)
-            for j in range(j1, j2):
-                word_highlights.append({
-                    "word": res_words[j],
-                    "status": "extra",
-                    "replacement": None
-                })
+    alignment = alignment or WordAlignment(reference.lower(), response.lower())
+    word_highlights = [
+        {"word": word, "status": REPEAT_SENTENCE_STATUS[tag], "replacement": replacement}
+        for tag, word, replacement in alignment.word_ops()
+    ]
     
     # Word accuracy calculation
-    word_accuracy = (correct_words / total_words) if total_words > 0 else 0
+    word_accuracy = alignment.word_accuracy
     
     # Normal scoring without 60% threshold
     score = max(10, min(90, round(word_accuracy * 90, 2)))
     
     return score, word_highlights
 
-def count_syllables(text):
-    return sum(len(re.findall(r'[aeiouy]+', word)) for word in text.split())
+def precompute_reference_artifacts(reference):
+    """Compute the reference-only artifacts used by Repeat Sentence scoring"""
+    return {SYLLABLES_ARTIFACT: count_syllables(reference)}
 
 def rubric_score(wer_val, syllable_acc, inton_std):
     """Get rubric level and description"""
@@ -118,16 +85,18 @@ def scale_pronunciation(val):
     val = np.clip(val, 1.5, 5.0)
     return 10 + ((val - 1.5) / (5.0 - 1.5))**2 * 80
 
-def score_pronunciation(transcript, audio, sr, duration_sec, reference_text):
+def score_pronunciation(transcript, audio, sr, duration_sec, reference_text, alignment=None, syllables_asr=None):
     """Pronunciation scoring using the same logic as read aloud"""
     # Syllable analysis
-    syllables_ref = count_syllables(reference_text)
-    syllables_asr = count_syllables(transcript)
+    syllables_ref = reference_artifact('repeat_sentence', reference_text, SYLLABLES_ARTIFACT, lambda: count_syllables(reference_text))
+    if syllables_asr is None:
+        syllables_asr = count_syllables(transcript)
     syllable_error = abs(syllables_ref - syllables_asr)
     syllable_accuracy = max(0, 1 - (syllable_error / syllables_ref)) * 100 if syllables_ref > 0 else 0
     
     # Word Error Rate (WER)
-    wer_value = wer(reference_text.lower(), transcript.lower())
+    alignment = alignment or WordAlignment(reference_text.lower(), transcript.lower())
+    wer_value = alignment.wer
     pron_accuracy_pct = max(0, (1 - wer_value)) * 100
     
     # Intonation analysis
@@ -148,8 +117,9 @@ def scale_fluency(val):
     val = np.clip(val, 1.0, 5.0)
     return 10 + ((val - 1.0) / (5.0 - 1.0))**1.5 * 80
 
-def score_fluency(transcript, audio, sr, duration_sec):
-    syllables_asr = count_syllables(transcript)
+def score_fluency(transcript, audio, sr, duration_sec, syllables_asr=None):
+    if syllables_asr is None:
+        syllables_asr = count_syllables(transcript)
     speech_rate = syllables_asr / duration_sec if duration_sec > 0 else 0
     try:
         pitches, magnitudes = librosa.piptrack(y=audio, sr=sr, threshold=0.1)
@@ -197,9 +167,13 @@ def evaluate_repeat_sentence(reference_text, file, upload_folder):
     try:
         audio, sr = librosa.load(tmp_path, sr=16000)
         duration_sec = librosa.get_duration(y=audio, sr=sr)
-        content, word_highlights = content_score(reference_text, transcript)
-        pronunciation = score_pronunciation(transcript, audio, sr, duration_sec, reference_text)
-        fluency = score_fluency(transcript, audio, sr, duration_sec)
+        # Align the texts and count syllables once for all three scores
+        alignment = WordAlignment(reference_text.lower(), transcript.lower())
+        syllables_asr = count_syllables(transcript)
+        content, word_highlights = content_score(reference_text, transcript, alignment)
+        pronunciation = score_pronunciation(transcript, audio, sr, duration_sec, reference_text,
+                                            alignment, syllables_asr)
+        fluency = score_fluency(transcript, audio, sr, duration_sec, syllables_asr)
         
         # === ENHANCED CONTENT-BASED PENALTY SYSTEM ===
         # Calculate penalty multiplier based on content performance
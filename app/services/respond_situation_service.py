@@ -4,8 +4,9 @@ import librosa
 import torch
 from sentence_transformers import SentenceTransformer, util
 import nltk
-import re
 from app.services.audio_transcriber import transcribe_audio
+from app.services.question_bank_service import reference_artifact
+from app.services.syllables import count_syllables
 
 nltk.download('punkt', quiet=True)
 
@@ -14,10 +15,15 @@ semantic_model = SentenceTransformer('all-MiniLM-L6-v2', device="cpu")
 
 # --- Content Scoring ---
 def semantic_similarity(reference: str, response: str) -> float:
-    ref_emb = semantic_model.encode(reference, convert_to_tensor=True)
+    ref_emb = reference_artifact('respond_situation', reference, 'reference_embedding',
+                                 lambda: semantic_model.encode(reference, convert_to_tensor=True))
     resp_emb = semantic_model.encode(response, convert_to_tensor=True)
     return util.pytorch_cos_sim(ref_emb, resp_emb).item()
 
+def precompute_reference_artifacts(reference: str) -> dict:
+    """Compute the reference-only artifacts used by Respond to a Situation scoring"""
+    return {'reference_embedding': semantic_model.encode(reference, convert_to_tensor=True)}
+
 def extract_keywords(text: str, keywords: list) -> list:
     found = []
     text = text.lower()
@@ -47,9 +53,6 @@ def score_content(reference: str, response: str) -> int:
     return max(10, min(90, raw))
 
 # --- Pronunciation Scoring ---
-def count_syllables(text):
-    return sum(len(re.findall(r'[aeiouy]+', word)) for word in text.split())
-
 def rubric_score_ref_free(asr_text, syllables, intonation_std, speech_rate):
     word_count = len(asr_text.split())
     fluent = 2.5 <= speech_rate <= 4.0
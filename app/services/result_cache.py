@@ -0,0 +1,112 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import closing
+
+logger = logging.getLogger(__name__)
+
+
+def cache_key(*parts):
+    """Hash any JSON-serializable parts into a fixed-size cache key"""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ResultCache:
+    """
+    Bounded in-process LRU cache for JSON-serializable values.
+
+    When `db_path` is set, entries are also written to a SQLite table so every
+    worker on the host shares them. The table is trimmed to `max_db_entries`.
+    Entries older than `ttl` seconds (if set) are treated as missing.
+    """
+
+    def __init__(self, name, max_entries=1024, db_path=None, max_db_entries=100000, ttl=None):
+        self.name = name
+        self.max_entries = max_entries
+        self.db_path = db_path
+        self.max_db_entries = max_db_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        if db_path:
+            with closing(self._connect()) as conn, conn:
+                conn.execute(
+                    f"CREATE TABLE IF NOT EXISTS {self.name} ("
+                    "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+                )
+                conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{self.name}_created ON {self.name} (created_at)")
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=5)
+
+    def _expired(self, created_at):
+        return self.ttl is not None and time.time() - created_at > self.ttl
+
+    def _remember(self, key, value, created_at):
+        with self._lock:
+            self._entries[key] = (value, created_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, key):
+        """Return the cached value, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if not self._expired(entry[1]):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[0]
+                del self._entries[key]
+        if self.db_path:
+            try:
+                with closing(self._connect()) as conn:
+                    row = conn.execute(f"SELECT value, created_at FROM {self.name} WHERE key = ?", (key,)).fetchone()
+            except sqlite3.Error as e:
+                logger.warning(f"{self.name} cache read failed: {e}")
+                row = None
+            if row is not None and not self._expired(row[1]):
+                value = json.loads(row[0])
+                self._remember(key, value, row[1])
+                self.hits += 1
+                return value
+        self.misses += 1
+        return None
+
+    def discard(self, key):
+        """Drop `key` from this worker's entries (the shared SQLite table is left alone)"""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def set(self, key, value):
+        created_at = time.time()
+        self._remember(key, value, created_at)
+        if not self.db_path:
+            return
+        try:
+            with closing(self._connect()) as conn, conn:
+                conn.execute(
+                    f"INSERT OR REPLACE INTO {self.name} (key, value, created_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(value, ensure_ascii=False), created_at)
+                )
+                self._writes += 1
+                if self._writes % 1000 == 0:
+                    conn.execute(
+                        f"DELETE FROM {self.name} WHERE key IN ("
+                        f"SELECT key FROM {self.name} ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                        (self.max_db_entries,)
+                    )
+        except sqlite3.Error as e:
+            logger.warning(f"{self.name} cache write failed: {e}")
+
+    def stats(self):
+        return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
@@ -1,13 +1,16 @@
 import nltk
 from nltk.tokenize import word_tokenize
-from nltk.corpus import stopwords, wordnet
+from nltk.corpus import stopwords
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 import numpy as np
-import re
 import librosa
 import os
 from app.services.audio_transcriber import transcribe_audio
+from app.services.idf_model import idf_model
+from app.services.question_bank_service import reference_artifact
+from app.services.synonym_index import synonym_index
+from app.services.syllables import count_syllables
 
 # Download required NLTK data
 nltk.download('punkt')
@@ -15,14 +18,19 @@ nltk.download('stopwords')
 nltk.download('wordnet')
 nltk.download('omw-1.4')
 
+# Key terms depend on the IDF table, so each fitted table gets its own artifact
+KEY_TERMS_ARTIFACT = f'reference_key_terms@{idf_model.fingerprint}' if idf_model else 'reference_key_terms'
+
 class GracefulContentScorer:
     def __init__(self):
-        self.vectorizer = TfidfVectorizer()
         self.stop_words = set(stopwords.words('english'))
 
     def extract_key_terms(self, text, top_n=10):
-        tfidf = self.vectorizer.fit_transform([text])
-        feature_names = self.vectorizer.get_feature_names_out()
+        if idf_model is not None:
+            return idf_model.key_terms(text, self.stop_words, top_n)
+        vectorizer = TfidfVectorizer()
+        tfidf = vectorizer.fit_transform([text])
+        feature_names = vectorizer.get_feature_names_out()
         scores = tfidf.toarray()[0]
         top_indices = np.argsort(scores)[::-1]
         terms = []
@@ -34,39 +42,21 @@ class GracefulContentScorer:
                 break
         return terms
 
-    def _get_synonyms(self, word):
-        synonyms = set()
-        for syn in wordnet.synsets(word):
-            for lemma in syn.lemmas():
-                synonyms.add(lemma.name().lower().replace('_', ' '))
-        return synonyms
-
     def compute_semantic_overlap(self, ref_terms, resp_terms):
         if not ref_terms:
             return 0.0
-        resp_set = set(resp_terms)
-        matched_count = 0
-        for ref_term in ref_terms:
-            ref_syns = self._get_synonyms(ref_term)
-            found_match = False
-            for resp_term in resp_set:
-                if resp_term == ref_term:
-                    found_match = True
-                    break
-                if resp_term in ref_syns or ref_term in self._get_synonyms(resp_term):
-                    found_match = True
-                    break
-            if found_match:
-                matched_count += 1
+        matched_count = synonym_index.count_matches(ref_terms, resp_terms)
         return (matched_count / len(ref_terms)) * 100
 
     def compute_tfidf_similarity(self, reference, response):
-        tfidf_matrix = self.vectorizer.fit_transform([reference, response])
+        if idf_model is not None:
+            return idf_model.similarity(reference, response) * 100
+        tfidf_matrix = TfidfVectorizer().fit_transform([reference, response])
         similarity = cosine_similarity(tfidf_matrix[0:1], tfidf_matrix[1:2])[0][0]
         return similarity * 100
 
     def score(self, reference, response):
-        ref_terms = self.extract_key_terms(reference)
+        ref_terms = reference_artifact('retell_lecture', reference, KEY_TERMS_ARTIFACT, lambda: self.extract_key_terms(reference))
         resp_terms = self.extract_key_terms(response)
         semantic_overlap = self.compute_semantic_overlap(ref_terms, resp_terms)
         tfidf_similarity = self.compute_tfidf_similarity(reference, response)
@@ -81,8 +71,12 @@ class GracefulContentScorer:
             "response_key_terms": resp_terms
         }
 
-def count_syllables(text):
-    return sum(len(re.findall(r'[aeiouy]+', word)) for word in text.split())
+# Stateless between requests, so one instance serves every request
+content_scorer = GracefulContentScorer()
+
+def precompute_reference_artifacts(reference):
+    """Compute the reference-only artifacts used by content scoring"""
+    return {KEY_TERMS_ARTIFACT: content_scorer.extract_key_terms(reference)}
 
 def rubric_score_ref_free(asr_text, syllables, intonation_std, speech_rate):
     word_count = len(asr_text.split())
@@ -174,7 +168,7 @@ def evaluate_retell_lecture(reference_text, file, upload_folder):
     try:
         audio, sr = librosa.load(tmp_path, sr=16000)
         duration_sec = librosa.get_duration(y=audio, sr=sr)
-        content_result = GracefulContentScorer().score(reference_text, transcript)
+        content_result = content_scorer.score(reference_text, transcript)
         content_score = content_result.pop('final_score')
         pronunciation = score_pronunciation(transcript, audio, sr, duration_sec)
         fluency = score_fluency(transcript, audio, sr, duration_sec)
@@ -1,10 +1,15 @@
 from sentence_transformers import SentenceTransformer, util
-import language_tool_python
 import re
 import math
 from collections import Counter
 import nltk
 from nltk.tokenize import word_tokenize, sent_tokenize
+from app.services.question_bank_service import reference_artifact
+from app.services.grammar_service import lang_tool
+from app.services.highlight_service import build_word_highlights
+from app.services.phrase_lexicon import PhraseLexicon
+from app.services.key_ideas import keyword_key_ideas as extract_key_ideas
+from app.services.vocabulary_lexicon import profile as vocabulary_profile
 
 # Download required NLTK data
 try:
@@ -14,54 +19,10 @@ except LookupError:
 
 # Load models/tools once
 sbert_model = SentenceTransformer('all-mpnet-base-v2', device="cpu")
-lang_tool = language_tool_python.LanguageTool('en-US')
 
-def cefr_level(word):
-    """
-    Simplified CEFR level detection - you can replace this with vocab_level.cefr_level
-    """
-    # Basic CEFR level mapping (simplified)
-    a1_words = {'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'is', 'are', 'was', 'were', 'be', 'been', 'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would', 'could', 'should', 'may', 'might', 'can', 'must', 'shall'}
-    a2_words = {'good', 'bad', 'big', 'small', 'new', 'old', 'young', 'hot', 'cold', 'happy', 'sad', 'easy', 'hard', 'fast', 'slow', 'high', 'low', 'long', 'short', 'right', 'wrong', 'same', 'different', 'first', 'last', 'next', 'last', 'many', 'much', 'few', 'little', 'some', 'any', 'all', 'every', 'each', 'other', 'another'}
-    b1_words = {'important', 'necessary', 'possible', 'impossible', 'difficult', 'simple', 'complex', 'basic', 'advanced', 'modern', 'traditional', 'personal', 'public', 'private', 'national', 'international', 'local', 'global', 'economic', 'social', 'political', 'cultural', 'environmental', 'educational', 'professional', 'commercial', 'industrial', 'agricultural'}
-    b2_words = {'significant', 'substantial', 'considerable', 'remarkable', 'notable', 'distinctive', 'characteristic', 'representative', 'typical', 'conventional', 'contemporary', 'innovative', 'revolutionary', 'fundamental', 'essential', 'crucial', 'critical', 'vital', 'indispensable', 'comprehensive', 'thorough', 'extensive', 'intensive', 'systematic', 'methodical', 'analytical', 'theoretical', 'practical', 'empirical', 'experimental'}
-    c1_words = {'sophisticated', 'elaborate', 'intricate', 'nuanced', 'subtle', 'profound', 'profound', 'comprehensive', 'exhaustive', 'meticulous', 'rigorous', 'methodological', 'conceptual', 'theoretical', 'philosophical', 'ideological', 'paradigmatic', 'epistemological', 'ontological', 'phenomenological', 'hermeneutic', 'dialectical', 'heuristic', 'algorithmic', 'stochastic', 'probabilistic', 'deterministic', 'systemic', 'holistic', 'integrative'}
-    c2_words = {'esoteric', 'arcane', 'abstruse', 'recondite', 'cryptic', 'enigmatic', 'paradoxical', 'oxymoronic', 'tautological', 'redundant', 'superfluous', 'extraneous', 'tangential', 'peripheral', 'marginal', 'negligible', 'infinitesimal', 'minuscule', 'microscopic', 'macroscopic', 'cosmic', 'universal', 'omnipresent', 'ubiquitous', 'pervasive', 'permeating', 'saturating', 'infiltrating', 'penetrating', 'percolating'}
-    
-    word_lower = word.lower()
-    if word_lower in a1_words:
-        return "A1"
-    elif word_lower in a2_words:
-        return "A2"
-    elif word_lower in b1_words:
-        return "B1"
-    elif word_lower in b2_words:
-        return "B2"
-    elif word_lower in c1_words:
-        return "C1"
-    elif word_lower in c2_words:
-        return "C2"
-    else:
-        return None
-
-def word_frequency(word, lang='en'):
-    """
-    Simplified word frequency - you can replace this with wordfreq.word_frequency
-    """
-    # Basic frequency mapping (simplified)
-    high_freq = {'the', 'be', 'to', 'of', 'and', 'a', 'in', 'that', 'have', 'i', 'it', 'for', 'not', 'on', 'with', 'he', 'as', 'you', 'do', 'at', 'this', 'but', 'his', 'by', 'from', 'they', 'we', 'say', 'her', 'she', 'or', 'an', 'will', 'my', 'one', 'all', 'would', 'there', 'their', 'what', 'so', 'up', 'out', 'if', 'about', 'who', 'get', 'which', 'go', 'me'}
-    mid_freq = {'when', 'make', 'can', 'like', 'time', 'no', 'just', 'him', 'know', 'take', 'people', 'into', 'year', 'your', 'good', 'some', 'could', 'them', 'see', 'other', 'than', 'then', 'now', 'look', 'only', 'come', 'its', 'over', 'think', 'also', 'back', 'after', 'use', 'two', 'how', 'our', 'work', 'first', 'well', 'way', 'even', 'new', 'want', 'because', 'any', 'these', 'give', 'day', 'most', 'us'}
-    low_freq = {'important', 'necessary', 'possible', 'difficult', 'simple', 'complex', 'basic', 'advanced', 'modern', 'traditional', 'personal', 'public', 'private', 'national', 'international', 'local', 'global', 'economic', 'social', 'political', 'cultural', 'environmental', 'educational', 'professional', 'commercial', 'industrial', 'agricultural'}
-    
-    word_lower = word.lower()
-    if word_lower in high_freq:
-        return 0.001  # High frequency
-    elif word_lower in mid_freq:
-        return 0.0001  # Mid frequency
-    elif word_lower in low_freq:
-        return 0.00001  # Low frequency
-    else:
-        return 0.000001  # Rare
+FLOW_LEXICON = PhraseLexicon({
+    'flow': ['first', 'second', 'third', 'finally', 'also', 'furthermore', 'moreover', 'however', 'nevertheless', 'therefore', 'consequently'],
+})
 
 def evaluate_sst_vocabulary(text):
     """
@@ -111,27 +72,10 @@ def evaluate_sst_vocabulary(text):
     
     total_words = len(words)
     
-    # CEFR Level Profile
-    cefr_profile = Counter()
-    for word in words:
-        level = cefr_level(word)
-        if level:
-            cefr_profile[level] += 1
-        else:
-            cefr_profile["None"] += 1
-    
-    # Frequency Profile
-    freq_profile = {"High_Freq": 0, "Mid_Freq": 0, "Low_Freq": 0, "Rare": 0}
-    for word in words:
-        freq = word_frequency(word, 'en')
-        if freq > 0.0001:
-            freq_profile["High_Freq"] += 1
-        elif freq > 0.00005:
-            freq_profile["Mid_Freq"] += 1
-        elif freq > 0.00001:
-            freq_profile["Low_Freq"] += 1
-        else:
-            freq_profile["Rare"] += 1
+    # CEFR Level and Frequency Profiles (one bulk lexicon lookup)
+    vocab_profile = vocabulary_profile(words)
+    cefr_profile = vocab_profile['cefr']
+    freq_profile = vocab_profile['frequency']
     
     # Academic Vocabulary Analysis
     academic_words = []
@@ -216,6 +160,15 @@ def evaluate_sst_vocabulary(text):
     
     return int(final_score)
 
+def precompute_reference_artifacts(reference):
+    """Compute the reference-only artifacts used by SST scoring"""
+    key_ideas = extract_key_ideas(reference)
+    return {
+        'reference_embedding': sbert_model.encode(reference, convert_to_tensor=True),
+        'key_ideas': key_ideas,
+        'key_idea_embeddings': [sbert_model.encode(idea, convert_to_tensor=True) for idea in key_ideas],
+    }
+
 def get_sst_content_rubric_description(score):
     """Get the rubric description for the given SST content score"""
     rubric_descriptions = {
@@ -232,47 +185,24 @@ def evaluate_sst_content_comprehension(summary, reference):
     Evaluate SST content using the new 4-point rubric
     """
     # Calculate semantic similarity
-    emb_ref = sbert_model.encode(reference, convert_to_tensor=True)
+    emb_ref = reference_artifact('sst', reference, 'reference_embedding',
+                                 lambda: sbert_model.encode(reference, convert_to_tensor=True))
     emb_sum = sbert_model.encode(summary, convert_to_tensor=True)
     similarity = util.cos_sim(emb_ref, emb_sum).item()
     
     # Extract key ideas from reference
-    def extract_key_ideas(text):
-        """Extract main ideas from text using sentence importance"""
-        try:
-            sentences = sent_tokenize(text)
-        except LookupError:
-            # Fallback if punkt is not available
-            sentences = [s.strip() + '.' for s in text.split('.') if s.strip()]
-        
-        # Simple keyword-based importance scoring
-        important_keywords = ['because', 'however', 'therefore', 'consequently', 'although', 'despite', 'while', 'when', 'if', 'then', 'but', 'and', 'or', 'so', 'yet', 'nevertheless', 'furthermore', 'moreover', 'additionally', 'in addition', 'for example', 'such as', 'specifically', 'particularly', 'especially', 'notably', 'significantly', 'importantly', 'crucially', 'essentially']
-        
-        sentence_scores = []
-        for sentence in sentences:
-            score = 0
-            words = sentence.lower().split()
-            for keyword in important_keywords:
-                if keyword in words:
-                    score += 1
-            # Bonus for longer sentences (more detailed)
-            if len(words) > 10:
-                score += 0.5
-            sentence_scores.append((sentence, score))
-        
-        # Return top sentences by score
-        sentence_scores.sort(key=lambda x: x[1], reverse=True)
-        return [sent for sent, score in sentence_scores[:3] if score > 0]
-    
-    reference_ideas = extract_key_ideas(reference)
+    reference_ideas = reference_artifact('sst', reference, 'key_ideas', lambda: extract_key_ideas(reference))
     summary_ideas = extract_key_ideas(summary)
     
     # Calculate idea coverage
     idea_coverage = 0
     if reference_ideas:
         covered_ideas = 0
-        for ref_idea in reference_ideas:
-            ref_idea_emb = sbert_model.encode(ref_idea, convert_to_tensor=True)
+        ref_idea_embs = reference_artifact(
+            'sst', reference, 'key_idea_embeddings',
+            lambda: [sbert_model.encode(idea, convert_to_tensor=True) for idea in reference_ideas]
+        )
+        for ref_idea_emb in ref_idea_embs:
             max_sim = 0
             for sum_idea in summary_ideas:
                 sum_idea_emb = sbert_model.encode(sum_idea, convert_to_tensor=True)
@@ -355,8 +285,7 @@ def evaluate_sst_content_comprehension(summary, reference):
         avg_sentence_length = sum(len(sent.split()) for sent in sentences) / len(sentences)
         
         # Check for logical flow indicators
-        flow_indicators = ['first', 'second', 'third', 'finally', 'also', 'furthermore', 'moreover', 'however', 'nevertheless', 'therefore', 'consequently']
-        flow_count = sum(1 for indicator in flow_indicators if indicator.lower() in summary.lower())
+        flow_count = len(FLOW_LEXICON.scan(summary)['flow'])
         
         # Coherence score based on sentence structure and flow
         coherence_score = min(1.0, (avg_sentence_length / 15) + (flow_count / len(sentences)))
@@ -495,47 +424,7 @@ def evaluate_sst_service(summary, reference):
         scores['spelling'] = 2  # Default to perfect if tool fails
     
     # === Word Highlights for Grammar/Spelling Errors ===
-    word_highlights = []
-    summary_words = summary.split()
-    
-    # Initialize all words as correct
-    for word in summary_words:
-        word_highlights.append({"word": word, "status": "correct", "replacement": None})
-    
-    # Process grammar errors
-    for error in grammar_errors:
-        error_text = summary[error.offset:error.offset+error.errorLength]
-        error_words = error_text.split()
-        
-        # Find matching words in highlights (more robust matching)
-        for i, highlight in enumerate(word_highlights):
-            # Clean the highlight word (remove punctuation)
-            clean_highlight = highlight['word'].rstrip('.,!?;:')
-            if clean_highlight in error_words or highlight['word'] in error_words:
-                word_highlights[i] = {
-                    "word": highlight['word'],
-                    "status": "grammar",
-                    "replacement": error.replacements[0] if error.replacements else None,
-                }
-                # Don't break - highlight all matching words
-    
-    # Process spelling errors
-    for error in spelling_errors:
-        error_text = summary[error.offset:error.offset+error.errorLength]
-        error_words = error_text.split()
-        suggestions = error.replacements[:3] if error.replacements else []
-        
-        # Find matching words in highlights (more robust matching)
-        for i, highlight in enumerate(word_highlights):
-            # Clean the highlight word (remove punctuation)
-            clean_highlight = highlight['word'].rstrip('.,!?;:')
-            if clean_highlight in error_words or highlight['word'] in error_words:
-                word_highlights[i] = {
-                    "word": highlight['word'],
-                    "status": "spelling",
-                    "suggestions": suggestions,
-                }
-                # Don't break - highlight all matching words
+    word_highlights = build_word_highlights(summary, grammar_errors, spelling_errors)
     
     # === Final Total (updated for 4-point content) ===
     total = sum(scores.values())
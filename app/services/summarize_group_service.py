@@ -5,6 +5,10 @@ import torch
 import nltk
 import re
 from app.services.audio_transcriber import transcribe_audio
+from app.services.question_bank_service import reference_artifact
+from app.services.phrase_lexicon import PhraseLexicon
+from app.services.result_cache import ResultCache, cache_key
+from app.services.syllables import count_syllables
 from sentence_transformers import SentenceTransformer, util
 import logging
 
@@ -16,6 +20,30 @@ logging.info(f"Loading SentenceTransformer model '{MODEL_NAME}' at startup...")
 SENTENCE_TRANSFORMER_MODEL = SentenceTransformer(MODEL_NAME, device="cpu")
 logging.info("✅ SentenceTransformer model loaded and ready.")
 
+SUBJECTIVE_WORDS = frozenset({
+    'think', 'feel', 'believe', 'guess', 'suppose', 'assume', 'reckon',
+    'probably', 'maybe', 'perhaps', 'possibly', 'likely', 'unlikely',
+    'might', 'could', 'may', 'seem', 'appear', 'suggest', 'suggests',
+    'in my opinion', 'i feel', 'i think', 'i believe', 'personally',
+    'from my perspective', 'it seems to me',
+    'somewhat', 'rather', 'quite', 'fairly', 'relatively',
+    'allegedly', 'supposedly', 'reportedly', 'apparently'
+})
+# Multi-word subjective phrases, matched on word boundaries in one pass
+SUBJECTIVE_PHRASES = PhraseLexicon(
+    {'subjective': [phrase for phrase in SUBJECTIVE_WORDS if ' ' in phrase]}, word_boundary=True
+)
+
+# Transcript parsing patterns
+NARRATOR_LINE = re.compile(r'Narrator?:\s*[^\.]+\.', re.IGNORECASE)
+# Handles "Speaker 1:" format with optional spaces
+SPEAKER_SPLIT = re.compile(r'([A-Za-z]+\s*\d*|[A-Z][a-z]+):\s*')
+SPEAKER_LABEL = re.compile(r'^[A-Za-z]+\s*\d*$')
+SPEAKER_LINE = re.compile(r'^(Speaker\s*\d+):\s*(.*)', re.IGNORECASE)
+
+# Reference transcript -> parsed speakers, for references not in the question bank
+PARSED_TRANSCRIPTS = ResultCache('parsed_transcripts', max_entries=256)
+
 # Provided ContinuousContentScorer
 class ContinuousContentScorer:
     """
@@ -31,19 +59,11 @@ class ContinuousContentScorer:
     def __init__(self, model=None):
         try:
             self.model = model if model is not None else SENTENCE_TRANSFORMER_MODEL
-            logging.info(f"Using SentenceTransformer model: {MODEL_NAME}")
+            logging.debug(f"Using SentenceTransformer model: {MODEL_NAME}")
         except Exception as e:
             logging.error(f"Failed to load model {MODEL_NAME}: {e}")
             raise
-        self.subjective_words = {
-            'think', 'feel', 'believe', 'guess', 'suppose', 'assume', 'reckon',
-            'probably', 'maybe', 'perhaps', 'possibly', 'likely', 'unlikely',
-            'might', 'could', 'may', 'seem', 'appear', 'suggest', 'suggests',
-            'in my opinion', 'i feel', 'i think', 'i believe', 'personally',
-            'from my perspective', 'it seems to me',
-            'somewhat', 'rather', 'quite', 'fairly', 'relatively',
-            'allegedly', 'supposedly', 'reportedly', 'apparently'
-        }
+        self.subjective_words = SUBJECTIVE_WORDS
     def preprocess_text(self, text: str) -> str:
         if not text:
             return ""
@@ -65,48 +85,47 @@ class ContinuousContentScorer:
         words = processed_text.split()
         if not words:
             return 0.0
-        subjective_count = 0
-        for word in self.subjective_words:
-            if ' ' not in word:
-                subjective_count += words.count(word)
-            else:
-                pattern = r'\b' + re.escape(word) + r'\b'
-                subjective_count += len(re.findall(pattern, processed_text))
+        subjective_count = sum(1 for word in words if word in self.subjective_words)
+        subjective_count += sum(SUBJECTIVE_PHRASES.scan(processed_text)['subjective'].values())
         return subjective_count / len(words)
     def parse_transcript(self, transcript_text: str) -> dict:
         if not transcript_text:
             return {}
+        key = cache_key(transcript_text)
+        speakers_dict = PARSED_TRANSCRIPTS.get(key)
+        if speakers_dict is None:
+            speakers_dict = self._parse_transcript(transcript_text)
+            PARSED_TRANSCRIPTS.set(key, speakers_dict)
+        return speakers_dict
+    def _parse_transcript(self, transcript_text: str) -> dict:
+        logging.debug(f"Parsing transcript: {transcript_text[:200]}...")
         
-        logging.info(f"Parsing transcript: {transcript_text[:200]}...")
-        
-        text = re.sub(r'Narrator?:\s*[^\.]+\.', '', transcript_text, flags=re.IGNORECASE)
-        # Updated regex to handle "Speaker 1:" format with optional spaces
-        speaker_pattern = r'([A-Za-z]+\s*\d*|[A-Z][a-z]+):\s*'
-        parts = re.split(speaker_pattern, text)
+        text = NARRATOR_LINE.sub('', transcript_text)
+        parts = SPEAKER_SPLIT.split(text)
         parts = [part.strip() for part in parts if part.strip()]
         
-        logging.info(f"Split parts: {parts[:5]}...")
+        logging.debug(f"Split parts: {parts[:5]}...")
         
         speakers_dict = {}
         current_speaker = None
         
         for i, part in enumerate(parts):
             # Check if this part is a speaker identifier (ends with colon or matches speaker pattern)
-            if re.match(r'^[A-Za-z]+\s*\d*$', part) or part.endswith(':'):
+            if SPEAKER_LABEL.match(part) or part.endswith(':'):
                 current_speaker = part.rstrip(':')  # Remove colon if present
-                logging.info(f"Found speaker: {current_speaker}")
+                logging.debug(f"Found speaker: {current_speaker}")
                 continue
             elif current_speaker:
                 sentences = self.tokenize_sentences(part)
                 if current_speaker not in speakers_dict:
                     speakers_dict[current_speaker] = []
                 speakers_dict[current_speaker].extend(sentences)
-                logging.info(f"Added {len(sentences)} sentences for {current_speaker}")
+                logging.debug(f"Added {len(sentences)} sentences for {current_speaker}")
                 current_speaker = None
         
         # If no speakers were parsed, try alternative parsing
         if not speakers_dict:
-            logging.info("Primary parsing failed, trying fallback method...")
+            logging.debug("Primary parsing failed, trying fallback method...")
             # Fallback: split by lines and look for speaker patterns
             lines = transcript_text.split('\n')
             for line in lines:
@@ -114,7 +133,7 @@ class ContinuousContentScorer:
                 if not line:
                     continue
                 # Look for "Speaker X:" pattern
-                speaker_match = re.match(r'^(Speaker\s*\d+):\s*(.*)', line, re.IGNORECASE)
+                speaker_match = SPEAKER_LINE.match(line)
                 if speaker_match:
                     speaker_id = speaker_match.group(1)
                     content = speaker_match.group(2).strip()
@@ -123,9 +142,9 @@ class ContinuousContentScorer:
                         if speaker_id not in speakers_dict:
                             speakers_dict[speaker_id] = []
                         speakers_dict[speaker_id].extend(sentences)
-                        logging.info(f"Fallback: Added {len(sentences)} sentences for {speaker_id}")
+                        logging.debug(f"Fallback: Added {len(sentences)} sentences for {speaker_id}")
         
-        logging.info(f"Final speakers dict: {list(speakers_dict.keys())}")
+        logging.debug(f"Final speakers dict: {list(speakers_dict.keys())}")
         return speakers_dict
     def compute_similarity_metrics(self, ref_embeddings, summary_embeddings):
         if ref_embeddings.shape[0] == 0 or summary_embeddings.shape[0] == 0:
@@ -136,7 +155,8 @@ class ContinuousContentScorer:
         return max_sim_per_ref, max_sim_per_summary
     def score(self, reference_transcript, summary_text: str) -> dict:
         if isinstance(reference_transcript, str):
-            parsed_transcript = self.parse_transcript(reference_transcript)
+            parsed_transcript = reference_artifact('summarize_group', reference_transcript, 'parsed_transcript',
+                                                   lambda: self.parse_transcript(reference_transcript))
             if not parsed_transcript:
                 logging.error(f"Failed to parse transcript. Raw text: {reference_transcript[:500]}...")
                 return self._empty_score_result("Failed to parse transcript - no speakers identified")
@@ -148,63 +168,53 @@ class ContinuousContentScorer:
         if not parsed_transcript or not summary_text:
             return self._empty_score_result("Empty input provided")
         
-        logging.info(f"Successfully parsed {len(parsed_transcript)} speakers")
+        logging.debug(f"Successfully parsed {len(parsed_transcript)} speakers")
         
         summary_sentences = self.tokenize_sentences(summary_text)
         if not summary_sentences:
             return self._empty_score_result("No valid summary sentences found")
         
-        try:
-            summary_embeddings = self.model.encode(summary_sentences, convert_to_tensor=True)
-        except Exception as e:
-            logging.error(f"Failed to encode summary: {e}")
-            return self._empty_score_result("Summary encoding failed")
-        
         speaker_scores = {}
-        all_max_similarities = []
-        total_ref_sentences = 0
-        
+        speaker_ranges = {}
+        ref_sentences = []
         for speaker_id, sentences in parsed_transcript.items():
-            if not sentences:
-                speaker_scores[speaker_id] = {
-                    'idea_coverage': 0.0,
-                    'sentence_count': 0
-                }
-                continue
-            
-            valid_sentences = [s for s in sentences if s and len(s.strip()) > 5]
-            total_ref_sentences += len(valid_sentences)
-            
+            valid_sentences = [s for s in sentences if s and len(s.strip()) > 5] if sentences else []
             if not valid_sentences:
                 speaker_scores[speaker_id] = {
                     'idea_coverage': 0.0,
                     'sentence_count': 0
                 }
                 continue
-            
-            try:
-                ref_embeddings = self.model.encode(valid_sentences, convert_to_tensor=True)
-                max_sim_per_ref, _ = self.compute_similarity_metrics(ref_embeddings, summary_embeddings)
-                all_max_similarities.extend(max_sim_per_ref)
-                avg_similarity = max_sim_per_ref.mean() if len(max_sim_per_ref) > 0 else 0
-                idea_coverage = float(avg_similarity * 4)
-                speaker_scores[speaker_id] = {
-                    'idea_coverage': idea_coverage,
-                    'sentence_count': len(valid_sentences),
-                    'avg_similarity': float(avg_similarity)
-                }
-            except Exception as e:
-                logging.warning(f"Processing failed for speaker {speaker_id}: {e}")
-                speaker_scores[speaker_id] = {
-                    'idea_coverage': 0.0,
-                    'sentence_count': len(valid_sentences),
-                    'error': str(e)
-                }
+            # Placeholder keeps speakers in transcript order; filled in below
+            speaker_scores[speaker_id] = None
+            speaker_ranges[speaker_id] = (len(ref_sentences), len(ref_sentences) + len(valid_sentences))
+            ref_sentences.extend(valid_sentences)
+        total_ref_sentences = len(ref_sentences)
+        
+        # One batch for the summary and every speaker's sentences, one similarity matrix
+        try:
+            embeddings = self.model.encode(summary_sentences + ref_sentences, convert_to_tensor=True)
+        except Exception as e:
+            logging.error(f"Failed to encode summary and reference sentences: {e}")
+            return self._empty_score_result("Summary encoding failed")
+        summary_embeddings = embeddings[:len(summary_sentences)]
+        max_sim_per_ref, _ = self.compute_similarity_metrics(embeddings[len(summary_sentences):], summary_embeddings)
+        
+        all_max_similarities = []
+        for speaker_id, (start, end) in speaker_ranges.items():
+            speaker_max_sim = max_sim_per_ref[start:end]
+            all_max_similarities.extend(speaker_max_sim)
+            avg_similarity = speaker_max_sim.mean()
+            speaker_scores[speaker_id] = {
+                'idea_coverage': float(avg_similarity * 4),
+                'sentence_count': end - start,
+                'avg_similarity': float(avg_similarity)
+            }
         
         if not speaker_scores:
             return self._empty_score_result("No valid speaker data processed")
         
-        logging.info(f"Processed {len(speaker_scores)} speakers with {total_ref_sentences} total sentences")
+        logging.debug(f"Processed {len(speaker_scores)} speakers with {total_ref_sentences} total sentences")
         
         total_weighted_coverage = sum(
             scores['idea_coverage'] * scores['sentence_count']
@@ -269,10 +279,11 @@ class ContinuousContentScorer:
             }
         }
 
-# --- Pronunciation and Fluency Scoring (reuse from respond_situation_service) ---
-def count_syllables(text):
-    return sum(len(re.findall(r'[aeiouy]+', word)) for word in text.split())
+def precompute_reference_artifacts(reference):
+    """Compute the reference-only artifacts used by Summarize Group scoring"""
+    return {'parsed_transcript': ContinuousContentScorer().parse_transcript(reference)}
 
+# --- Pronunciation and Fluency Scoring (reuse from respond_situation_service) ---
 def rubric_score_ref_free(asr_text, syllables, intonation_std, speech_rate):
     word_count = len(asr_text.split())
     fluent = 2.5 <= speech_rate <= 4.0
@@ -1,11 +1,13 @@
 from sentence_transformers import SentenceTransformer, util
-from lexicalrichness import LexicalRichness
-import language_tool_python
 import re
 import nltk
 from nltk.tokenize import sent_tokenize, word_tokenize
 from collections import Counter
 import math
+from app.services.question_bank_service import reference_artifact
+from app.services.grammar_service import lang_tool
+from app.services.highlight_service import build_word_highlights
+from app.services.text_analysis import TextAnalysis
 
 # Download required NLTK data
 try:
@@ -17,7 +19,6 @@ except LookupError:
 
 # Load models/tools once
 sbert_model = SentenceTransformer('all-mpnet-base-v2', device="cpu")
-lang_tool = language_tool_python.LanguageTool('en-US')
 
 def extract_key_ideas(text):
     """Extract main ideas from text using sentence importance"""
@@ -47,15 +48,34 @@ def extract_key_ideas(text):
     key_ideas = [sentences[i] for i in top_indices[:min(3, len(sentences))]]
     return key_ideas
 
+def reference_tokens(reference):
+    """Lowercased word tokens of the reference (precomputed for registered questions)"""
+    return reference_artifact('swt', reference, 'reference_tokens', lambda: word_tokenize(reference.lower()))
+
+def reference_analysis(reference):
+    """TextAnalysis of the reference, seeded with its precomputed tokens"""
+    if isinstance(reference, TextAnalysis):
+        return reference
+    return TextAnalysis(reference, tokens=reference_tokens(reference))
+
+def precompute_reference_artifacts(reference):
+    """Compute the reference-only artifacts used by SWT scoring"""
+    key_ideas = extract_key_ideas(reference)
+    return {
+        'reference_embedding': sbert_model.encode(reference, convert_to_tensor=True),
+        'key_ideas': key_ideas,
+        'key_idea_embeddings': sbert_model.encode(key_ideas, convert_to_tensor=True) if key_ideas else [],
+        'reference_tokens': word_tokenize(reference.lower()),
+    }
+
 def calculate_paraphrasing_score(summary, reference):
     """Calculate how well the summary paraphrases vs copies"""
-    summary_words = set(word_tokenize(summary.lower()))
-    reference_words = set(word_tokenize(reference.lower()))
+    summary = TextAnalysis.of(summary)
+    reference = reference_analysis(reference)
     
     # Remove common words
-    common_words = {'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'is', 'are', 'was', 'were', 'be', 'been', 'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would', 'could', 'should', 'may', 'might', 'can', 'must', 'shall'}
-    summary_words -= common_words
-    reference_words -= common_words
+    summary_words = summary.content_words(COMMON_WORDS)
+    reference_words = reference.content_words(COMMON_WORDS)
     
     # Calculate overlap
     overlap = len(summary_words.intersection(reference_words))
@@ -68,16 +88,41 @@ def calculate_paraphrasing_score(summary, reference):
     paraphrasing_score = 1 - (overlap / total_summary)
     return paraphrasing_score
 
+COMMON_WORDS = frozenset({'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'is', 'are', 'was', 'were', 'be', 'been', 'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would', 'could', 'should', 'may', 'might', 'can', 'must', 'shall'})
+# Extended list used for copy detection
+COPYING_COMMON_WORDS = frozenset({'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'is', 'are', 'was', 'were', 'be', 'been', 'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would', 'could', 'should', 'may', 'might', 'can', 'must', 'shall', 'this', 'that', 'these', 'those', 'it', 'its', 'they', 'them', 'their', 'we', 'us', 'our', 'you', 'your', 'he', 'she', 'his', 'her', 'him', 'i', 'me', 'my', 'as', 'so', 'if', 'then', 'else', 'when', 'where', 'why', 'how', 'what', 'which', 'who', 'whom', 'whose'})
+
+# Connective devices, looked up per word token
+SIMPLE_CONNECTORS = frozenset({
+    'and', 'but', 'or', 'so', 'because', 'when', 'if', 'then'
+})
+COMPLEX_CONNECTORS = frozenset({
+    'however', 'therefore', 'furthermore', 'moreover', 'nevertheless', 'consequently',
+    'in addition', 'on the other hand', 'for example', 'such as', 'in contrast', 'similarly',
+    'likewise', 'as a result', 'in conclusion', 'to summarize', 'including', 'specifically',
+    'particularly', 'especially', 'notably', 'significantly', 'importantly', 'additionally',
+    'besides', 'also', 'as well as', 'along with', 'together with', 'in conjunction with',
+    'in combination with', 'in addition to', 'apart from', 'except for', 'other than',
+    'rather than', 'instead of', 'in place of', 'as an alternative to', 'as a substitute for',
+    'in lieu of', 'in the absence of', 'in spite of', 'despite', 'regardless of', 'irrespective of',
+    'notwithstanding', 'even though', 'although', 'though', 'while', 'whereas', 'on the contrary',
+    'by contrast', 'in comparison', 'compared to', 'compared with', 'in relation to',
+    'with respect to', 'regarding', 'concerning', 'as for', 'as to', 'in terms of',
+    'with regard to', 'in regard to', 'in reference to', 'in connection with',
+    'in association with', 'in collaboration with', 'in cooperation with', 'in partnership with',
+    'in alliance with', 'in coordination with', 'in synchronization with', 'in harmony with',
+    'in accordance with', 'in compliance with', 'in conformity with', 'in agreement with',
+    'in alignment with', 'in line with', 'in keeping with', 'in step with', 'in tune with',
+    'in sync with', 'in phase with', 'in parallel with', 'in tandem with', 'in concert with',
+    'in unison with', 'in solidarity with', 'in unity with', 'in league with', 'in cahoots with',
+    'in collusion with', 'in conspiracy with', 'in complicity with', 'in connivance with'
+})
+
 def calculate_connector_diversity(summary):
     """Calculate diversity of connective devices"""
-    connectors = {
-        'simple': ['and', 'but', 'or', 'so', 'because', 'when', 'if', 'then'],
-        'complex': ['however', 'therefore', 'furthermore', 'moreover', 'nevertheless', 'consequently', 'in addition', 'on the other hand', 'for example', 'such as', 'in contrast', 'similarly', 'likewise', 'as a result', 'in conclusion', 'to summarize', 'including', 'specifically', 'particularly', 'especially', 'notably', 'significantly', 'importantly', 'additionally', 'moreover', 'furthermore', 'besides', 'also', 'as well as', 'along with', 'together with', 'in conjunction with', 'in combination with', 'in addition to', 'apart from', 'except for', 'other than', 'rather than', 'instead of', 'in place of', 'as an alternative to', 'as a substitute for', 'in lieu of', 'in the absence of', 'in spite of', 'despite', 'regardless of', 'irrespective of', 'notwithstanding', 'even though', 'although', 'though', 'while', 'whereas', 'on the contrary', 'by contrast', 'in comparison', 'compared to', 'compared with', 'in relation to', 'with respect to', 'regarding', 'concerning', 'as for', 'as to', 'in terms of', 'with regard to', 'in regard to', 'in reference to', 'in connection with', 'in association with', 'in collaboration with', 'in cooperation with', 'in partnership with', 'in alliance with', 'in conjunction with', 'in combination with', 'in coordination with', 'in synchronization with', 'in harmony with', 'in accordance with', 'in compliance with', 'in conformity with', 'in agreement with', 'in alignment with', 'in line with', 'in keeping with', 'in step with', 'in tune with', 'in sync with', 'in phase with', 'in parallel with', 'in tandem with', 'in concert with', 'in unison with', 'in solidarity with', 'in unity with', 'in collaboration with', 'in cooperation with', 'in partnership with', 'in alliance with', 'in league with', 'in cahoots with', 'in collusion with', 'in conspiracy with', 'in complicity with', 'in connivance with', 'in collusion with', 'in conspiracy with', 'in cahoots with', 'in league with', 'in alliance with', 'in partnership with', 'in cooperation with', 'in collaboration with', 'in conjunction with', 'in combination with', 'in coordination with', 'in synchronization with', 'in harmony with', 'in accordance with', 'in compliance with', 'in conformity with', 'in agreement with', 'in alignment with', 'in line with', 'in keeping with', 'in step with', 'in tune with', 'in sync with', 'in phase with', 'in parallel with', 'in tandem with', 'in concert with', 'in unison with', 'in solidarity with', 'in unity with']
-    }
-    
-    words = word_tokenize(summary.lower())
-    simple_count = sum(1 for word in words if word in connectors['simple'])
-    complex_count = sum(1 for word in words if word in connectors['complex'])
+    words = TextAnalysis.of(summary).tokens
+    simple_count = sum(1 for word in words if word in SIMPLE_CONNECTORS)
+    complex_count = sum(1 for word in words if word in COMPLEX_CONNECTORS)
     
     # Calculate diversity (prefer complex connectors)
     total_connectors = simple_count + complex_count
@@ -96,9 +141,12 @@ def calculate_connector_diversity(summary):
 
 def evaluate_summary_service(summary, reference):
     scores = {}
+    # Tokenize each text once for every scorer below
+    doc = TextAnalysis(summary)
+    reference_doc = reference_analysis(reference)
     
     # === 1. Form (1 point) ===
-    words = summary.strip().split()
+    words = doc.words
     word_count = len(words)
     sentence_count = len(re.findall(r'[.!?]', summary.strip()))
     if 5 <= word_count <= 75 and sentence_count == 1 and not summary.isupper():
@@ -107,11 +155,11 @@ def evaluate_summary_service(summary, reference):
         scores['form'] = 0
     
     # === 2. Content (4 points) - Updated rubric ===
-    content_result = evaluate_content_comprehension(summary, reference)
+    content_result = evaluate_content_comprehension(doc, reference_doc)
     scores['content'] = content_result['score']
     
     # === 3. Grammar (2 points) ===
-    matches = lang_tool.check(summary)
+    matches = lang_tool.check(summary, prescreen=True)
     grammar_errors = [m for m in matches if m.ruleIssueType in ("grammar", "typographical")]
     spelling_errors = [m for m in matches if m.ruleIssueType in ("spelling", "misspelling")]
     num_errors = len(grammar_errors)
@@ -123,9 +171,8 @@ def evaluate_summary_service(summary, reference):
         scores['grammar'] = 0
     
     # === 4. Vocabulary (2 points) ===
-    lex = LexicalRichness(summary)
-    ttr = lex.ttr
-    mtld = lex.mtld()
+    ttr = doc.ttr
+    mtld = doc.mtld
     if ttr > 0.7 and mtld > 20:
         scores['vocabulary'] = 2
     elif ttr > 0.5 and mtld > 15:
@@ -134,40 +181,8 @@ def evaluate_summary_service(summary, reference):
         scores['vocabulary'] = 0
     
     # === Word Highlights for Grammar/Typo/Spelling Errors ===
-    word_highlights = []
-    for word in words:
-        word_highlights.append({"word": word, "status": "correct", "replacement": None})
-    
-    # Process grammar errors
-    for error in grammar_errors:
-        error_text = summary[error.offset:error.offset+error.errorLength]
-        error_words = error_text.split()
-        for i, highlight in enumerate(word_highlights):
-            # Clean the highlight word (remove punctuation)
-            clean_highlight = highlight['word'].rstrip('.,!?;:')
-            if clean_highlight in error_words or highlight['word'] in error_words:
-                word_highlights[i] = {
-                    "word": highlight['word'],
-                    "status": "grammar",
-                    "replacement": error.replacements[0] if error.replacements else None,
-                }
-                # Don't break - highlight all matching words
-    
-    # Process spelling errors (show in word highlights but don't affect score)
-    for error in spelling_errors:
-        error_text = summary[error.offset:error.offset+error.errorLength]
-        error_words = error_text.split()
-        suggestions = error.replacements[:3] if error.replacements else []
-        for i, highlight in enumerate(word_highlights):
-            # Clean the highlight word (remove punctuation)
-            clean_highlight = highlight['word'].rstrip('.,!?;:')
-            if clean_highlight in error_words or highlight['word'] in error_words:
-                word_highlights[i] = {
-                    "word": highlight['word'],
-                    "status": "spelling",
-                    "suggestions": suggestions,
-                }
-                # Don't break - highlight all matching words
+    # Spelling errors are highlighted but don't affect the score
+    word_highlights = build_word_highlights(doc, grammar_errors, spelling_errors)
     
     # === Final Total ===
     total = sum(scores.values())
@@ -191,16 +206,20 @@ def evaluate_summary_service(summary, reference):
 
 def evaluate_content_comprehension(summary, reference):
     """Evaluate content comprehension using the exact 4-point rubric"""
+    summary_doc = TextAnalysis.of(summary)
+    reference_doc = reference_analysis(reference)
+    summary, reference = summary_doc.text, reference_doc.text
     
     # 1. Semantic similarity
-    emb_ref = sbert_model.encode(reference, convert_to_tensor=True)
+    emb_ref = reference_artifact('swt', reference, 'reference_embedding',
+                                 lambda: sbert_model.encode(reference, convert_to_tensor=True))
     emb_sum = sbert_model.encode(summary, convert_to_tensor=True)
     similarity = util.cos_sim(emb_ref, emb_sum).item()
     
     # 2. Key idea coverage
-    key_ideas = extract_key_ideas(reference)
+    key_ideas = reference_artifact('swt', reference, 'key_ideas', lambda: extract_key_ideas(reference))
     try:
-        summary_sentences = sent_tokenize(summary)
+        summary_sentences = summary_doc.sentences
     except LookupError:
         # Fallback to simple sentence splitting if NLTK fails
         summary_sentences = [s.strip() for s in summary.split('.') if s.strip()]
@@ -209,7 +228,8 @@ def evaluate_content_comprehension(summary, reference):
     idea_coverage = 0
     if key_ideas and summary_sentences:
         summary_emb = sbert_model.encode(summary_sentences, convert_to_tensor=True)
-        key_emb = sbert_model.encode(key_ideas, convert_to_tensor=True)
+        key_emb = reference_artifact('swt', reference, 'key_idea_embeddings',
+                                     lambda: sbert_model.encode(key_ideas, convert_to_tensor=True))
         
         # Calculate how many key ideas are covered
         sim_matrix = util.cos_sim(key_emb, summary_emb)
@@ -218,10 +238,10 @@ def evaluate_content_comprehension(summary, reference):
         idea_coverage = covered_ideas / len(key_ideas) if key_ideas else 0
     
     # 3. Paraphrasing quality
-    paraphrasing_score = calculate_paraphrasing_score(summary, reference)
+    paraphrasing_score = calculate_paraphrasing_score(summary_doc, reference_doc)
     
     # 4. Connector diversity
-    connector_diversity = calculate_connector_diversity(summary)
+    connector_diversity = calculate_connector_diversity(summary_doc)
     
     # 5. Coherence (sentence similarity within summary)
     coherence_score = 0
@@ -232,15 +252,15 @@ def evaluate_content_comprehension(summary, reference):
         coherence_score = ((sim_matrix.sum() - sim_matrix.trace()) / (sim_matrix.numel() - sim_matrix.size(0))).item()
     
     # 6. Detail removal assessment (check if summary is concise)
-    reference_words = len(reference.split())
-    summary_words = len(summary.split())
+    reference_words = len(reference_doc.words)
+    summary_words = len(summary_doc.words)
     conciseness_ratio = summary_words / reference_words if reference_words > 0 else 1
     
     # 7. Synthesis quality (how well ideas are combined vs copied)
-    synthesis_score = calculate_synthesis_quality(summary, reference)
+    synthesis_score = calculate_synthesis_quality(summary_doc, reference_doc)
     
     # 8. Copying detection (how much is directly copied)
-    copying_score = calculate_copying_score(summary, reference)
+    copying_score = calculate_copying_score(summary_doc, reference_doc)
     
     # Scoring logic based on the exact rubric criteria
     score = 0
@@ -301,13 +321,12 @@ def evaluate_content_comprehension(summary, reference):
 
 def calculate_synthesis_quality(summary, reference):
     """Calculate how well the summary synthesizes vs copies"""
-    summary_words = set(word_tokenize(summary.lower()))
-    reference_words = set(word_tokenize(reference.lower()))
+    summary = TextAnalysis.of(summary)
+    reference = reference_analysis(reference)
     
     # Remove common words and short words
-    common_words = {'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'is', 'are', 'was', 'were', 'be', 'been', 'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would', 'could', 'should', 'may', 'might', 'can', 'must', 'shall'}
-    summary_content_words = {w for w in summary_words if w not in common_words and len(w) > 3}
-    reference_content_words = {w for w in reference_words if w not in common_words and len(w) > 3}
+    summary_content_words = summary.content_words(COMMON_WORDS, longer_than=3)
+    reference_content_words = reference.content_words(COMMON_WORDS, longer_than=3)
     
     if not summary_content_words:
         return 0
@@ -337,20 +356,16 @@ def calculate_synthesis_quality(summary, reference):
 
 def calculate_copying_score(summary, reference):
     """Calculate how much of the summary is directly copied from reference"""
-    summary_words = set(word_tokenize(summary.lower()))
-    reference_words = set(word_tokenize(reference.lower()))
+    summary = TextAnalysis.of(summary)
+    reference = reference_analysis(reference)
     
     # Remove common words and short words
-    common_words = {'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'is', 'are', 'was', 'were', 'be', 'been', 'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would', 'could', 'should', 'may', 'might', 'can', 'must', 'shall', 'this', 'that', 'these', 'those', 'it', 'its', 'they', 'them', 'their', 'we', 'us', 'our', 'you', 'your', 'he', 'she', 'his', 'her', 'him', 'i', 'me', 'my', 'as', 'so', 'if', 'then', 'else', 'when', 'where', 'why', 'how', 'what', 'which', 'who', 'whom', 'whose'}
-    summary_content_words = summary_words - common_words
-    reference_content_words = reference_words - common_words
-    
-    if not summary_content_words:
+    if not summary.content_words(COPYING_COMMON_WORDS):
         return 0
     
     # Only count words longer than 4 characters to avoid false positives
-    summary_content_words = {w for w in summary_content_words if len(w) > 4}
-    reference_content_words = {w for w in reference_content_words if len(w) > 4}
+    summary_content_words = summary.content_words(COPYING_COMMON_WORDS, longer_than=4)
+    reference_content_words = reference.content_words(COPYING_COMMON_WORDS, longer_than=4)
     
     if not summary_content_words:
         return 0
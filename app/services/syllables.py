@@ -0,0 +1,131 @@
+"""
+Syllable counts from a pronunciation dictionary, with a spelling heuristic
+for words it does not know.
+
+The dictionary is CMUdict compiled into a compact lexicon (see
+compiled_lexicon.py) in SYLLABLE_DICT_DIR: one syllable count per word,
+taken from the vowel phonemes (those carrying a stress digit) of its first
+pronunciation. Words missing from it, and every word when it has not been
+built, fall back to counting vowel groups in the spelling.
+
+Build it from NLTK's copy of CMUdict or from a cmudict file:
+
+    python -m app.services.syllables [--cmudict cmudict-0.7b] [--output data/syllable_dictionary]
+
+Reference-side counts are stored with the question bank under
+SYLLABLES_ARTIFACT, which names the dictionary build they came from.
+"""
+import argparse
+import logging
+import os
+import re
+from functools import lru_cache
+
+import numpy as np
+
+from app.services.compiled_lexicon import CompiledLexicon
+
+logger = logging.getLogger(__name__)
+
+SYLLABLE_DICT_DIR = os.environ.get('SYLLABLE_DICT_DIR', os.path.join('data', 'syllable_dictionary'))
+
+VOWEL_GROUP = re.compile(r'[aeiouy]+')
+NON_WORD = re.compile(r"[^a-z']+")
+UNKNOWN = -1
+
+
+def heuristic_syllables(word):
+    """Number of vowel groups in the spelling of `word`"""
+    return len(VOWEL_GROUP.findall(word.lower()))
+
+
+def dictionary_key(word):
+    """Form of a word as stored in the dictionary: lowercase letters and inner apostrophes"""
+    return NON_WORD.sub('', word.lower().replace('’', "'")).strip("'")
+
+
+def _load():
+    try:
+        lexicon = CompiledLexicon.load(SYLLABLE_DICT_DIR)
+        logger.info(f"Loaded syllable dictionary with {len(lexicon)} words from {SYLLABLE_DICT_DIR}")
+        return lexicon
+    except (OSError, ValueError) as e:
+        logger.info(f"No syllable dictionary ({e}); counting vowel groups")
+        return None
+
+
+syllable_dictionary = _load()
+
+# Reference syllable counts depend on the dictionary build, so each build gets its own artifact
+SYLLABLES_ARTIFACT = f'syllables@{syllable_dictionary.fingerprint if syllable_dictionary is not None else "heuristic"}'
+
+
+@lru_cache(maxsize=100000)
+def word_syllables(word):
+    """Syllables in one word, from the dictionary when it knows the word"""
+    if syllable_dictionary is not None:
+        count = syllable_dictionary.get(dictionary_key(word), 'syllables')
+        if count != UNKNOWN:
+            return count
+    return heuristic_syllables(word)
+
+
+def syllable_counts(words):
+    """Syllables of every word in a list or array, looked up in bulk"""
+    if syllable_dictionary is None or len(words) == 0:
+        return np.fromiter((heuristic_syllables(w) for w in words), dtype=np.int64, count=len(words))
+    counts = syllable_dictionary.lookup([dictionary_key(w) for w in words], 'syllables').astype(np.int64)
+    for i in np.flatnonzero(counts == UNKNOWN):
+        counts[i] = heuristic_syllables(words[i])
+    return counts
+
+
+def count_syllables(text):
+    """Total syllables in a text"""
+    words = text.split()
+    # Short texts go through the per-word cache, long ones through one bulk lookup
+    if len(words) < 32:
+        return sum(word_syllables(word) for word in words)
+    return int(syllable_counts(words).sum())
+
+
+def _pronunciation_syllables(phonemes):
+    return sum(1 for phoneme in phonemes if phoneme[-1].isdigit())
+
+
+def _read_cmudict(path):
+    """{word: [phonemes]} from a cmudict file, keeping each word's first pronunciation"""
+    pronunciations = {}
+    with open(path, encoding='latin-1') as f:
+        for line in f:
+            if not line.strip() or line.startswith(';;;'):
+                continue
+            word, *phonemes = line.split()
+            word = re.sub(r'\(\d+\)$', '', word)
+            pronunciations.setdefault(word, phonemes)
+    return pronunciations
+
+
+def build(cmudict_path=None, output=SYLLABLE_DICT_DIR):
+    if cmudict_path:
+        pronunciations = _read_cmudict(cmudict_path)
+    else:
+        from nltk.corpus import cmudict
+        pronunciations = {word: variants[0] for word, variants in cmudict.dict().items()}
+
+    entries = {}
+    for word, phonemes in pronunciations.items():
+        key = dictionary_key(word)
+        if key:
+            entries.setdefault(key, {'syllables': _pronunciation_syllables(phonemes)})
+    lexicon = CompiledLexicon.from_entries(entries, {'syllables': np.int16(UNKNOWN)})
+    lexicon.save(output)
+    print(f"Wrote syllable counts for {len(lexicon)} words to {output}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compile the CMUdict syllable dictionary')
+    parser.add_argument('--cmudict', help='cmudict file (default: NLTK cmudict corpus)')
+    parser.add_argument('--output', default=SYLLABLE_DICT_DIR)
+    args = parser.parse_args()
+    build(args.cmudict, args.output)
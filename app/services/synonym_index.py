@@ -0,0 +1,140 @@
+"""
+WordNet synonym lookups backed by a precomputed, persisted index.
+
+The index maps each word to the IDs of its WordNet synsets (as returned by
+`wordnet.synsets`, so inflected forms resolve the same way) and each synset
+ID to its lemma names. It is a JSON file at SYNONYM_INDEX_PATH. Words that
+are not in the index are looked up in WordNet on demand and cached in an LRU.
+
+Build it from the references in the question bank, from text files, or from
+the whole WordNet vocabulary:
+
+    python -m app.services.synonym_index [--question-bank] [--text FILE ...] \\
+        [--all-wordnet] [--output data/synonym_index.json]
+"""
+import argparse
+import json
+import logging
+import os
+import re
+import sqlite3
+from contextlib import closing
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+SYNONYM_INDEX_PATH = os.environ.get('SYNONYM_INDEX_PATH', os.path.join('data', 'synonym_index.json'))
+SYNONYM_CACHE_SIZE = int(os.environ.get('SYNONYM_CACHE_SIZE', '50000'))
+
+FORMAT_VERSION = 1
+WORD_PATTERN = re.compile(r'[a-z]+')
+
+
+def _lemma_name(lemma):
+    return lemma.name().lower().replace('_', ' ')
+
+
+class SynonymIndex:
+    def __init__(self, words=None, synsets=None):
+        self.words = words or {}      # word -> [synset id]
+        self.synsets = synsets or {}  # synset id -> [lemma name]
+        self.synonyms = lru_cache(maxsize=SYNONYM_CACHE_SIZE)(self._synonyms)
+
+    def __len__(self):
+        return len(self.words)
+
+    def _synonyms(self, word):
+        if word in self.words:
+            return frozenset(name for synset_id in self.words[word] for name in self.synsets[synset_id])
+        from nltk.corpus import wordnet
+        return frozenset(_lemma_name(lemma) for synset in wordnet.synsets(word) for lemma in synset.lemmas())
+
+    def count_matches(self, ref_terms, resp_terms):
+        """
+        Number of reference terms matched by some response term: the same
+        word, a synonym of it, or a word it is a synonym of.
+
+        One synonym lookup per distinct term, then set operations; same result
+        as comparing every (reference, response) pair.
+        """
+        resp_set = set(resp_terms)
+        reachable = resp_set.union(*(self.synonyms(term) for term in resp_set))
+        return sum(
+            1 for term in ref_terms
+            if term in reachable or not resp_set.isdisjoint(self.synonyms(term))
+        )
+
+    @classmethod
+    def build(cls, vocabulary):
+        from nltk.corpus import wordnet
+        words = {}
+        synsets = {}
+        for word in sorted(set(vocabulary)):
+            found = wordnet.synsets(word)
+            if not found:
+                continue
+            words[word] = [synset.name() for synset in found]
+            for synset in found:
+                if synset.name() not in synsets:
+                    synsets[synset.name()] = sorted({_lemma_name(lemma) for lemma in synset.lemmas()})
+        return cls(words, synsets)
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump({'format_version': FORMAT_VERSION, 'words': self.words, 'synsets': self.synsets}, f)
+
+    @classmethod
+    def load(cls, path):
+        """Load a saved index; raises OSError/ValueError if it is missing or incompatible"""
+        with open(path) as f:
+            data = json.load(f)
+        if data.get('format_version') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported synonym index format {data.get('format_version')} in {path}")
+        return cls(data['words'], data['synsets'])
+
+
+def _load():
+    try:
+        index = SynonymIndex.load(SYNONYM_INDEX_PATH)
+        logger.info(f"Loaded synonym index with {len(index)} words from {SYNONYM_INDEX_PATH}")
+        return index
+    except (OSError, ValueError) as e:
+        logger.info(f"No synonym index ({e}); looking synonyms up in WordNet")
+        return SynonymIndex()
+
+
+synonym_index = _load()
+
+
+def _question_bank_vocabulary():
+    from app.services.question_bank_service import QUESTION_BANK_DB
+    with closing(sqlite3.connect(QUESTION_BANK_DB)) as conn:
+        for (reference,) in conn.execute("SELECT reference FROM questions"):
+            yield from WORD_PATTERN.findall(reference.lower())
+
+
+def build(question_bank=False, texts=(), all_wordnet=False, output=SYNONYM_INDEX_PATH):
+    vocabulary = set()
+    if question_bank:
+        vocabulary.update(_question_bank_vocabulary())
+    for path in texts:
+        with open(path, encoding='utf-8') as f:
+            vocabulary.update(WORD_PATTERN.findall(f.read().lower()))
+    if all_wordnet:
+        from nltk.corpus import wordnet
+        vocabulary.update(name for name in wordnet.all_lemma_names() if WORD_PATTERN.fullmatch(name))
+
+    index = SynonymIndex.build(vocabulary)
+    index.save(output)
+    print(f"Wrote synonyms for {len(index)} words ({len(index.synsets)} synsets) to {output}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build the WordNet synonym index')
+    parser.add_argument('--question-bank', action='store_true', help='Index the words of every registered reference')
+    parser.add_argument('--text', action='append', default=[], help='Index the words of a text file (repeatable)')
+    parser.add_argument('--all-wordnet', action='store_true', help='Index every single-word WordNet lemma')
+    parser.add_argument('--output', default=SYNONYM_INDEX_PATH)
+    args = parser.parse_args()
+    build(args.question_bank, args.text, args.all_wordnet, args.output)
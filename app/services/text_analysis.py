@@ -0,0 +1,85 @@
+import re
+from functools import cached_property
+
+from nltk.tokenize import sent_tokenize, word_tokenize
+
+from app.services.lexical_diversity import LexicalDiversity
+
+WORD_SPAN = re.compile(r'\S+')
+
+
+class TextAnalysis:
+    """
+    One text plus lazily computed, memoized views of it (sentences, tokens,
+    offsets, content words, lexical diversity).
+
+    Create one per text per request and pass it to every scorer, so the text
+    is tokenized once. Scorers accept either a TextAnalysis or a plain string
+    via `TextAnalysis.of`. Views that are already known (e.g. precomputed
+    reference tokens) can be passed as keyword arguments.
+    """
+
+    def __init__(self, text, **precomputed):
+        self.text = text
+        self._content_words = {}
+        # cached_property stores its value in the instance dict under the same name
+        self.__dict__.update(precomputed)
+
+    @classmethod
+    def of(cls, text):
+        return text if isinstance(text, cls) else cls(text)
+
+    def __str__(self):
+        return self.text
+
+    @cached_property
+    def lower(self):
+        return self.text.lower()
+
+    @cached_property
+    def words(self):
+        """Whitespace-separated words"""
+        return self.text.split()
+
+    @cached_property
+    def lower_words(self):
+        return self.lower.split()
+
+    @cached_property
+    def word_spans(self):
+        """(start, end) character offsets of the whitespace-separated words"""
+        return [(m.start(), m.end()) for m in WORD_SPAN.finditer(self.text)]
+
+    @cached_property
+    def sentences(self):
+        return sent_tokenize(self.text)
+
+    @cached_property
+    def tokens(self):
+        """Lowercased nltk word tokens"""
+        return word_tokenize(self.lower)
+
+    @cached_property
+    def token_set(self):
+        return frozenset(self.tokens)
+
+    def content_words(self, stopwords, longer_than=0):
+        """Distinct lowercased tokens not in `stopwords` and longer than `longer_than` characters"""
+        key = (stopwords, longer_than)
+        if key not in self._content_words:
+            self._content_words[key] = frozenset(
+                w for w in self.token_set if w not in stopwords and len(w) > longer_than
+            )
+        return self._content_words[key]
+
+    @cached_property
+    def lexical_diversity(self):
+        return LexicalDiversity.from_text(self.text)
+
+    @property
+    def ttr(self):
+        return self.lexical_diversity.ttr
+
+    @property
+    def mtld(self):
+        return self.lexical_diversity.mtld()
@@ -0,0 +1,157 @@
+"""
+CEFR level and word-frequency lexicon used by vocabulary scoring.
+
+Loads the compiled lexicon from VOCAB_LEXICON_DIR (see compiled_lexicon.py).
+When it has not been built, the small built-in word lists are used instead,
+so scores stay what they were before the lexicon existed.
+
+Build it from a CEFR word list and frequency data:
+
+    python -m app.services.vocabulary_lexicon --cefr-csv cefr.csv \\
+        [--frequency-csv freq.csv | --wordfreq] [--output data/vocabulary_lexicon]
+
+`cefr.csv` has `word,level` rows (A1..C2); `freq.csv` has `word,frequency`
+rows with frequency as a fraction of all words (as wordfreq reports it).
+"""
+import argparse
+import csv
+import logging
+import os
+from collections import Counter
+
+from app.services.compiled_lexicon import CompiledLexicon
+
+logger = logging.getLogger(__name__)
+
+VOCAB_LEXICON_DIR = os.environ.get('VOCAB_LEXICON_DIR', os.path.join('data', 'vocabulary_lexicon'))
+
+CEFR_LEVELS = ("A1", "A2", "B1", "B2", "C1", "C2")
+# Stored as 0 (unknown) or 1..6 for A1..C2
+CEFR_CODES = {level: code for code, level in enumerate(CEFR_LEVELS, start=1)}
+DEFAULT_FREQUENCY = 0.000001
+
+# Built-in fallback lists; earlier levels win when a word appears twice
+FALLBACK_CEFR = {
+    "A1": ['the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'is', 'are', 'was', 'were', 'be', 'been', 'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would', 'could', 'should', 'may', 'might', 'can', 'must', 'shall'],
+    "A2": ['good', 'bad', 'big', 'small', 'new', 'old', 'young', 'hot', 'cold', 'happy', 'sad', 'easy', 'hard', 'fast', 'slow', 'high', 'low', 'long', 'short', 'right', 'wrong', 'same', 'different', 'first', 'last', 'next', 'many', 'much', 'few', 'little', 'some', 'any', 'all', 'every', 'each', 'other', 'another'],
+    "B1": ['important', 'necessary', 'possible', 'impossible', 'difficult', 'simple', 'complex', 'basic', 'advanced', 'modern', 'traditional', 'personal', 'public', 'private', 'national', 'international', 'local', 'global', 'economic', 'social', 'political', 'cultural', 'environmental', 'educational', 'professional', 'commercial', 'industrial', 'agricultural'],
+    "B2": ['significant', 'substantial', 'considerable', 'remarkable', 'notable', 'distinctive', 'characteristic', 'representative', 'typical', 'conventional', 'contemporary', 'innovative', 'revolutionary', 'fundamental', 'essential', 'crucial', 'critical', 'vital', 'indispensable', 'comprehensive', 'thorough', 'extensive', 'intensive', 'systematic', 'methodical', 'analytical', 'theoretical', 'practical', 'empirical', 'experimental'],
+    "C1": ['sophisticated', 'elaborate', 'intricate', 'nuanced', 'subtle', 'profound', 'exhaustive', 'meticulous', 'rigorous', 'methodological', 'conceptual', 'philosophical', 'ideological', 'paradigmatic', 'epistemological', 'ontological', 'phenomenological', 'hermeneutic', 'dialectical', 'heuristic', 'algorithmic', 'stochastic', 'probabilistic', 'deterministic', 'systemic', 'holistic', 'integrative'],
+    "C2": ['esoteric', 'arcane', 'abstruse', 'recondite', 'cryptic', 'enigmatic', 'paradoxical', 'oxymoronic', 'tautological', 'redundant', 'superfluous', 'extraneous', 'tangential', 'peripheral', 'marginal', 'negligible', 'infinitesimal', 'minuscule', 'microscopic', 'macroscopic', 'cosmic', 'universal', 'omnipresent', 'ubiquitous', 'pervasive', 'permeating', 'saturating', 'infiltrating', 'penetrating', 'percolating'],
+}
+FALLBACK_FREQUENCY = {
+    0.001: ['the', 'be', 'to', 'of', 'and', 'a', 'in', 'that', 'have', 'i', 'it', 'for', 'not', 'on', 'with', 'he', 'as', 'you', 'do', 'at', 'this', 'but', 'his', 'by', 'from', 'they', 'we', 'say', 'her', 'she', 'or', 'an', 'will', 'my', 'one', 'all', 'would', 'there', 'their', 'what', 'so', 'up', 'out', 'if', 'about', 'who', 'get', 'which', 'go', 'me'],
+    0.0001: ['when', 'make', 'can', 'like', 'time', 'no', 'just', 'him', 'know', 'take', 'people', 'into', 'year', 'your', 'good', 'some', 'could', 'them', 'see', 'other', 'than', 'then', 'now', 'look', 'only', 'come', 'its', 'over', 'think', 'also', 'back', 'after', 'use', 'two', 'how', 'our', 'work', 'first', 'well', 'way', 'even', 'new', 'want', 'because', 'any', 'these', 'give', 'day', 'most', 'us'],
+    0.00001: ['important', 'necessary', 'possible', 'difficult', 'simple', 'complex', 'basic', 'advanced', 'modern', 'traditional', 'personal', 'public', 'private', 'national', 'international', 'local', 'global', 'economic', 'social', 'political', 'cultural', 'environmental', 'educational', 'professional', 'commercial', 'industrial', 'agricultural'],
+}
+
+# Frequency bands used by the vocabulary profiles (lower bounds, exclusive)
+FREQUENCY_BANDS = (("High_Freq", 0.0001), ("Mid_Freq", 0.00005), ("Low_Freq", 0.00001))
+
+
+def _cefr_entries(cefr):
+    """{word: {'cefr': code}} from {level: words}; the lowest level wins"""
+    entries = {}
+    for level in CEFR_LEVELS:
+        for word in cefr.get(level, ()):
+            entries.setdefault(word.lower(), {}).setdefault('cefr', CEFR_CODES[level])
+    return entries
+
+
+def _compile(entries):
+    return CompiledLexicon.from_entries(entries, {'cefr': 0, 'frequency': DEFAULT_FREQUENCY})
+
+
+def _fallback_lexicon():
+    entries = _cefr_entries(FALLBACK_CEFR)
+    for freq in sorted(FALLBACK_FREQUENCY, reverse=True):
+        for word in FALLBACK_FREQUENCY[freq]:
+            entries.setdefault(word, {}).setdefault('frequency', freq)
+    return _compile(entries)
+
+
+def _load():
+    try:
+        lexicon = CompiledLexicon.load(VOCAB_LEXICON_DIR)
+        logger.info(f"Loaded vocabulary lexicon with {len(lexicon)} words from {VOCAB_LEXICON_DIR}")
+        return lexicon
+    except (OSError, ValueError) as e:
+        logger.info(f"No compiled vocabulary lexicon ({e}); using built-in word lists")
+        return _fallback_lexicon()
+
+
+vocabulary_lexicon = _load()
+
+
+def cefr_level(word):
+    """CEFR level ("A1".."C2") of a word, or None if unknown"""
+    code = vocabulary_lexicon.get(word.lower(), 'cefr')
+    return CEFR_LEVELS[code - 1] if code else None
+
+
+def word_frequency(word):
+    """Frequency of a word as a fraction of all words"""
+    return vocabulary_lexicon.get(word.lower(), 'frequency')
+
+
+def profile(tokens):
+    """
+    CEFR and frequency-band counts for a list of lowercased tokens, looked up in bulk.
+    Returns {'cefr': Counter(level or "None"), 'frequency': {band: count}}.
+    """
+    codes = vocabulary_lexicon.lookup(tokens, 'cefr')
+    frequencies = vocabulary_lexicon.lookup(tokens, 'frequency')
+
+    cefr = Counter()
+    for code, count in Counter(codes.tolist()).items():
+        cefr[CEFR_LEVELS[code - 1] if code else "None"] += count
+
+    bands = {}
+    remaining = frequencies
+    for band, lower_bound in FREQUENCY_BANDS:
+        in_band = remaining > lower_bound
+        bands[band] = int(in_band.sum())
+        remaining = remaining[~in_band]
+    bands["Rare"] = int(len(remaining))
+    return {'cefr': cefr, 'frequency': bands}
+
+
+def _read_csv(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.reader(f):
+            if len(row) < 2 or not row[0].strip() or row[0].strip().lower() == 'word':
+                continue
+            yield row[0].strip().lower(), row[1].strip()
+
+
+def build(cefr_csv, frequency_csv=None, use_wordfreq=False, output=VOCAB_LEXICON_DIR):
+    cefr = {level: [] for level in CEFR_LEVELS}
+    for word, level in _read_csv(cefr_csv):
+        level = level.upper()
+        if level in cefr:
+            cefr[level].append(word)
+
+    entries = _cefr_entries(cefr)
+    if frequency_csv:
+        for word, freq in _read_csv(frequency_csv):
+            entries.setdefault(word, {})['frequency'] = float(freq)
+    if use_wordfreq:
+        from wordfreq import word_frequency as wordfreq_frequency, top_n_list
+        for word in top_n_list('en', 50000):
+            entries.setdefault(word, {})
+        for word, values in entries.items():
+            values.setdefault('frequency', wordfreq_frequency(word, 'en') or DEFAULT_FREQUENCY)
+
+    lexicon = _compile(entries)
+    lexicon.save(output)
+    print(f"Wrote {len(lexicon)} words to {output}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compile the CEFR/frequency vocabulary lexicon')
+    parser.add_argument('--cefr-csv', required=True, help='CSV of word,level (A1..C2)')
+    parser.add_argument('--frequency-csv', help='CSV of word,frequency')
+    parser.add_argument('--wordfreq', action='store_true', help='Take frequencies from the wordfreq package')
+    parser.add_argument('--output', default=VOCAB_LEXICON_DIR)
+    args = parser.parse_args()
+    build(args.cefr_csv, args.frequency_csv, args.wordfreq, args.output)
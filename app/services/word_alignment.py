@@ -0,0 +1,96 @@
+"""
+Word-level alignment of a reference text against a transcript.
+
+One WordAlignment splits both texts once and gives everything the speaking
+scorers need from them: the difflib opcodes behind word highlights and
+content scores, the number of correctly reproduced words, and the word
+error rate.
+
+WER is the word-level Levenshtein distance divided by the number of
+reference words, exactly as `jiwer.wer` computes it with its default
+whitespace tokenization, but taken straight from the word lists already
+split here. The distance comes from rapidfuzz (C++) when it is installed,
+otherwise from a row-vectorized NumPy dynamic program.
+"""
+import difflib
+from functools import cached_property
+
+import numpy as np
+
+try:
+    from rapidfuzz.distance import Levenshtein
+except ImportError:
+    Levenshtein = None
+
+
+def _encode(ref_words, hyp_words):
+    ids = {}
+    ref = np.fromiter((ids.setdefault(w, len(ids)) for w in ref_words), dtype=np.int64, count=len(ref_words))
+    hyp = np.fromiter((ids.setdefault(w, len(ids)) for w in hyp_words), dtype=np.int64, count=len(hyp_words))
+    return ref, hyp
+
+
+def _numpy_edit_distance(ref_words, hyp_words):
+    """
+    Levenshtein distance between two word lists, one NumPy operation per
+    reference word. Within a row, the insertion chain
+    row[j] = min(row[j], row[j - 1] + 1) is resolved with a running minimum
+    of row[j] - j.
+    """
+    ref, hyp = _encode(ref_words, hyp_words)
+    columns = np.arange(len(hyp) + 1)
+    row = columns.copy()
+    for i, word in enumerate(ref, start=1):
+        candidates = np.empty_like(row)
+        candidates[0] = i
+        candidates[1:] = np.minimum(row[1:] + 1, row[:-1] + (hyp != word))
+        row = np.minimum.accumulate(candidates - columns) + columns
+    return int(row[-1])
+
+
+def word_edit_distance(ref_words, hyp_words):
+    """Minimum number of word substitutions, deletions and insertions"""
+    if Levenshtein is not None:
+        return Levenshtein.distance(ref_words, hyp_words)
+    return _numpy_edit_distance(ref_words, hyp_words)
+
+
+class WordAlignment:
+    def __init__(self, reference, hypothesis):
+        self.ref_words = reference.split()
+        self.hyp_words = hypothesis.split()
+
+    @cached_property
+    def opcodes(self):
+        return difflib.SequenceMatcher(None, self.ref_words, self.hyp_words).get_opcodes()
+
+    @cached_property
+    def correct_words(self):
+        return sum(i2 - i1 for tag, i1, i2, _, _ in self.opcodes if tag == 'equal')
+
+    @property
+    def word_accuracy(self):
+        return self.correct_words / len(self.ref_words) if self.ref_words else 0
+
+    @cached_property
+    def wer(self):
+        if not self.ref_words:
+            # jiwer counts every hypothesis word as an insertion here
+            return len(self.hyp_words)
+        return word_edit_distance(self.ref_words, self.hyp_words) / len(self.ref_words)
+
+    def word_ops(self):
+        """
+        (tag, word, replacement) for every aligned word in order: reference
+        words for 'equal', 'replace' and 'delete' opcodes, hypothesis words
+        for 'insert'. `replacement` is the first hypothesis word of a
+        'replace' opcode, otherwise None.
+        """
+        for tag, i1, i2, j1, j2 in self.opcodes:
+            if tag == 'insert':
+                for j in range(j1, j2):
+                    yield tag, self.hyp_words[j], None
+                continue
+            replacement = self.hyp_words[j1] if tag == 'replace' and j1 < len(self.hyp_words) else None
+            for i in range(i1, i2):
+                yield tag, self.ref_words[i], replacement
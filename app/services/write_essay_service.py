@@ -1,11 +1,14 @@
 from sentence_transformers import SentenceTransformer, util
-from lexicalrichness import LexicalRichness
-import language_tool_python
 import re
 import nltk
-from nltk.tokenize import word_tokenize, sent_tokenize
 from collections import Counter
 import math
+from app.services.question_bank_service import reference_artifact
+from app.services.grammar_service import lang_tool
+from app.services.highlight_service import build_word_highlights
+from app.services.phrase_lexicon import PhraseLexicon
+from app.services.text_analysis import TextAnalysis
+from app.services.vocabulary_lexicon import profile as vocabulary_profile
 
 # Download required NLTK data
 try:
@@ -15,7 +18,57 @@ except LookupError:
 
 # Load models/tools once
 sbert_model = SentenceTransformer('all-mpnet-base-v2', device="cpu")
-lang_tool = language_tool_python.LanguageTool('en-US')
+
+COMMON_WORDS = {'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'is', 'are', 'was', 'were', 'be', 'been', 'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would', 'could', 'should', 'may', 'might', 'can', 'this', 'that', 'these', 'those', 'it', 'its', 'they', 'them', 'their', 'we', 'us', 'our', 'you', 'your', 'i', 'me', 'my'}
+
+def unique_content_words(text):
+    """Lowercased words longer than 3 characters that are not common function words"""
+    return set(word for word in TextAnalysis.of(text).lower_words if word not in COMMON_WORDS and len(word) > 3)
+
+# Discourse markers matched as substrings of the lowercased essay, all in one pass
+ESSAY_LEXICON = PhraseLexicon({
+    'argument': ['firstly', 'secondly', 'thirdly', 'on the one hand', 'on the other hand',
+                 'however', 'nevertheless', 'in contrast', 'similarly', 'likewise',
+                 'for example', 'for instance', 'such as', 'specifically', 'moreover',
+                 'furthermore', 'additionally', 'consequently', 'therefore', 'thus'],
+    'example': ['for example', 'for instance', 'such as', 'specifically', 'in particular',
+                'namely', 'including', 'especially', 'particularly', 'notably'],
+    'conclusion': ['in conclusion', 'to conclude', 'therefore', 'thus', 'hence',
+                   'as a result', 'consequently', 'overall', 'in summary', 'finally'],
+    'contrast': ['however', 'nevertheless', 'on the other hand', 'in contrast', 'although', 'while'],
+    'simple_connector': ['and', 'but', 'because', 'so', 'then', 'also', 'too', 'as well'],
+    'complex_connector': ['however', 'therefore', 'furthermore', 'moreover', 'in addition',
+                          'consequently', 'as a result', 'on the other hand', 'nevertheless',
+                          'firstly', 'secondly', 'finally', 'in conclusion', 'to summarize',
+                          'for example', 'for instance', 'such as', 'specifically', 'in particular',
+                          'although', 'while', 'despite', 'in spite of', 'regardless of',
+                          'similarly', 'likewise', 'in contrast', 'conversely', 'meanwhile'],
+    'argument_development': ['firstly', 'secondly', 'thirdly', 'finally', 'in conclusion',
+                             'on the one hand', 'on the other hand', 'however', 'nevertheless',
+                             'for example', 'for instance', 'such as', 'specifically'],
+    'coherence': ['therefore', 'thus', 'hence', 'as a result', 'consequently',
+                  'furthermore', 'moreover', 'additionally', 'in addition'],
+    'intro_conclusion': ['in conclusion', 'to conclude', 'to summarize', 'overall', 'finally'],
+})
+
+# Matched against each sentence to count complex sentences
+CLAUSE_LEXICON = PhraseLexicon({
+    'clause': ['because', 'although', 'while', 'when', 'if', 'unless', 'since', 'as', 'whereas',
+               'despite', 'in spite of', 'regardless of', 'notwithstanding'],
+})
+
+ACADEMIC_EXPRESSIONS = frozenset({
+    'furthermore', 'moreover', 'additionally', 'consequently', 'therefore', 'thus', 'hence',
+    'nevertheless', 'nonetheless', 'however', 'although', 'despite', 'regarding', 'concerning',
+    'specifically', 'particularly', 'especially', 'notably', 'significantly', 'importantly',
+})
+
+def precompute_reference_artifacts(reference):
+    """Compute the reference-only artifacts used by Write Essay scoring"""
+    return {
+        'reference_embedding': sbert_model.encode(reference, convert_to_tensor=True),
+        'reference_unique_words': unique_content_words(reference),
+    }
 
 def get_rubric_description(score):
     """Get the rubric description for the given content score"""
@@ -61,9 +114,12 @@ def evaluate_write_essay(essay, reference):
     Evaluate Write Essay across 7 criteria
     """
     scores = {}
+    # Tokenize the essay once for every criterion below
+    doc = TextAnalysis(essay)
     
     # === 1. Content (0-6 points) ===
-    emb_reference = sbert_model.encode(reference, convert_to_tensor=True)
+    emb_reference = reference_artifact('write_essay', reference, 'reference_embedding',
+                                       lambda: sbert_model.encode(reference, convert_to_tensor=True))
     emb_essay = sbert_model.encode(essay, convert_to_tensor=True)
     similarity = util.cos_sim(emb_reference, emb_essay).item()
     
@@ -84,38 +140,31 @@ def evaluate_write_essay(essay, reference):
     else:
         topic_relevance_score = -1  # Off-topic
     
+    # Every discourse-marker lexicon, matched in one pass over the essay
+    indicator_hits = ESSAY_LEXICON.scan(essay)
+    
     # 2. Argument structure and development
-    argument_indicators = ['firstly', 'secondly', 'thirdly', 'on the one hand', 'on the other hand', 
-                          'however', 'nevertheless', 'in contrast', 'similarly', 'likewise',
-                          'for example', 'for instance', 'such as', 'specifically', 'moreover',
-                          'furthermore', 'additionally', 'consequently', 'therefore', 'thus']
-    argument_count = sum(1 for indicator in argument_indicators if indicator.lower() in essay.lower())
+    argument_count = len(indicator_hits['argument'])
     
     # 3. Specific examples and details
-    example_indicators = ['for example', 'for instance', 'such as', 'specifically', 'in particular',
-                         'namely', 'including', 'especially', 'particularly', 'notably']
-    example_count = sum(1 for indicator in example_indicators if indicator.lower() in essay.lower())
+    example_count = len(indicator_hits['example'])
     
     # 4. Conclusion and synthesis
-    conclusion_indicators = ['in conclusion', 'to conclude', 'therefore', 'thus', 'hence', 
-                           'as a result', 'consequently', 'overall', 'in summary', 'finally']
-    has_conclusion = any(indicator.lower() in essay.lower() for indicator in conclusion_indicators)
+    conclusion_count = len(indicator_hits['conclusion'])
+    has_conclusion = conclusion_count > 0
     
     # 5. Paraphrasing quality (own words vs copying)
     # Count unique words that are not common function words
-    essay_words = essay.lower().split()
-    reference_words = reference.lower().split()
-    common_words = {'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'is', 'are', 'was', 'were', 'be', 'been', 'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would', 'could', 'should', 'may', 'might', 'can', 'this', 'that', 'these', 'those', 'it', 'its', 'they', 'them', 'their', 'we', 'us', 'our', 'you', 'your', 'i', 'me', 'my'}
-    
-    essay_unique_words = set(word for word in essay_words if word not in common_words and len(word) > 3)
-    reference_unique_words = set(word for word in reference_words if word not in common_words and len(word) > 3)
+    essay_words = doc.lower_words
+    essay_unique_words = unique_content_words(doc)
+    reference_unique_words = set(reference_artifact('write_essay', reference, 'reference_unique_words',
+                                                    lambda: unique_content_words(reference)))
     
     paraphrasing_score = len(essay_unique_words - reference_unique_words) / max(len(essay_unique_words), 1)
     
     # 6. Argument strength and consistency
     # Check for balanced argument structure
-    contrast_indicators = ['however', 'nevertheless', 'on the other hand', 'in contrast', 'although', 'while']
-    contrast_count = sum(1 for indicator in contrast_indicators if indicator.lower() in essay.lower())
+    contrast_count = len(indicator_hits['contrast'])
     
     # Calculate final content score based on rubric
     if topic_relevance_score == -1:
@@ -138,7 +187,7 @@ def evaluate_write_essay(essay, reference):
     scores['content'] = content_score
     
     # === 2. Form (0-2 points) ===
-    words = essay.strip().split()
+    words = doc.words
     word_count = len(words)
     is_all_caps = essay.isupper()
     has_punctuation = bool(re.search(r'[.!?]', essay))
@@ -152,7 +201,7 @@ def evaluate_write_essay(essay, reference):
         scores['form'] = 0
     
     # === 3. Development, Structure & Coherence (0-6 points) ===
-    sentences = sent_tokenize(essay)
+    sentences = doc.sentences
     sentence_count = len(sentences)
     avg_sentence_length = word_count / sentence_count if sentence_count > 0 else 0
     
@@ -161,28 +210,15 @@ def evaluate_write_essay(essay, reference):
     paragraph_count = len([p for p in paragraphs if p.strip()])
     
     # Enhanced connective devices analysis
-    simple_connectors = ['and', 'but', 'because', 'so', 'then', 'also', 'too', 'as well']
-    complex_connectors = ['however', 'therefore', 'furthermore', 'moreover', 'in addition', 
-                         'consequently', 'as a result', 'on the other hand', 'nevertheless',
-                         'firstly', 'secondly', 'finally', 'in conclusion', 'to summarize',
-                         'for example', 'for instance', 'such as', 'specifically', 'in particular',
-                         'although', 'while', 'despite', 'in spite of', 'regardless of',
-                         'similarly', 'likewise', 'in contrast', 'conversely', 'meanwhile']
-    
-    simple_connector_count = sum(1 for connector in simple_connectors if connector.lower() in essay.lower())
-    complex_connector_count = sum(1 for connector in complex_connectors if connector.lower() in essay.lower())
+    simple_connector_count = len(indicator_hits['simple_connector'])
+    complex_connector_count = len(indicator_hits['complex_connector'])
     total_connector_count = simple_connector_count + complex_connector_count
     
     # Analyze argument structure and development
-    argument_development_indicators = ['firstly', 'secondly', 'thirdly', 'finally', 'in conclusion',
-                                     'on the one hand', 'on the other hand', 'however', 'nevertheless',
-                                     'for example', 'for instance', 'such as', 'specifically']
-    argument_development_count = sum(1 for indicator in argument_development_indicators if indicator.lower() in essay.lower())
+    argument_development_count = len(indicator_hits['argument_development'])
     
     # Check for logical flow and coherence
-    coherence_indicators = ['therefore', 'thus', 'hence', 'as a result', 'consequently',
-                           'furthermore', 'moreover', 'additionally', 'in addition']
-    coherence_count = sum(1 for indicator in coherence_indicators if indicator.lower() in essay.lower())
+    coherence_count = len(indicator_hits['coherence'])
     
     # Analyze paragraph organization
     paragraph_quality = 0
@@ -196,8 +232,7 @@ def evaluate_write_essay(essay, reference):
         paragraph_quality = 0  # No paragraph structure
     
     # Check for introduction and conclusion
-    intro_conclusion_indicators = ['in conclusion', 'to conclude', 'to summarize', 'overall', 'finally']
-    has_intro_conclusion = any(indicator.lower() in essay.lower() for indicator in intro_conclusion_indicators)
+    has_intro_conclusion = len(indicator_hits['intro_conclusion']) > 0
     
     # Calculate structure and coherence score based on new 6-point rubric
     development_structure_coherence_score = 0
@@ -261,7 +296,7 @@ def evaluate_write_essay(essay, reference):
     
     # === 4. Grammar (0-2 points) ===
     try:
-        matches = lang_tool.check(essay)
+        matches = lang_tool.check_parallel(essay)
         grammar_errors = [m for m in matches if m.ruleIssueType in ("grammar", "typographical")]
         num_grammar_errors = len(grammar_errors)
         
@@ -281,15 +316,14 @@ def evaluate_write_essay(essay, reference):
     # New approach: Score each criterion separately and then combine
     
     # Calculate vocabulary diversity metrics
-    lex = LexicalRichness(essay)
-    ttr = lex.ttr  # Type-Token Ratio
+    ttr = doc.ttr  # Type-Token Ratio
     try:
-        mtld = min(lex.mtld(), 200)  # Cap MTLD at 200 to handle very high values
+        mtld = min(doc.mtld, 200)  # Cap MTLD at 200 to handle very high values
     except:
         mtld = 10  # Default value if MTLD calculation fails
     
     # Count unique words and advanced vocabulary
-    words = essay.strip().split()
+    words = doc.words
     word_count = len(words)
     unique_words = set(word.lower() for word in words if word.isalpha())
     advanced_words = [word for word in words if len(word) >= 6 and word.isalpha()]
@@ -299,8 +333,7 @@ def evaluate_write_essay(essay, reference):
     complex_sentences = 0
     for sentence in sentences:
         # Count clauses (basic complexity measure)
-        clause_indicators = ['because', 'although', 'while', 'when', 'if', 'unless', 'since', 'as', 'whereas', 'despite', 'in spite of', 'regardless of', 'notwithstanding']
-        if any(indicator in sentence.lower() for indicator in clause_indicators):
+        if CLAUSE_LEXICON.scan(sentence)['clause']:
             complex_sentences += 1
     
     # Calculate complexity ratios
@@ -313,8 +346,7 @@ def evaluate_write_essay(essay, reference):
     passive_ratio = passive_count / sentence_count if sentence_count > 0 else 0
     
     # Check for academic and sophisticated expressions
-    academic_expressions = ['furthermore', 'moreover', 'additionally', 'consequently', 'therefore', 'thus', 'hence', 'nevertheless', 'nonetheless', 'however', 'although', 'despite', 'regarding', 'concerning', 'specifically', 'particularly', 'especially', 'notably', 'significantly', 'importantly']
-    academic_count = sum(1 for word in words if word.lower().strip('.,!?;:') in academic_expressions)
+    academic_count = sum(1 for word in words if word.lower().strip('.,!?;:') in ACADEMIC_EXPRESSIONS)
     academic_ratio = academic_count / word_count if word_count > 0 else 0
     
     # Analyze expression variety and appropriateness
@@ -432,9 +464,8 @@ def evaluate_write_essay(essay, reference):
     scores['general_linguistic_range'] = general_linguistic_range_score
     
     # === 6. Vocabulary Range (0-2 points) ===
-    lex = LexicalRichness(essay)
-    ttr = lex.ttr
-    mtld = lex.mtld()
+    ttr = doc.ttr
+    mtld = doc.mtld
     
     # Check for advanced vocabulary (words with 6+ letters)
     advanced_words = [word for word in words if len(word) >= 6 and word.isalpha()]
@@ -445,6 +476,9 @@ def evaluate_write_essay(essay, reference):
     academic_words = [word for word in words if any(word.endswith(suffix) for suffix in academic_suffixes)]
     academic_ratio = len(academic_words) / word_count if word_count > 0 else 0
     
+    # CEFR and frequency profile of the essay's words (reported in details)
+    vocab_profile = vocabulary_profile([w for w in doc.tokens if w.isalpha() and len(w) > 1])
+    
     # Base vocabulary score
     if ttr > 0.75 and mtld > 25 and advanced_ratio >= 0.3 and academic_ratio >= 0.1:
         base_vocabulary_score = 2
@@ -500,41 +534,7 @@ def evaluate_write_essay(essay, reference):
     scores['vocabulary_range'] = max(0, base_vocabulary_score - grammar_vocabulary_penalty - spelling_vocabulary_penalty)
     
     # === Word Highlights for Grammar/Spelling Errors ===
-    word_highlights = []
-    essay_words = essay.split()
-    
-    # Initialize all words as correct
-    for word in essay_words:
-        word_highlights.append({"word": word, "status": "correct", "replacement": None})
-    
-    # Process grammar errors
-    for error in grammar_errors:
-        error_text = essay[error.offset:error.offset+error.errorLength]
-        error_words = error_text.split()
-        
-        for i, highlight in enumerate(word_highlights):
-            clean_highlight = highlight['word'].rstrip('.,!?;:')
-            if clean_highlight in error_words or highlight['word'] in error_words:
-                word_highlights[i] = {
-                    "word": highlight['word'],
-                    "status": "grammar",
-                    "replacement": error.replacements[0] if error.replacements else None,
-                }
-    
-    # Process spelling errors
-    for error in spelling_errors:
-        error_text = essay[error.offset:error.offset+error.errorLength]
-        error_words = error_text.split()
-        suggestions = error.replacements[:3] if error.replacements else []
-        
-        for i, highlight in enumerate(word_highlights):
-            clean_highlight = highlight['word'].rstrip('.,!?;:')
-            if clean_highlight in error_words or highlight['word'] in error_words:
-                word_highlights[i] = {
-                    "word": highlight['word'],
-                    "status": "spelling",
-                    "suggestions": suggestions,
-                }
+    word_highlights = build_word_highlights(doc, grammar_errors, spelling_errors)
     
     # === Final Total ===
     # Update total calculation to account for new 6-point Development, Structure & Coherence and General Linguistic Range
@@ -561,7 +561,7 @@ def evaluate_write_essay(essay, reference):
             'paraphrasing_score': paraphrasing_score,
             'contrast_count': contrast_count,
             'argument_indicators_found': argument_count,
-            'conclusion_indicators_found': sum(1 for indicator in conclusion_indicators if indicator.lower() in essay.lower()),
+            'conclusion_indicators_found': conclusion_count,
             'example_indicators_found': example_count,
             'rubric_level': get_rubric_description(content_score)
         },
@@ -599,6 +599,10 @@ def evaluate_write_essay(essay, reference):
         'advanced_ratio': advanced_ratio,
         'academic_ratio': academic_ratio,
         'connector_count': total_connector_count,
+        'vocabulary_profile': {
+            'cefr': dict(vocab_profile['cefr']),
+            'frequency': vocab_profile['frequency']
+        },
         'cascading_penalties': {
             'num_grammar_errors': num_grammar_errors,
             'num_spelling_errors': num_spelling_errors,
@@ -0,0 +1,81 @@
+"""
+Concurrent chatbot streams benchmark.
+
+Opens `--streams` /chatbot streams at once against a running app and reports
+how long the whole batch took, time to first byte and total time per stream,
+plus how long a scoring-style request (`--probe` URL) waits while the streams
+are open. With the streams served from chat_main.py (gevent) the batch should
+take about as long as one stream.
+
+    python -m benchmarks.ollama_stub --port 11434 &
+    python chat_main.py --port 6001 &
+    python -m benchmarks.chat_streams_benchmark --url http://127.0.0.1:6001 --streams 200
+"""
+import argparse
+import statistics
+import threading
+import time
+
+import requests
+
+
+def open_stream(url, prompt, results, index):
+    started = time.perf_counter()
+    first_byte = None
+    size = 0
+    try:
+        with requests.post(f"{url}/chatbot", json={'prompt': prompt}, stream=True, timeout=(5, 120)) as res:
+            for chunk in res.iter_content(chunk_size=None):
+                if first_byte is None:
+                    first_byte = time.perf_counter() - started
+                size += len(chunk)
+        results[index] = (first_byte, time.perf_counter() - started, size, None)
+    except requests.RequestException as e:
+        results[index] = (first_byte, time.perf_counter() - started, size, e)
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def run(url, streams, prompt, probe):
+    results = [None] * streams
+    threads = [threading.Thread(target=open_stream, args=(url, prompt, results, i)) for i in range(streams)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+
+    probe_time = None
+    if probe:
+        time.sleep(0.5)
+        probe_started = time.perf_counter()
+        requests.get(probe, timeout=120)
+        probe_time = time.perf_counter() - probe_started
+
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    errors = [r[3] for r in results if r[3] is not None]
+    first_bytes = [r[0] for r in results if r[0] is not None]
+    totals = [r[1] for r in results if r[3] is None]
+    print(f"{streams} streams in {elapsed:.2f}s, {len(errors)} failed")
+    if first_bytes:
+        print(f"time to first byte: median {statistics.median(first_bytes):.3f}s, p95 {percentile(first_bytes, 0.95):.3f}s")
+    if totals:
+        print(f"stream duration:    median {statistics.median(totals):.3f}s, p95 {percentile(totals, 0.95):.3f}s")
+    if probe_time is not None:
+        print(f"probe request while streams were open: {probe_time:.3f}s")
+    if errors:
+        print(f"first error: {errors[0]}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Open many chatbot streams at once')
+    parser.add_argument('--url', default='http://127.0.0.1:6001')
+    parser.add_argument('--streams', type=int, default=100)
+    parser.add_argument('--prompt', default='Give me feedback on my summary please')
+    parser.add_argument('--probe', help='URL to GET while the streams are open (e.g. a scoring app endpoint)')
+    args = parser.parse_args()
+    run(args.url, args.streams, args.prompt, args.probe)
@@ -0,0 +1,195 @@
+"""
+Dictation grading benchmark: indexed engine vs. the previous nested-loop one.
+
+Generates dictation responses of increasing length from a word pool (with
+misspellings, dropped, extra and reordered words), checks that
+`dictation_highlight` and `dictation_ai` return exactly what the previous
+implementation returned, and reports the time per response for both.
+
+Usage:
+
+    python -m benchmarks.dictation_benchmark [--lengths 20 100 400 1000] [--samples 20]
+"""
+import argparse
+import difflib
+import random
+import re
+import time
+
+from app.services import dictation_service
+from app.services.dictation_service import dictation_ai, dictation_highlight, normalize_apostrophes
+
+WORD_POOL = (
+    "the students were asked to submit their assignments before the end of the semester "
+    "researchers have found that regular exercise improves memory and reduces stress "
+    "climate change is one of the most significant challenges facing the world today "
+    "governments should invest in renewable energy and public transport infrastructure "
+    "it's important that every child has access to quality education and healthcare"
+).split()
+
+
+def legacy_normalize_word(word, strip_period=True):
+    word = word.lower().replace("’", "'").replace("`", "'").strip()
+    if strip_period:
+        word = word.rstrip(".")
+    return re.sub(r"[^\w']+", "", word)
+
+
+def legacy_dictation_highlight(reference_text, user_speech):
+    reference_words = reference_text.split()
+    user_speech_words = user_speech.split()
+    word_highlight = []
+    used_ref_indices = set()
+    for user_word in user_speech_words:
+        normalized_user = legacy_normalize_word(user_word)
+        best_match = None
+        best_similarity = 0
+        best_idx = None
+        for ref_idx, ref_word in enumerate(reference_words):
+            if ref_idx not in used_ref_indices and normalized_user == legacy_normalize_word(ref_word):
+                best_match = "correct"
+                best_idx = ref_idx
+                break
+        if best_match is None:
+            for ref_idx, ref_word in enumerate(reference_words):
+                if ref_idx not in used_ref_indices:
+                    similarity = difflib.SequenceMatcher(None, legacy_normalize_word(ref_word), normalized_user).ratio()
+                    if similarity > best_similarity and similarity >= 0.75:
+                        best_match = "misspelled"
+                        best_similarity = similarity
+                        best_idx = ref_idx
+        if best_match is not None:
+            used_ref_indices.add(best_idx)
+            word_highlight.append((user_word, best_match))
+        else:
+            word_highlight.append((user_word, "extra"))
+    for ref_idx, ref_word in enumerate(reference_words):
+        if ref_idx not in used_ref_indices:
+            word_highlight.append((ref_word, "missing"))
+    return word_highlight
+
+
+def legacy_dictation_ai(user_text, reference_text):
+    reference_text = normalize_apostrophes(reference_text)
+    user_text = normalize_apostrophes(user_text)
+    ref_words = reference_text.split()
+    user_words = user_text.split()
+    total_score = len(ref_words)
+    matching_words = []
+    word_highlights = []
+    ref_word_count = {}
+    ref_word_positions = []
+    for i, word in enumerate(ref_words):
+        norm_word = legacy_normalize_word(word)
+        ref_word_count[norm_word] = ref_word_count.get(norm_word, 0) + 1
+        ref_word_positions.append((norm_word, word, i))
+    matched_count = {}
+    for word in user_words:
+        norm_word = legacy_normalize_word(word)
+        matched = False
+        for ref_norm in ref_word_count:
+            if norm_word == ref_norm:
+                current_matches = matched_count.get(ref_norm, 0)
+                if current_matches < ref_word_count[ref_norm]:
+                    matching_words.append(norm_word)
+                    word_highlights.append([word, "correct"])
+                    matched_count[ref_norm] = current_matches + 1
+                    matched = True
+                    break
+        if not matched:
+            word_highlights.append([word, "extra"])
+    result_highlights = []
+    current_user_pos = 0
+    while current_user_pos < len(word_highlights) and word_highlights[current_user_pos][1] != "correct":
+        result_highlights.append(word_highlights[current_user_pos])
+        current_user_pos += 1
+    for ref_norm, ref_orig, ref_pos in ref_word_positions:
+        if ref_norm in matched_count and matched_count[ref_norm] > 0:
+            while current_user_pos < len(word_highlights) and legacy_normalize_word(word_highlights[current_user_pos][0]) != ref_norm:
+                result_highlights.append(word_highlights[current_user_pos])
+                current_user_pos += 1
+            if current_user_pos < len(word_highlights):
+                result_highlights.append(word_highlights[current_user_pos])
+                matched_count[ref_norm] -= 1
+                current_user_pos += 1
+        else:
+            result_highlights.append([ref_orig, "missing"])
+    while current_user_pos < len(word_highlights):
+        result_highlights.append(word_highlights[current_user_pos])
+        current_user_pos += 1
+    missing_count = sum(1 for w in result_highlights if w[1] == "missing")
+    user_score = min(max(total_score - missing_count, 0), total_score)
+    if user_words and not user_words[0][0].isupper():
+        user_score = max(0, user_score - 0.5)
+    if user_words and not user_words[-1].endswith('.'):
+        user_score = max(0, user_score - 0.5)
+    return {
+        "matching_words": matching_words,
+        "word_highlights": result_highlights,
+        "listening": user_score,
+        "writing": user_score,
+        "score": user_score,
+        "max_score": total_score,
+        "summary": user_text
+    }
+
+
+def misspell(word, rng):
+    if len(word) < 3:
+        return word
+    i = rng.randrange(len(word))
+    return word[:i] + rng.choice("aeiourstn") + word[i + 1:]
+
+
+def make_pair(length, rng):
+    reference = [rng.choice(WORD_POOL) for _ in range(length)]
+    reference[0] = reference[0].capitalize()
+    reference[-1] += "."
+    response = []
+    for word in reference:
+        roll = rng.random()
+        if roll < 0.08:
+            continue
+        if roll < 0.2:
+            response.append(misspell(word, rng))
+        elif roll < 0.25:
+            response.extend([word, rng.choice(WORD_POOL)])
+        else:
+            response.append(word)
+    if len(response) > 3 and rng.random() < 0.5:
+        i = rng.randrange(len(response) - 1)
+        response[i], response[i + 1] = response[i + 1], response[i]
+    return " ".join(reference), " ".join(response)
+
+
+def timed(function, pairs, swap=False):
+    start = time.perf_counter()
+    results = [function(b, a) if swap else function(a, b) for a, b in pairs]
+    return results, (time.perf_counter() - start) / len(pairs)
+
+
+def run(lengths, samples, seed):
+    rng = random.Random(seed)
+    print(f"{'words':>6} {'highlight old':>14} {'highlight new':>14} {'ai old':>10} {'ai new':>10}")
+    for length in lengths:
+        pairs = [make_pair(length, rng) for _ in range(samples)]
+        # Cold caches, as for a passage the worker has not seen
+        dictation_service.normalize_word.cache_clear()
+        dictation_service._similarity.cache_clear()
+        old_highlight, old_highlight_time = timed(legacy_dictation_highlight, pairs)
+        new_highlight, new_highlight_time = timed(dictation_highlight, pairs)
+        old_ai, old_ai_time = timed(legacy_dictation_ai, pairs, swap=True)
+        new_ai, new_ai_time = timed(dictation_ai, pairs, swap=True)
+        assert new_highlight == old_highlight, f"dictation_highlight output differs at {length} words"
+        assert new_ai == old_ai, f"dictation_ai output differs at {length} words"
+        print(f"{length:>6} {old_highlight_time * 1000:>12.2f}ms {new_highlight_time * 1000:>12.2f}ms "
+              f"{old_ai_time * 1000:>8.2f}ms {new_ai_time * 1000:>8.2f}ms")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark dictation grading')
+    parser.add_argument('--lengths', type=int, nargs='+', default=[20, 100, 400, 1000])
+    parser.add_argument('--samples', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    run(args.lengths, args.samples, args.seed)
@@ -0,0 +1,93 @@
+"""
+SWT/SST feedback prompt benchmark: full vs compressed reference.
+
+Builds the summary feedback prompt for a reference passage with and without
+prompt compression, sends each `--runs` times straight to the configured LLM
+backend(s) (OLLAMA_URL / LLM_BACKENDS, bypassing the feedback cache) with
+the feedback generation caps, and reports prompt size, time to first token
+and total generation time for both modes.
+
+    OLLAMA_URL=http://127.0.0.1:11434 python -m benchmarks.feedback_prompt_benchmark \\
+        --reference-file lecture.txt --summary "..." --model llama2 --runs 3
+
+Without --reference-file a built-in lecture transcript is used.
+"""
+import argparse
+import statistics
+import time
+
+from app.services.chatbot_service import chat_events
+from app.services.feedback_service import feedback_options, summary_feedback_prompt
+from app.services.prompt_compression import FEEDBACK_PROMPT_TOKEN_BUDGET, estimate_tokens
+
+SAMPLE_LECTURE = (
+    "Good morning everyone. Today we are going to look at urban heat islands and why cities are warmer "
+    "than the countryside around them. An urban heat island forms because buildings, roads and car parks "
+    "absorb sunlight during the day and release that heat slowly at night. Asphalt and concrete have a low "
+    "albedo, which means they reflect very little of the incoming solar radiation. In addition, cities have "
+    "far less vegetation, so there is less evaporation from leaves to cool the air. Waste heat from air "
+    "conditioners, vehicles and industry adds to the problem. Now, you might think a difference of two or "
+    "three degrees is trivial, but it matters a great deal. During heat waves, night-time temperatures in "
+    "dense neighbourhoods can stay dangerously high, and elderly residents are particularly at risk. Hospital "
+    "admissions rise, and energy demand for cooling peaks exactly when power grids are most stressed. So what "
+    "can be done? One approach is cool roofs, which are painted or coated with reflective materials. Studies "
+    "in several cities have shown that cool roofs can lower roof surface temperatures by more than twenty "
+    "degrees. Another approach is green infrastructure, such as street trees, parks and green roofs, which "
+    "provide shade and evaporative cooling. However, trees take years to mature and need water, which can "
+    "be scarce in hot climates. Urban planners are also experimenting with permeable pavements and with "
+    "changing the layout of streets to improve airflow. Importantly, the benefits are not evenly distributed. "
+    "Poorer neighbourhoods often have fewer trees and more paved surfaces, so they experience the strongest "
+    "heat island effect. Therefore, many researchers argue that heat mitigation should be treated as a "
+    "question of social equity as well as environmental design. To sum up, urban heat islands are caused by "
+    "materials, lack of vegetation and waste heat, they have serious health and energy consequences, and "
+    "they can be reduced through reflective surfaces, greenery and careful planning."
+)
+SAMPLE_SUMMARY = (
+    "The lecture explains that cities are warmer than rural areas because dark surfaces store heat and "
+    "there is little vegetation, which harms health, and suggests cool roofs and trees as solutions."
+)
+
+
+def run_once(messages, model, options):
+    started = time.perf_counter()
+    first_token = None
+    chunks = []
+    for kind, text in chat_events(messages, model, 'benchmark', options, endpoint='benchmark'):
+        if kind == 'error':
+            raise RuntimeError(text.strip())
+        if kind == 'content':
+            if first_token is None:
+                first_token = time.perf_counter() - started
+            chunks.append(text)
+    return first_token, time.perf_counter() - started, len(chunks)
+
+
+def run(reference, summary, model, runs):
+    options = feedback_options()
+    print(f"reference: {estimate_tokens(reference)} tokens, budget {FEEDBACK_PROMPT_TOKEN_BUDGET}, "
+          f"caps {options}")
+    for mode, compress in (('full', False), ('compressed', True)):
+        prompt = summary_feedback_prompt(reference, summary, compress)
+        messages = [{"role": "user", "content": prompt}]
+        results = [run_once(messages, model, options) for _ in range(runs)]
+        first_tokens = [r[0] for r in results if r[0] is not None]
+        totals = [r[1] for r in results]
+        ttft = f"{statistics.median(first_tokens):.3f}s" if first_tokens else "n/a"
+        print(f"{mode:>10}: prompt {estimate_tokens(prompt):5d} tokens | "
+              f"TTFT median {ttft} | total median {statistics.median(totals):.3f}s | "
+              f"{statistics.median(r[2] for r in results):.0f} chunks")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare feedback latency with full and compressed references')
+    parser.add_argument('--reference-file', help='text file with the reference passage')
+    parser.add_argument('--summary', default=SAMPLE_SUMMARY)
+    parser.add_argument('--model', default='llama2')
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+    if args.reference_file:
+        with open(args.reference_file, encoding='utf-8') as f:
+            reference = f.read()
+    else:
+        reference = SAMPLE_LECTURE
+    run(reference, args.summary, args.model, args.runs)
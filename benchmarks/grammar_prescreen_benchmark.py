@@ -0,0 +1,135 @@
+"""
+Agreement benchmark: local grammar pre-screen vs. the full LanguageTool check.
+
+Runs every labeled sentence through the pre-screen and through LanguageTool
+(cache and pre-screen disabled) and reports:
+
+  * skip rate          - share of texts the pre-screen declared clean
+  * false-clean count  - texts declared clean that are labeled as erroneous
+                         or for which LanguageTool reports grammar/
+                         typographical/spelling matches (must be 0)
+  * label agreement    - how each tier compares with the hand labels
+  * latency            - mean time per text for each tier
+
+Usage (LanguageTool server from app/services/grammar_server.py running):
+
+    python -m benchmarks.grammar_prescreen_benchmark [--urls http://127.0.0.1:8081]
+
+Pass --labels-only to compare against the hand labels without LanguageTool.
+The benchmark exits non-zero on any false-clean result; do not set
+GRAMMAR_PRESCREEN=1 (which lets SWT skip LanguageTool) until it passes.
+"""
+import argparse
+import sys
+import time
+from collections import Counter
+
+from app.services.grammar_prescreen import screen
+from app.services.grammar_service import LanguageToolClient
+
+SCORED_ISSUE_TYPES = ("grammar", "typographical", "spelling", "misspelling")
+
+# (text, has_error) - SWT-style single-sentence summaries
+LABELED_SET = [
+    ("Climate change is driving more frequent droughts, which threatens food production in many regions.", False),
+    ("The study shows that regular exercise improves memory and reduces stress in older adults.", False),
+    ("Urban gardens provide fresh food, strengthen communities and lower the temperature of cities.", False),
+    ("Researchers found that children who read daily develop stronger vocabulary and better grades.", False),
+    ("Renewable energy is becoming cheaper, so many countries are investing in solar and wind power.", False),
+    ("The author argues that social media changes how people form opinions and share information.", False),
+    ("Honey bees are essential pollinators, but pesticides and habitat loss are reducing their numbers.", False),
+    ("Sleep helps the brain store memories, and a lack of sleep harms learning and mood.", False),
+    ("Electric cars reduce air pollution in cities, although producing batteries requires rare metals.", False),
+    ("The lecture explains that early humans used fire to cook food, which changed their diet.", False),
+    ("Working from home saves travel time but can make it harder for teams to communicate.", False),
+    ("Plastic waste in the ocean harms marine animals and enters the human food chain.", False),
+    ("The passage describes how ancient trade routes spread ideas, goods and religions across continents.", False),
+    ("Bilingual people often switch between languages easily and may have better attention control.", False),
+    ("Tourism brings money to small towns, yet it can also raise housing costs for local residents.", False),
+    ("Their research shows that coral reefs recover when fishing is limited.", False),
+    ("It is clear that the new policy will affect small businesses more than large companies.", False),
+    ("An honest review of the data suggests that the program was a success.", False),
+    ("Scientists use satellites to monitor forests and to detect illegal logging.", False),
+    ("Music training in childhood is linked to stronger listening skills later in life.", False),
+    ("Climate change are causing more droughts in many regions of the world.", True),
+    ("The study show that exercise improve memory in older adults.", True),
+    ("Urban gardens provides fresh food and strengthens communities.", True),
+    ("Researchers found that children who read daily develops stronger vocabulary.", True),
+    ("Renewable energy is becoming more cheaper than fossil fuels.", True),
+    ("The author argue that social media change how people form there opinions.", True),
+    ("Honey bees are essencial pollinators but pesticides are reducing their numbers.", True),
+    ("Sleep helps the the brain store memories and improves learning.", True),
+    ("Electric cars reduces air pollution in cities.", True),
+    ("the lecture explains that early humans used fire to cook food.", True),
+    ("Working from home saves time , but it can make communication harder.", True),
+    ("Plastic waste in the ocean harm marine animals and enter the food chain.", True),
+    ("The passage describe how ancient trade routes spread ideas across continents.", True),
+    ("Bilingual people could of better attention control than monolingual people.", True),
+    ("Tourism brings money to small towns,yet it raises housing costs.", True),
+    ("He have shown that coral reefs recover when fishing is limited.", True),
+    ("It is a important finding that the policy affects small businesses.", True),
+    ("i think the program was a success according to the data.", True),
+    ("Scientists uses satelites to monitor forests and detect illegal logging.", True),
+    ("Music training in childhood is linked to stronger listening skils later in life.", True),
+]
+
+
+def run(urls=None, labels_only=False):
+    """Print the report; return the number of false-clean results"""
+    client = None if labels_only else LanguageToolClient(urls=urls)
+    counts = Counter()
+    reasons = Counter()
+    false_clean = []
+    prescreen_time = 0.0
+    languagetool_time = 0.0
+
+    for text, has_error in LABELED_SET:
+        start = time.perf_counter()
+        clean, reason = screen(text)
+        prescreen_time += time.perf_counter() - start
+        reasons[reason] += 1
+
+        matches = []
+        if client is not None:
+            start = time.perf_counter()
+            matches = client.check(text)
+            languagetool_time += time.perf_counter() - start
+        lt_flagged = any(m.ruleIssueType in SCORED_ISSUE_TYPES for m in matches)
+
+        counts['total'] += 1
+        counts['lt_agrees_with_label'] += lt_flagged == has_error
+        if clean:
+            counts['prescreen_clean'] += 1
+            counts['prescreen_clean_label_clean'] += not has_error
+            if lt_flagged or has_error:
+                false_clean.append((text, [m.message for m in matches] or ['labeled as erroneous']))
+
+    total = counts['total']
+    declared_clean = counts['prescreen_clean']
+    print(f"Texts:                {total}")
+    print(f"Skip rate:            {declared_clean / total:.1%} ({declared_clean} declared clean)")
+    if declared_clean:
+        print(f"False-clean:          {len(false_clean) / declared_clean:.1%} ({len(false_clean)})")
+        print(f"Clean vs labels:      {counts['prescreen_clean_label_clean'] / declared_clean:.1%}")
+    print(f"Mean pre-screen time: {prescreen_time / total * 1000:.3f} ms")
+    if client is not None:
+        print(f"LT vs labels:         {counts['lt_agrees_with_label'] / total:.1%}")
+        print(f"Mean LanguageTool:    {languagetool_time / total * 1000:.3f} ms")
+    print("Pre-screen decisions:")
+    for reason, count in reasons.most_common():
+        print(f"  {reason:32s} {count}")
+    for text, messages in false_clean:
+        print(f"FALSE CLEAN: {text}\n  {messages}")
+    return len(false_clean)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare the grammar pre-screen with LanguageTool')
+    parser.add_argument('--urls', help='Comma-separated LanguageTool server URLs')
+    parser.add_argument('--labels-only', action='store_true',
+                        help='Compare against the hand labels only, without LanguageTool')
+    args = parser.parse_args()
+    false_clean_count = run(args.urls.split(',') if args.urls else None, labels_only=args.labels_only)
+    if false_clean_count:
+        print(f"FAIL: {false_clean_count} false-clean result(s)")
+        sys.exit(1)
@@ -0,0 +1,160 @@
+"""
+Local stand-in for an Ollama server, for testing the chatbot streams without a model.
+
+Speaks the parts of Ollama's HTTP API the app uses:
+
+  POST /api/chat   streams NDJSON chat chunks ({"message": {"content": ...}, "done": false})
+                   followed by a final {"done": true, ...} line; with
+                   "stream": false returns one JSON object
+  GET  /api/tags   lists the configured model
+  GET  /api/ps     lists the models that have served a request (resident)
+
+and the OpenAI-compatible equivalents, for testing mixed backend pools:
+
+  POST /v1/chat/completions   server-sent events ("data: {...}", "data: [DONE]")
+  GET  /v1/models
+
+Each reply echoes the last user message word by word, one chunk every
+`--token-delay` seconds after `--first-token-delay`, so long-lived streams
+can be held open on purpose. `--prefill-delay` adds that many seconds per
+prompt token (words and punctuation) before the first token, as a crude
+model of prompt prefill. Stop sequences are not applied.
+
+    python -m benchmarks.ollama_stub [--port 11434] [--tokens 40] [--token-delay 0.05]
+"""
+import argparse
+import json
+import re
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class OllamaStubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    config = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, body):
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _write_chunk(self, data):
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def do_GET(self):
+        if self.path == '/api/tags':
+            self._send_json(200, {'models': [{'name': self.config.model, 'model': self.config.model}]})
+        elif self.path == '/api/ps':
+            self._send_json(200, {'models': [{'name': m, 'model': m} for m in sorted(self.config.resident)]})
+        elif self.path == '/v1/models':
+            self._send_json(200, {'object': 'list', 'data': [{'id': self.config.model, 'object': 'model'}]})
+        else:
+            self._send_json(404, {'error': 'not found'})
+
+    def do_POST(self):
+        if self.path not in ('/api/chat', '/v1/chat/completions'):
+            self._send_json(404, {'error': 'not found'})
+            return
+        openai = self.path == '/v1/chat/completions'
+        request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        model = request.get('model', self.config.model)
+        self.config.resident.add(model if ':' in model or openai else f"{model}:latest")
+        user_messages = [m.get('content', '') for m in request.get('messages', []) if m.get('role') == 'user']
+        words = (user_messages[-1].split() if user_messages else []) or ['ok']
+        tokens = [words[i % len(words)] + ' ' for i in range(self.config.tokens)]
+        options = request.get('options') or {}
+        if options.get('num_predict'):
+            tokens = tokens[:max(int(options['num_predict']), 0)]
+        if openai and request.get('max_tokens'):
+            tokens = tokens[:max(int(request['max_tokens']), 0)]
+
+        started = time.time()
+        prompt_tokens = sum(len(re.findall(r"\w+|[^\w\s]", m.get('content', ''))) for m in request.get('messages', []))
+        time.sleep(self.config.first_token_delay + self.config.prefill_delay * prompt_tokens)
+        # Ollama streams unless told not to, the OpenAI API only when asked
+        if not request.get('stream', not openai):
+            time.sleep(self.config.token_delay * len(tokens))
+            message = {'role': 'assistant', 'content': ''.join(tokens)}
+            if openai:
+                self._send_json(200, {'object': 'chat.completion', 'model': model, 'choices': [
+                    {'index': 0, 'message': message, 'finish_reason': 'stop'}
+                ], 'usage': {'completion_tokens': len(tokens)}})
+            else:
+                self._send_json(200, {'model': model, 'message': message, 'done': True, 'eval_count': len(tokens)})
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream' if openai else 'application/x-ndjson')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        if openai:
+            usage = None
+            if (request.get('stream_options') or {}).get('include_usage'):
+                usage = {'prompt_tokens': prompt_tokens, 'completion_tokens': len(tokens),
+                         'total_tokens': prompt_tokens + len(tokens)}
+            self._stream_events(model, tokens, usage)
+            return
+        prefilled = time.time()
+        try:
+            for token in tokens:
+                line = {'model': model, 'message': {'role': 'assistant', 'content': token}, 'done': False}
+                self._write_chunk(json.dumps(line).encode('utf-8') + b"\n")
+                time.sleep(self.config.token_delay)
+            final = {
+                'model': model, 'message': {'role': 'assistant', 'content': ''}, 'done': True,
+                'eval_count': len(tokens), 'eval_duration': int((time.time() - prefilled) * 1e9),
+                'prompt_eval_count': prompt_tokens, 'prompt_eval_duration': int((prefilled - started) * 1e9),
+                'total_duration': int((time.time() - started) * 1e9),
+            }
+            self._write_chunk(json.dumps(final).encode('utf-8') + b"\n")
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def _stream_events(self, model, tokens, usage=None):
+        try:
+            for token in tokens:
+                event = {'object': 'chat.completion.chunk', 'model': model,
+                         'choices': [{'index': 0, 'delta': {'content': token}, 'finish_reason': None}]}
+                self._write_chunk(b"data: " + json.dumps(event).encode('utf-8') + b"\n\n")
+                time.sleep(self.config.token_delay)
+            if usage:
+                event = {'object': 'chat.completion.chunk', 'model': model, 'choices': [], 'usage': usage}
+                self._write_chunk(b"data: " + json.dumps(event).encode('utf-8') + b"\n\n")
+            self._write_chunk(b"data: [DONE]\n\n")
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+def serve(host='127.0.0.1', port=11434, model='llama2', tokens=40, first_token_delay=0.2, token_delay=0.05,
+          prefill_delay=0.0):
+    OllamaStubHandler.config = argparse.Namespace(
+        model=model, tokens=tokens, first_token_delay=first_token_delay, token_delay=token_delay,
+        prefill_delay=prefill_delay, resident=set()
+    )
+    server = ThreadingHTTPServer((host, port), OllamaStubHandler)
+    server.daemon_threads = True
+    print(f"Ollama stub on http://{host}:{port} ({tokens} tokens, {token_delay}s apart)")
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Local Ollama NDJSON stub')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=11434)
+    parser.add_argument('--model', default='llama2')
+    parser.add_argument('--tokens', type=int, default=40)
+    parser.add_argument('--first-token-delay', type=float, default=0.2)
+    parser.add_argument('--token-delay', type=float, default=0.05)
+    parser.add_argument('--prefill-delay', type=float, default=0.0, help='seconds per prompt token')
+    args = parser.parse_args()
+    serve(args.host, args.port, args.model, args.tokens, args.first_token_delay, args.token_delay,
+          args.prefill_delay)
@@ -0,0 +1,54 @@
+"""
+Streaming app for the LLM chatbot endpoints (/chatbot, /swt_chatbot, /sst_chatbot).
+
+A chatbot stream mostly waits on Ollama for 20-60 s. Served from the sync
+scoring workers, each open stream holds a whole worker. This app serves only
+the chatbot blueprint on gevent: every stream is a greenlet, and the pooled
+Ollama session (chatbot_service) yields to the event loop while waiting on
+the socket, so one process keeps hundreds of streams open. The CPU-bound
+scoring endpoints stay on their own sync workers in main.py.
+
+Run behind the same reverse proxy as main.py, routing the chatbot paths here:
+
+    gunicorn chat_main:app -k gevent --worker-connections 1000 --bind 127.0.0.1:6001
+
+or, without gunicorn:
+
+    python chat_main.py [--port 6001]
+
+Only the chatbot and job blueprints are imported, so no scoring models are
+loaded. The job endpoints are served only here: long-polls on
+/jobs/<job_id>?wait=... are cheap greenlets, where on the sync scoring
+workers each one would block scoring requests. Route /jobs/* to this app.
+"""
+from gevent import monkey
+
+monkey.patch_all()
+
+import argparse
+
+from flask import Flask
+from flask_cors import CORS
+
+from app.routes.chatbot_routes import chatbot_bp
+from app.routes.job_routes import job_bp
+
+
+def create_app():
+    app = Flask(__name__)
+    CORS(app, resources={r"/*": {"origins": "*"}})
+    app.register_blueprint(chatbot_bp)
+    app.register_blueprint(job_bp)
+    return app
+
+
+app = create_app()
+
+if __name__ == "__main__":
+    from gevent.pywsgi import WSGIServer
+
+    parser = argparse.ArgumentParser(description='Serve the chatbot streaming endpoints on gevent')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=6001)
+    args = parser.parse_args()
+    WSGIServer((args.host, args.port), app).serve_forever()
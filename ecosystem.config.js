@@ -7,7 +7,55 @@ module.exports = {
       interpreter: "none",
       env: {
         // Add env variables if needed here
-        FLASK_ENV: "production"
+        FLASK_ENV: "production",
+        LANGUAGETOOL_URLS: "http://127.0.0.1:8081",
+        // Start SWT/SST feedback in the chatbot app as soon as a summary is scored
+        // FEEDBACK_PREFETCH_URL: "http://127.0.0.1:6001"
+      }
+    },
+    {
+      // Chatbot streams on gevent, so open LLM streams do not hold the scoring worker.
+      // Route /chatbot, /swt_chatbot and /sst_chatbot to this port in the reverse proxy.
+      name: "peterspte_chat",
+      script: "/nvme/Peterspte_AI/venv/bin/gunicorn",
+      args: "chat_main:app -k gevent --worker-connections 1000 --bind 127.0.0.1:6001 --workers 1",
+      interpreter: "none",
+      env: {
+        FLASK_ENV: "production",
+        OLLAMA_URL: "http://127.0.0.1:11434",
+        // More Ollama / OpenAI-compatible nodes, e.g. "http://127.0.0.1:11434,openai=http://10.0.0.6:8000/v1"
+        // (raise GENERATION_MAX_CONCURRENCY with the number of backends)
+        // LLM_BACKENDS: "",
+        OLLAMA_POOL_SIZE: "256",
+        // Generations Ollama runs at once; the rest queue fairly per client
+        GENERATION_MAX_CONCURRENCY: "4",
+        GENERATION_QUEUE_SIZE: "200"
+      }
+    },
+    {
+      // Runs the jobs queued by POST /jobs/<task> (retell_lecture, summarize_group, describe_image).
+      // Raise instances for more parallel scoring; each loads its own models.
+      name: "peterspte_jobs",
+      script: "/nvme/Peterspte_AI/venv/bin/python",
+      args: "-m app.services.job_service --worker",
+      interpreter: "none",
+      instances: 1,
+      autorestart: true,
+      env: {
+        LANGUAGETOOL_URLS: "http://127.0.0.1:8081",
+        JOB_DB: "jobs.db"
+      }
+    },
+    {
+      // One LanguageTool server per host, shared by every worker
+      name: "peterspte_languagetool",
+      script: "/nvme/Peterspte_AI/venv/bin/python",
+      args: "-m app.services.grammar_server --port 8081",
+      interpreter: "none",
+      autorestart: true,
+      max_memory_restart: "2G",
+      env: {
+        LANGUAGETOOL_HEAP: "1g"
       }
     }
   ]